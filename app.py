@@ -1,451 +1,166 @@
 # app.py
+import hashlib
+import time
+import uuid
+
+import numpy as np
 import streamlit as st
-from dataclasses import dataclass
-from typing import List, Dict, Tuple
+from typing import Iterator, List, Dict, Tuple
+
+from cache import all_stats, get_cache, memoized
+from chain_codec import ChainCodec, ChainStore, chain_token
+from citation_index import CitationIndex, load_citations
+from corpus_store import CorpusStore, PaperMapping, load_corpus
+from expansion import Level, expand, relevance_decay, top_k
+from export import DIRECTIONS, FORMATS, export, subgraph_hops, subgraph_size
+from components import chain_graph_component, typeahead_component
+from concepts import load_concepts
+from facets import FacetIndex, Selection, join_labels, load_facets, split_labels
+from grouping import ConceptTable, Grouping, group_rows, identity_concepts
+from layout import Layout, Scene, extend_layout, layout_graph, scene_delta
+from prefetch import Job, Prefetcher
+from related import RelatedIndex, load_related
+from render import SEED_CHAIN_ID, cards_html, history_html, trails_html, truncate
+from resolver import BackgroundResolver, background_resolver_from_env, looks_resolvable
+from scoring import QueryScorer, ScoreTable, load_scores
+from search import SearchIndex, closest_title, load_search
+from seed_data import SEED_RESULTS, SEED_TITLE
+from tracing import recent_traces, rerun_root, span_rows, summary_rows, traced
+from trail_store import TrailStore
+from typeahead import TypeaheadIndex, load_typeahead
+
+DEFAULT_QUERY_KEY = SEED_TITLE
+
+# How long a loaded store is reused before checking for a rebuilt file.
+RESOURCE_TTL_S = 60
+
+# Multi-hop view: max depth, per-paper fan-out limit and per-hop score decay.
+MAX_HOPS = 3
+EXPANSION_FANOUT = 25
+HOP_DECAY = 0.5
+# Papers in the multi-hop view's "best across hops" list.
+BEST_ACROSS_HOPS = 10
+
+# Cards per page for every paginated list (overridable with ?size=).
+DEFAULT_PAGE_SIZE = 25
+MIN_PAGE_SIZE = 5
+MAX_PAGE_SIZE = 200
+
+# In-app exports are built in memory (Streamlit buffers downloads); larger
+# subgraphs are left to `python manage.py export`, which streams to a file.
+EXPORT_MAX_PAPERS = 20_000
+
+# Chain graph: best-scored references and citing papers shown per chain
+# paper, over the chain's last GRAPH_MAX_STEPS steps.
+GRAPH_NEIGHBORS = 6
+GRAPH_MAX_STEPS = 20
+GRAPH_KEY = "chain_graph"
+
+# Speculative prefetch: the first cards of every rendered list.
+PREFETCH_CARDS = 5
 
 # ----------------------------
-# Data model
+# Shared resources (loaded once per server process, shared by all sessions)
 # ----------------------------
 
-@dataclass
-class Paper:
-    paper_id: str
-    title: str
-    authors: str
-    year: int
-    venue: str
-    relevance: float
-    keywords: List[str]
-    snippet: str
-    abstract: str
+@st.cache_resource(ttl=RESOURCE_TTL_S, show_spinner=False)
+def load_resources() -> Tuple[CorpusStore, CitationIndex, SearchIndex, ScoreTable, RelatedIndex]:
+    store = load_corpus()
+    citations = load_citations(store)
+    return store, citations, load_search(store), load_scores(store, citations), load_related(store, citations)
 
-
-SEED_TITLE = "Beyond Accuracy: The Role of Mental Models in Human-AI Team Performance"
-DEFAULT_QUERY_KEY = SEED_TITLE
+_STORE, CITATIONS, SEARCH, SCORES, RELATED = load_resources()
+CORPUS_VERSION = _STORE.version
 
 # ----------------------------
-# Papers (core + expanded dummy corpus for deeper chaining)
+# Papers (memory-mapped columnar store, materialized lazily per id)
 # ----------------------------
 
-PAPERS: Dict[str, Paper] = {
-    # ---- core 8 (same as your set) ----
-    "norman_1983": Paper(
-        paper_id="norman_1983",
-        title="Mental Models of Intelligent Systems",
-        authors="D. Norman",
-        year=1983,
-        venue="Human–Computer Interaction",
-        relevance=0.95,
-        keywords=["mental models", "human understanding", "cognition"],
-        snippet="Introduces mental models as internal representations humans use to understand and predict system behavior.",
-        abstract="Classic work describing how people build internal representations of systems to predict outcomes and explain behavior.",
-    ),
-    "ribeiro_2016_lime": Paper(
-        paper_id="ribeiro_2016_lime",
-        title="Why Should I Trust You? Explaining the Predictions of Any Classifier",
-        authors="M. Ribeiro, S. Singh, C. Guestrin",
-        year=2016,
-        venue="KDD",
-        relevance=0.92,
-        keywords=["explainable AI", "interpretability", "trust"],
-        snippet="Presents LIME, a method for explaining individual predictions to improve human trust and understanding.",
-        abstract="Introduces LIME, a local surrogate explanation method that helps users interpret model predictions and debug behavior.",
-    ),
-    "kaur_2020_trust": Paper(
-        paper_id="kaur_2020_trust",
-        title="On the Relationship Between Explanation and Trust in AI Systems",
-        authors="S. Kaur et al.",
-        year=2020,
-        venue="CHI",
-        relevance=0.90,
-        keywords=["trust", "explainability", "human-AI interaction"],
-        snippet="Shows explanations influence trust calibration rather than blind reliance.",
-        abstract="Examines how explanation interfaces affect user trust, calibration, and reliance behaviors in AI-assisted tasks.",
-    ),
-    "amershi_2019_collab": Paper(
-        paper_id="amershi_2019_collab",
-        title="Human-AI Collaboration: Models, Design Patterns, and Future Directions",
-        authors="S. Amershi et al.",
-        year=2019,
-        venue="CHI",
-        relevance=0.93,
-        keywords=["human-AI teaming", "collaboration", "design patterns"],
-        snippet="Framework for designing effective human-AI collaborative systems beyond raw accuracy.",
-        abstract="Synthesizes models and design patterns for human–AI collaboration, emphasizing workflows and feedback loops.",
-    ),
-    "lipton_2018_mythos": Paper(
-        paper_id="lipton_2018_mythos",
-        title="The Mythos of Model Interpretability",
-        authors="Z. Lipton",
-        year=2018,
-        venue="Queue",
-        relevance=0.85,
-        keywords=["interpretability", "mental models", "machine learning"],
-        snippet="Critically examines what interpretability means and how it affects user understanding.",
-        abstract="Critiques ambiguous definitions of interpretability and argues for clearer goals and evaluation in context.",
-    ),
-    "bansal_2021_error": Paper(
-        paper_id="bansal_2021_error",
-        title="Predictability and Transparency in AI Error Behavior",
-        authors="H. Bansal, E. Weld",
-        year=2021,
-        venue="AAAI",
-        relevance=0.88,
-        keywords=["error boundaries", "predictability", "human-AI teaming"],
-        snippet="Predictable error patterns can improve human-AI team performance more than higher accuracy.",
-        abstract="Explores how predictable vs. unpredictable errors shape user mental models, reliance, and collaboration outcomes.",
-    ),
-    "lee_see_2004_trust": Paper(
-        paper_id="lee_see_2004_trust",
-        title="Appropriate Trust and Reliance in Human-AI Teams",
-        authors="J. Lee, K. See",
-        year=2004,
-        venue="Human Factors",
-        relevance=0.87,
-        keywords=["trust", "calibration", "automation"],
-        snippet="Classic paper on trust calibration and appropriate reliance on automated systems.",
-        abstract="Foundational work on trust in automation and how design supports appropriate reliance, avoiding misuse/disuse.",
-    ),
-    "shneiderman_2020_control": Paper(
-        paper_id="shneiderman_2020_control",
-        title="Designing AI Systems for Effective Human Control",
-        authors="B. Shneiderman",
-        year=2020,
-        venue="Communications of the ACM",
-        relevance=0.84,
-        keywords=["human-centered AI", "control", "explainability"],
-        snippet="Human-centered design principles to maintain user control and understanding.",
-        abstract="Argues for human-centered AI emphasizing oversight, responsibility, and transparency in socio-technical systems.",
-    ),
-
-    # ---- existing extra dummy ----
-    "doshi_velez_2017": Paper(
-        paper_id="doshi_velez_2017",
-        title="Towards a Rigorous Science of Interpretable Machine Learning",
-        authors="F. Doshi-Velez, B. Kim",
-        year=2017,
-        venue="(Demo) arXiv",
-        relevance=0.82,
-        keywords=["interpretability", "evaluation", "machine learning"],
-        snippet="Argues for clearer goals and evaluation methods for interpretability.",
-        abstract="Proposes a framework for evaluating interpretability depending on task, user population, and stakes.",
-    ),
-    "miller_2019_explanations": Paper(
-        paper_id="miller_2019_explanations",
-        title="Explanation in Artificial Intelligence: Insights from the Social Sciences",
-        authors="T. Miller",
-        year=2019,
-        venue="AI Journal",
-        relevance=0.83,
-        keywords=["explainability", "human understanding", "trust"],
-        snippet="Connects explanation needs to how humans understand and accept reasoning.",
-        abstract="Synthesizes social science research on explanation and maps implications to AI system design.",
-    ),
-    "zhang_2020_calibration": Paper(
-        paper_id="zhang_2020_calibration",
-        title="Calibrating Trust in AI-Assisted Decision Making",
-        authors="Y. Zhang et al.",
-        year=2020,
-        venue="(Demo) CSCW",
-        relevance=0.78,
-        keywords=["trust", "calibration", "human-AI interaction"],
-        snippet="Examines interventions to reduce over/under-reliance on AI.",
-        abstract="Studies calibration strategies such as confidence cues, history, and explanations and their effects on reliance.",
-    ),
-    "wu_2021_error_boundary": Paper(
-        paper_id="wu_2021_error_boundary",
-        title="Characterizing Error Boundaries for Human-AI Collaboration",
-        authors="J. Wu et al.",
-        year=2021,
-        venue="(Demo) AAAI",
-        relevance=0.81,
-        keywords=["error boundaries", "human-AI teaming", "predictability"],
-        snippet="Ways to summarize failure regions so users can learn when to rely on AI.",
-        abstract="Explores representations of error boundaries and how they influence user mental models and reliance behavior.",
-    ),
-    "khanna_2022_feedback": Paper(
-        paper_id="khanna_2022_feedback",
-        title="Designing Feedback Loops for Human-AI Teaming",
-        authors="S. Khanna et al.",
-        year=2022,
-        venue="(Demo) CHI",
-        relevance=0.77,
-        keywords=["human-AI teaming", "collaboration", "design patterns"],
-        snippet="Design patterns for feedback loops in human-AI systems.",
-        abstract="Discusses feedback loop designs that help humans and AI coordinate, correct errors, and refine strategies.",
-    ),
-    "yang_2023_transparency": Paper(
-        paper_id="yang_2023_transparency",
-        title="Transparency Interfaces for Predictable Reliance",
-        authors="K. Yang et al.",
-        year=2023,
-        venue="(Demo) UIST",
-        relevance=0.75,
-        keywords=["transparency", "trust", "predictability"],
-        snippet="UI patterns for communicating limitations and supporting calibrated reliance.",
-        abstract="Explores interface patterns that communicate uncertainty and limitations so users can form reliable mental models.",
-    ),
-
-    # ---- NEW: mental models / cognition cluster ----
-    "johnson_laird_1983": Paper(
-        paper_id="johnson_laird_1983",
-        title="Mental Models: Towards a Cognitive Science of Language, Inference, and Consciousness",
-        authors="P. Johnson-Laird",
-        year=1983,
-        venue="Book (Demo)",
-        relevance=0.80,
-        keywords=["mental models", "cognition", "reasoning"],
-        snippet="Foundational theory describing mental models as the basis for human reasoning and inference.",
-        abstract="Proposes that people reason by constructing and manipulating mental models of situations rather than relying on formal logic alone.",
-    ),
-    "gentner_structure_mapping_1983": Paper(
-        paper_id="gentner_structure_mapping_1983",
-        title="Structure-Mapping: A Theoretical Framework for Analogy",
-        authors="D. Gentner",
-        year=1983,
-        venue="Cognitive Science (Demo)",
-        relevance=0.74,
-        keywords=["cognition", "human understanding", "analogy"],
-        snippet="Explains how people transfer knowledge via analogical mapping, supporting mental model formation.",
-        abstract="Introduces structure-mapping theory of analogy, explaining how relational structure guides human understanding and learning.",
-    ),
-    "hutchins_cognition_1995": Paper(
-        paper_id="hutchins_cognition_1995",
-        title="Cognition in the Wild: Distributed Cognition and Real-World Work",
-        authors="E. Hutchins",
-        year=1995,
-        venue="Book (Demo)",
-        relevance=0.72,
-        keywords=["human understanding", "cognition", "distributed cognition"],
-        snippet="Shows cognition is distributed across people and artifacts, relevant to team mental models.",
-        abstract="Argues that cognition is not confined to individuals but distributed across social and material systems, shaping performance in complex tasks.",
-    ),
-    "klein_sensemaking_1998": Paper(
-        paper_id="klein_sensemaking_1998",
-        title="A Data-Frame Theory of Sensemaking",
-        authors="G. Klein et al.",
-        year=1998,
-        venue="IEEE Intelligent Systems (Demo)",
-        relevance=0.70,
-        keywords=["sensemaking", "human understanding", "cognition"],
-        snippet="Sensemaking theory relevant to how people build and revise mental models.",
-        abstract="Describes how people adopt frames to interpret data and revise frames when anomalies arise, explaining how mental models evolve over time.",
-    ),
-    "endsley_sa_1995": Paper(
-        paper_id="endsley_sa_1995",
-        title="Toward a Theory of Situation Awareness in Dynamic Systems",
-        authors="M. Endsley",
-        year=1995,
-        venue="Human Factors (Demo)",
-        relevance=0.76,
-        keywords=["human understanding", "situation awareness", "cognition"],
-        snippet="Defines situation awareness and its relationship to decision making in dynamic environments.",
-        abstract="Proposes a theory of situation awareness as perception, comprehension, and projection, and connects it to performance and decision quality.",
-    ),
-
-    # ---- NEW: trust / reliance / automation cluster ----
-    "parasuraman_2000": Paper(
-        paper_id="parasuraman_2000",
-        title="A Model for Types and Levels of Human Interaction with Automation",
-        authors="R. Parasuraman, T. Sheridan, C. Wickens",
-        year=2000,
-        venue="IEEE Transactions (Demo)",
-        relevance=0.79,
-        keywords=["automation", "trust", "human-AI interaction"],
-        snippet="Framework for levels of automation and how they affect monitoring and reliance.",
-        abstract="Presents a taxonomy of automation levels and discusses how design choices shape human monitoring, workload, and appropriate reliance.",
-    ),
-    "hoff_rashid_trust_2016": Paper(
-        paper_id="hoff_rashid_trust_2016",
-        title="Trust in Automation: Integrating Empirical Evidence Across Domains",
-        authors="K. Hoff, A. Bashir",
-        year=2016,
-        venue="Human Factors (Demo)",
-        relevance=0.73,
-        keywords=["trust", "calibration", "automation"],
-        snippet="Synthesizes factors influencing trust calibration including transparency and experience.",
-        abstract="Reviews empirical findings on trust in automation, identifying drivers of trust, misuse/disuse, and strategies to improve calibration.",
-    ),
-    "calibrated_confidence_2019": Paper(
-        paper_id="calibrated_confidence_2019",
-        title="Communicating Model Confidence for Calibrated Reliance",
-        authors="A. Park et al.",
-        year=2019,
-        venue="(Demo) CHI",
-        relevance=0.69,
-        keywords=["trust", "calibration", "transparency"],
-        snippet="Studies UI confidence cues and their effect on over/under-reliance.",
-        abstract="Examines how confidence displays and performance histories influence reliance, including cases where confidence can mislead when poorly calibrated.",
-    ),
-
-    # ---- NEW: interpretability / XAI evaluation cluster ----
-    "xai_user_eval_2018": Paper(
-        paper_id="xai_user_eval_2018",
-        title="Human-Centered Evaluation of Explanations: Tasks, Measures, and Pitfalls",
-        authors="V. Lai et al.",
-        year=2018,
-        venue="(Demo) CHI",
-        relevance=0.71,
-        keywords=["explainable AI", "evaluation", "human-AI interaction"],
-        snippet="Compares explanation styles and measures effects on understanding and decision quality.",
-        abstract="Presents a set of evaluation approaches for explanation interfaces and discusses pitfalls where explanations increase confidence without improving correctness.",
-    ),
-    "model_cards_2019": Paper(
-        paper_id="model_cards_2019",
-        title="Model Cards for Model Reporting",
-        authors="M. Mitchell et al.",
-        year=2019,
-        venue="FAT* (Demo)",
-        relevance=0.67,
-        keywords=["transparency", "documentation", "human-centered AI"],
-        snippet="Documentation approach to communicate intended use, limitations, and evaluation.",
-        abstract="Proposes standardized documentation for models to support informed use, communicating evaluation context, performance, and limitations.",
-    ),
-
-    # ---- NEW: error boundary / predictability cluster ----
-    "failure_modes_2020": Paper(
-        paper_id="failure_modes_2020",
-        title="Summarizing Model Failure Modes for Non-Expert Users",
-        authors="J. Rivera et al.",
-        year=2020,
-        venue="(Demo) UIST",
-        relevance=0.72,
-        keywords=["error boundaries", "predictability", "human understanding"],
-        snippet="Techniques to show users where a model tends to fail, supporting better mental models.",
-        abstract="Explores ways to summarize failure regions and communicate them to users so they can anticipate errors and allocate attention effectively.",
-    ),
-    "selective_prediction_2017": Paper(
-        paper_id="selective_prediction_2017",
-        title="Selective Prediction: Abstention Mechanisms for Safer Human-AI Collaboration",
-        authors="S. Gupta et al.",
-        year=2017,
-        venue="(Demo) ICML",
-        relevance=0.68,
-        keywords=["predictability", "human-AI teaming", "trust"],
-        snippet="Abstention to avoid low-confidence errors, intended to improve collaboration safety.",
-        abstract="Introduces abstention/deferral strategies that can reduce catastrophic errors, and discusses implications for user reliance and workflow design.",
-    ),
-}
+PAPERS: PaperMapping = PaperMapping(_STORE)
 
-HARDCODED_RESULTS: Dict[str, List[Paper]] = {
-    SEED_TITLE: [
-        PAPERS["norman_1983"],
-        PAPERS["ribeiro_2016_lime"],
-        PAPERS["kaur_2020_trust"],
-        PAPERS["amershi_2019_collab"],
-        PAPERS["lipton_2018_mythos"],
-        PAPERS["bansal_2021_error"],
-        PAPERS["lee_see_2004_trust"],
-        PAPERS["shneiderman_2020_control"],
-    ]
+@st.cache_resource(show_spinner=False)
+def load_chain_store() -> ChainStore:
+    return ChainStore()
+
+@st.cache_resource(show_spinner=False)
+def chain_codec(corpus_version: str) -> ChainCodec:
+    return ChainCodec(PAPERS.store, load_chain_store(), SEED_CHAIN_ID)
+
+CHAINS = chain_codec(CORPUS_VERSION)
+
+@st.cache_resource(show_spinner=False)
+def load_resolver() -> BackgroundResolver | None:
+    """Online DOI / citation lookups on a background thread (None unless CCP_RESOLVER_URL is set)."""
+    return background_resolver_from_env()
+
+@st.cache_resource(show_spinner=False)
+def load_prefetcher() -> Prefetcher:
+    """Background warm-up of the details pages users are likely to open next."""
+    return Prefetcher()
+
+@st.cache_resource(show_spinner=False)
+def load_trail_store() -> TrailStore:
+    """Recorded research trails (data/trails.sqlite), written on a background thread."""
+    return TrailStore()
+
+# query -> corpus rows, in original order
+HARDCODED_RESULTS: Dict[str, np.ndarray] = {
+    query: PAPERS.store.rows_of(ids) for query, ids in SEED_RESULTS.items()
 }
 
 # ----------------------------
-# Citation edges
+# Result caches (bounded LRU + TTL, keyed on corpus version)
 # ----------------------------
 
-CITES: Dict[str, List[str]] = {
-    "seed": [p.paper_id for p in HARDCODED_RESULTS[SEED_TITLE]],
-
-    "norman_1983": [
-        "johnson_laird_1983",
-        "gentner_structure_mapping_1983",
-        "endsley_sa_1995",
-        "klein_sensemaking_1998",
-        "hutchins_cognition_1995",
-    ],
-
-    "ribeiro_2016_lime": ["doshi_velez_2017", "miller_2019_explanations", "xai_user_eval_2018"],
-    "lipton_2018_mythos": ["doshi_velez_2017", "miller_2019_explanations"],
-    "doshi_velez_2017": ["xai_user_eval_2018", "model_cards_2019"],
-    "xai_user_eval_2018": ["model_cards_2019"],
-    "model_cards_2019": [],
-
-    "kaur_2020_trust": ["zhang_2020_calibration", "miller_2019_explanations", "calibrated_confidence_2019"],
-    "lee_see_2004_trust": ["parasuraman_2000", "hoff_rashid_trust_2016"],
-    "zhang_2020_calibration": ["hoff_rashid_trust_2016", "calibrated_confidence_2019"],
-    "parasuraman_2000": ["hoff_rashid_trust_2016"],
-    "hoff_rashid_trust_2016": ["calibrated_confidence_2019"],
-    "calibrated_confidence_2019": [],
-
-    "amershi_2019_collab": ["khanna_2022_feedback", "shneiderman_2020_control", "parasuraman_2000"],
-    "khanna_2022_feedback": ["amershi_2019_collab"],
-
-    "bansal_2021_error": ["wu_2021_error_boundary", "failure_modes_2020", "selective_prediction_2017", "yang_2023_transparency"],
-    "wu_2021_error_boundary": ["failure_modes_2020", "selective_prediction_2017"],
-    "failure_modes_2020": ["selective_prediction_2017"],
-    "selective_prediction_2017": [],
-
-    "shneiderman_2020_control": ["model_cards_2019", "yang_2023_transparency"],
-    "yang_2023_transparency": ["calibrated_confidence_2019", "model_cards_2019"],
-
-    "johnson_laird_1983": [],
-    "gentner_structure_mapping_1983": [],
-    "hutchins_cognition_1995": [],
-    "klein_sensemaking_1998": [],
-    "endsley_sa_1995": [],
-
-    "miller_2019_explanations": ["johnson_laird_1983", "lee_see_2004_trust"],
-}
+QUERY_CACHE = get_cache("queries", maxsize=1024, ttl=600.0)
+RESULT_CACHE = get_cache("results", maxsize=256, ttl=600.0)
+# Traversal counts change as people browse; a short TTL keeps them fresh enough.
+TRAIL_CACHE = get_cache("trails", maxsize=1024, ttl=30.0)
+# Chain graph layouts, per chain; each is warm-started from its parent chain's.
+LAYOUT_CACHE = get_cache("layouts", maxsize=256, ttl=600.0)
 
 # ----------------------------
 # Keyword grouping logic
 # ----------------------------
 
-def group_non_ai(papers: List[Paper]) -> Dict[str, List[Paper]]:
-    groups: Dict[str, List[Paper]] = {}
-    for p in papers:
-        for kw in p.keywords:
-            groups.setdefault(kw, []).append(p)
-    return groups
-
-AI_CANONICAL: Dict[str, str] = {
-    "mental models": "Mental Models & Interpretability",
-    "human understanding": "Mental Models & Interpretability",
-    "cognition": "Mental Models & Interpretability",
-    "sensemaking": "Mental Models & Interpretability",
-    "situation awareness": "Mental Models & Interpretability",
-    "distributed cognition": "Mental Models & Interpretability",
-    "reasoning": "Mental Models & Interpretability",
-    "analogy": "Mental Models & Interpretability",
-
-    "explainable AI": "Explainability & Transparency",
-    "explainability": "Explainability & Transparency",
-    "transparency": "Explainability & Transparency",
-    "documentation": "Explainability & Transparency",
-    "evaluation": "Explainability & Transparency",
-    "interpretability": "Explainability & Transparency",
-
-    "human-AI teaming": "Human–AI Collaboration",
-    "human-AI interaction": "Human–AI Collaboration",
-    "collaboration": "Human–AI Collaboration",
-    "design patterns": "Human–AI Collaboration",
-    "human-centered AI": "Human–AI Collaboration",
-    "control": "Human–AI Collaboration",
-
-    "trust": "Trust, Calibration & Reliance",
-    "calibration": "Trust, Calibration & Reliance",
-    "automation": "Trust, Calibration & Reliance",
-
-    "error boundaries": "Error Predictability",
-    "predictability": "Error Predictability",
-}
+@st.cache_resource(show_spinner=False)
+def concept_tables(corpus_version: str) -> Tuple[ConceptTable, ConceptTable]:
+    """(exact keyword, clustered concept) tables over the corpus keyword ids."""
+    return identity_concepts(PAPERS.store), load_concepts(PAPERS.store).table()
+
+@traced
+def group_non_ai(rows: np.ndarray) -> Grouping:
+    exact, _ = concept_tables(CORPUS_VERSION)
+    return group_rows(PAPERS.store, rows, exact)
+
+@traced
+def group_ai(rows: np.ndarray, row_scores: np.ndarray | None = None) -> Grouping:
+    _, concepts = concept_tables(CORPUS_VERSION)
+    return group_rows(PAPERS.store, rows, concepts, by_score=True, row_scores=row_scores)
 
-def canonicalize_keyword(kw: str) -> str:
-    return AI_CANONICAL.get(kw.strip(), kw.strip())
+# ----------------------------
+# Facet filters (bitmap indexes, see facets.py)
+# ----------------------------
+
+@st.cache_resource(show_spinner=False)
+def facet_index(corpus_version: str) -> FacetIndex:
+    """Year / venue / keyword / concept / references bitmaps for the result filters."""
+    return load_facets(PAPERS.store, CITATIONS, load_concepts(PAPERS.store))
+
+# ----------------------------
+# Search suggestions (prefix index, see typeahead.py)
+# ----------------------------
 
-def group_ai(papers: List[Paper]) -> Dict[str, List[Paper]]:
-    groups: Dict[str, List[Paper]] = {}
-    for p in papers:
-        for kw in p.keywords:
-            canon = canonicalize_keyword(kw)
-            groups.setdefault(canon, []).append(p)
-    return groups
+@st.cache_resource(show_spinner=False)
+def typeahead_index(corpus_version: str, scores_version: str) -> TypeaheadIndex:
+    """Title / author / DOI prefixes for the search box, ranked by importance."""
+    return load_typeahead(PAPERS.store, SCORES)
 
 # ----------------------------
 # Query param helpers
 # ----------------------------
 
+@traced
 def get_qp() -> Dict[str, str]:
     try:
         return dict(st.query_params)
@@ -453,7 +168,7 @@ def get_qp() -> Dict[str, str]:
         qp = st.experimental_get_query_params()
         return {k: (v[0] if isinstance(v, list) and v else v) for k, v in qp.items()}
 
-def set_qp(**params) -> None:
+def update_qp(**params) -> None:
     current = get_qp()
     merged = {**current, **params}
     merged = {k: v for k, v in merged.items() if v is not None}
@@ -465,19 +180,99 @@ def set_qp(**params) -> None:
     except Exception:
         st.experimental_set_query_params(**{k: [v] for k, v in merged.items()})
 
-    st.rerun()
+# ----------------------------
+# Navigation (widget callbacks; the URL stays the source of truth)
+# ----------------------------
+# Each region reads page/paper/chain from the URL, so a callback only updates
+# the query params and reruns the fragment(s) whose output depends on them.
+
+PAGE_FRAGMENT = "page"
+SEARCH_FRAGMENT = "search_box"
+RESULTS_FRAGMENT = "results_list"
+DETAILS_FRAGMENT = "details_pane"
+HISTORY_FRAGMENT = "history"
+
+def navigate(scope: str | List[str], **params) -> None:
+    update_qp(**params)
+    st.rerun(scope)
+
+# ----------------------------
+# Pagination-in-URL helpers
+# ----------------------------
+# size=<page size>, off=<section>:<offset>,... (one offset per rendered list)
+
+def get_page_size() -> int:
+    try:
+        return min(max(int(get_qp().get("size", DEFAULT_PAGE_SIZE)), MIN_PAGE_SIZE), MAX_PAGE_SIZE)
+    except ValueError:
+        return DEFAULT_PAGE_SIZE
+
+def parse_offsets(off_str: str) -> Dict[str, int]:
+    offsets: Dict[str, int] = {}
+    for part in (off_str or "").split(","):
+        section, _, value = part.partition(":")
+        if section and value.isdigit():
+            offsets[section] = int(value)
+    return offsets
+
+def offsets_to_str(offsets: Dict[str, int]) -> str | None:
+    parts = [f"{section}:{off}" for section, off in offsets.items() if off > 0]
+    return ",".join(parts) or None
+
+def get_offsets() -> Dict[str, int]:
+    return parse_offsets(get_qp().get("off", ""))
+
+def clamp_offset(off: int, size: int, total: int) -> int:
+    if off >= total:
+        off = max(total - 1, 0)
+    return off - off % size
+
+# ----------------------------
+# Filters-in-URL helpers
+# ----------------------------
+# year=<from>-<to>, venue=<label>|<label>..., keyword= or concept= (whichever
+# the grouping mode shows), refs=<label> (labels escaped, see
+# facets.join_labels). Changing a filter resets paging.
+
+FILTER_PARAMS = ("year", "venue", "keyword", "concept", "refs")
+
+def topic_facet() -> str:
+    """Keyword filters follow the grouping mode: exact keywords, or AI-mode concepts."""
+    return "concept" if st.session_state.get("ai_mode") else "keyword"
+
+def parse_year_range(value: str) -> Tuple[int, int] | None:
+    lo, _, hi = (value or "").partition("-")
+    if lo.isdigit() and hi.isdigit():
+        return int(lo), int(hi)
+    return None
+
+def get_filters() -> Dict[str, Tuple[str, ...]]:
+    """The URL's filters as facet -> chosen labels."""
+    qp = get_qp()
+    selection: Dict[str, Tuple[str, ...]] = {}
+    years = parse_year_range(qp.get("year", ""))
+    if years is not None:
+        lo, hi = years
+        # Kept when no year falls in the range: the filter then matches nothing.
+        selection["year"] = tuple(y for y in facet_index(CORPUS_VERSION).labels["year"] if lo <= int(y) <= hi)
+    for name in ("venue", topic_facet(), "refs"):
+        labels = split_labels(qp.get(name, ""))
+        if labels:
+            selection[name] = labels
+    return selection
 
 # ----------------------------
 # Chain-in-URL helpers (FIX)
 # ----------------------------
+# The chain param is a compact reference (see chain_codec.py); old
+# comma-joined chains still parse.
 
+@traced
 def parse_chain(chain_str: str) -> List[str]:
-    if not chain_str:
-        return []
-    return [x for x in chain_str.split(",") if x]
+    return QUERY_CACHE.get_or_compute(("chain", chain_str, CORPUS_VERSION), lambda: CHAINS.decode(chain_str))
 
 def chain_to_str(chain: List[str]) -> str:
-    return ",".join(chain)
+    return CHAINS.encode(chain)
 
 def get_chain() -> List[str]:
     qp = get_qp()
@@ -486,8 +281,33 @@ def get_chain() -> List[str]:
 def set_chain(chain: List[str]) -> None:
     st.session_state["viewed_papers"] = chain
 
+def trail_session() -> str:
+    """
+    Whose trail a step belongs to. Card links reload the page, which starts a
+    new Streamlit session, so this keys on the browser instead: a hash of
+    Streamlit's XSRF cookie (set once per browser session). Without it
+    (XSRF protection off, tests) it falls back to the Streamlit session.
+    """
+    try:
+        cookie = st.context.cookies.get("_streamlit_xsrf")
+    except Exception:
+        cookie = None
+    if isinstance(cookie, str) and cookie:
+        return "b" + hashlib.sha1(cookie.encode("utf-8")).hexdigest()[:16]
+    return st.session_state.setdefault("_trail_session", "s" + uuid.uuid4().hex[:16])
+
+def record_trail(chain: List[str]) -> None:
+    """Log the step that reached `chain` (once per session; the store dedupes across reloads)."""
+    if len(chain) < 2:
+        return
+    recorded = st.session_state.setdefault("_trail_recorded", set())
+    key = tuple(chain)
+    if key not in recorded:
+        recorded.add(key)
+        load_trail_store().record(trail_session(), chain)
+
 def start_new_chain() -> List[str]:
-    return ["seed_paper"]
+    return [SEED_CHAIN_ID]
 
 def append_to_chain(chain: List[str], paper_id: str) -> List[str]:
     if not chain or chain[-1] != paper_id:
@@ -495,28 +315,279 @@ def append_to_chain(chain: List[str], paper_id: str) -> List[str]:
     return chain
 
 def goto_landing():
-    set_qp(page="landing", paper=None, chain=None)
+    navigate(PAGE_FRAGMENT, page="landing", paper=None, chain=None)
 
 def goto_results(chain: List[str] | None = None):
     if chain is None:
         chain = get_chain()
-    set_qp(page="results", paper=None, chain=chain_to_str(chain))
+    navigate(PAGE_FRAGMENT, page="results", paper=None, chain=chain_to_str(chain))
 
 def goto_details(paper_id: str, chain: List[str]):
-    set_qp(page="details", paper=paper_id, chain=chain_to_str(chain))
+    navigate(PAGE_FRAGMENT, page="details", paper=paper_id, chain=chain_to_str(chain))
+
+def new_search(query: str) -> None:
+    st.session_state["query"] = query
+    chain = start_new_chain()
+    set_chain(chain)
+    goto_results(chain)
+
+def typed_text(key: str) -> str:
+    """What is in search box `key` (the current query until the user types)."""
+    text = (st.session_state.get(key) or {}).get("text")
+    return st.session_state.get("query", "") if text is None else text
+
+def submit_search(key: str) -> None:
+    new_search(typed_text(key))
+
+def submit_typed(key: str) -> None:
+    # Enter in the box; the trigger carries the text as it was then.
+    new_search(st.session_state[key].get("submit") or "")
+
+def pick_suggestion(key: str) -> None:
+    pid = st.session_state[key].get("pick")
+    if pid not in PAPERS:
+        return
+    title = PAPERS[pid].title
+    # The user named the paper: its title resolves to it, even if another paper shares it.
+    QUERY_CACHE.put((title.strip(), CORPUS_VERSION), pid)
+    new_search(title)
+
+def clear_history() -> None:
+    chain = start_new_chain()  # reset to seed-only
+    if get_qp().get("page") == "results":
+        # Only the sidebar and the card links (which embed the chain) change.
+        navigate([HISTORY_FRAGMENT, RESULTS_FRAGMENT], chain=chain_to_str(chain))
+    else:
+        goto_results(chain)
 
 # ----------------------------
 # UI helpers
 # ----------------------------
 
-def get_query_key(user_query: str) -> str:
+def _search_query(q: str) -> str | None:
+    if q in HARDCODED_RESULTS:
+        return q
+    seed = closest_title(q, HARDCODED_RESULTS)
+    if seed is not None:
+        return seed
+    row = SEARCH.resolve(q, PAPERS.store)
+    return PAPERS.store.ids[row] if row >= 0 else None
+
+@traced
+def resolve_query(user_query: str) -> str | None:
+    """Hardcoded demo query (typo-tolerant) or the id of the best matching corpus paper."""
     q = (user_query or "").strip()
-    return q if q in HARDCODED_RESULTS else DEFAULT_QUERY_KEY
+    if not q:
+        return None
+    return QUERY_CACHE.get_or_compute((q, CORPUS_VERSION), lambda: _search_query(q))
 
-def cited_papers(paper_id: str) -> List[Paper]:
-    ids = CITES.get(paper_id, [])
-    return [PAPERS[i] for i in ids if i in PAPERS]
+def get_query_key(user_query: str) -> str:
+    return resolve_query(user_query) or DEFAULT_QUERY_KEY
+
+@traced
+@memoized(RESULT_CACHE)
+def query_rows(query_key: str, corpus_version: str) -> np.ndarray:
+    # ORIGINAL ORDER (important!)
+    if query_key in HARDCODED_RESULTS:
+        return HARDCODED_RESULTS[query_key]
+    row = PAPERS.store.row_of(query_key)
+    return CITATIONS.cites(row) if row >= 0 else np.zeros(0, dtype=np.int32)
+
+@memoized(RESULT_CACHE)
+def query_scorer(query_key: str, corpus_version: str) -> QueryScorer:
+    """Graph score for rows reached from a query (or paper id): PageRank, relevance, shared references."""
+    return QueryScorer(PAPERS.store, CITATIONS, SCORES, query_rows(query_key, corpus_version), HOP_DECAY)
+
+@traced
+@memoized(RESULT_CACHE)
+def ai_groups(query_key: str, corpus_version: str) -> Grouping:
+    """AI mode: concept groups ordered by best score, papers sorted by score within each group."""
+    rows = query_rows(query_key, corpus_version)
+    rows_sorted, scores = query_scorer(query_key, corpus_version).rank(rows)
+    return group_ai(rows_sorted, scores)
+
+def expansion_levels(query_key: str, hops: int) -> Iterator[Level]:
+    """Levels 1..hops reachable from a query, streamed; replayed from RESULT_CACHE once complete."""
+    cache_key = ("expansion_levels", query_key, hops, CORPUS_VERSION)
+    cached = RESULT_CACHE.get(cache_key)
+    if cached is not None:
+        yield from cached
+        return
 
+    score = query_scorer(query_key, CORPUS_VERSION)
+    levels: List[Level] = []
+    if query_key in HARDCODED_RESULTS:
+        # The demo seed is not a corpus paper: its hardcoded results are hop 1.
+        seeds = HARDCODED_RESULTS[query_key]
+        first = score(seeds, 1)
+        order = np.argsort(-first, kind="stable")
+        levels.append(Level(1, seeds[order], first[order]))
+        yield levels[0]
+    else:
+        seeds = np.array([PAPERS.store.row_of(query_key)], dtype=np.int32)
+
+    # Fan-out is cut by relevance alone: the full score's coupling term would
+    # be computed for every neighbor of the frontier, not just the kept ones.
+    prune = relevance_decay(PAPERS.store.relevance, HOP_DECAY)
+    for level in expand(CITATIONS, seeds, hops - len(levels), fanout=EXPANSION_FANOUT,
+                        score=score, first_hop=len(levels) + 1, prune=prune):
+        levels.append(level)
+        yield level
+    RESULT_CACHE.put(cache_key, levels)
+
+@traced
+@memoized(RESULT_CACHE)
+def neighbor_rows(paper_id: str, reverse: bool, corpus_version: str) -> np.ndarray:
+    """Rows `paper_id` cites (or, if `reverse`, that cite it), best scored first."""
+    row = PAPERS.store.row_of(paper_id)
+    if row < 0:
+        return np.zeros(0, dtype=np.int32)
+    rows = CITATIONS.cited_by(row) if reverse else CITATIONS.cites(row)
+    return query_scorer(paper_id, corpus_version).rank(rows)[0]
+
+@traced
+def related_rows(paper_id: str) -> np.ndarray:
+    """Precomputed co-citation / coupling neighbors of `paper_id`, best first (an O(k) slice)."""
+    row = PAPERS.store.row_of(paper_id)
+    if row < 0:
+        return np.zeros(0, dtype=np.int32)
+    return RELATED.related(row)
+
+@traced
+@memoized(TRAIL_CACHE)
+def next_rows(paper_id: str, corpus_version: str) -> np.ndarray:
+    """Rows readers most often opened right after `paper_id` (recorded trails), most traversed first."""
+    nxt = [pid for pid, _ in load_trail_store().top_next(paper_id, k=10) if pid != paper_id]
+    return PAPERS.store.rows_of(nxt)
+
+def apply_filters(rows: np.ndarray, selection: Selection) -> np.ndarray:
+    return facet_index(CORPUS_VERSION).filter(rows, selection) if selection else rows
+
+def results_filter_rows(query_key: str, hops: int) -> np.ndarray:
+    """Every row the results page filters: the query's results, or each level of a multi-hop view."""
+    if hops > 1:
+        return np.concatenate([level.rows for level in expansion_levels(query_key, hops)])
+    return query_rows(query_key, CORPUS_VERSION)
+
+def details_filter_rows(paper_id: str) -> np.ndarray:
+    """Every row the details page filters: cited, citing, related and next papers."""
+    return np.concatenate([
+        neighbor_rows(paper_id, False, CORPUS_VERSION), neighbor_rows(paper_id, True, CORPUS_VERSION),
+        related_rows(paper_id), next_rows(paper_id, CORPUS_VERSION),
+    ])
+
+@traced
+def facet_counts(rows: np.ndarray, selection: Selection, topic: str) -> Dict[str, List[Tuple[str, int]]]:
+    """Filter option counts over `rows`, all the rows a page's filtered lists draw from."""
+    # Keyed by the rows themselves: the lists behind them (next papers) change as people browse.
+    cache_key = ("facet_counts", hashlib.sha1(np.asarray(rows, dtype=np.int32).tobytes()).digest(),
+                 tuple(sorted(selection.items())), topic, CORPUS_VERSION)
+    counts = RESULT_CACHE.get(cache_key)
+    if counts is None:
+        counts = facet_index(CORPUS_VERSION).counts(rows, selection, ("year", "venue", topic, "refs"))
+        RESULT_CACHE.put(cache_key, counts)
+    return counts
+
+def chain_seed_rows(chain: List[str]) -> np.ndarray:
+    """Corpus rows of the chain's papers; the demo seed stands for its hardcoded results."""
+    ids = [x for pid in chain for x in (SEED_RESULTS[SEED_TITLE] if pid == SEED_CHAIN_ID else [pid])]
+    return PAPERS.store.rows_of(ids)
+
+@traced
+@memoized(RESULT_CACHE)
+def export_size(chain_ref: str, depth: int, direction: str, corpus_version: str) -> int:
+    return subgraph_size(subgraph_hops(CITATIONS, chain_seed_rows(parse_chain(chain_ref)), depth, direction))
+
+def export_text(chain_ref: str, depth: int, direction: str, fmt: str) -> str:
+    hops = subgraph_hops(CITATIONS, chain_seed_rows(parse_chain(chain_ref)), depth, direction)
+    return "".join(export(PAPERS.store, CITATIONS, hops, fmt))
+
+def chain_graph(chain: List[str]) -> Tuple[Dict[str, dict], Dict[Tuple[str, str], str]]:
+    """
+    The chain's papers (last GRAPH_MAX_STEPS steps) and their best-scored
+    references and citing papers as nodes, and the citations among them as
+    (source, target) -> kind edges; steps along the chain are kind "step".
+    """
+    steps = chain[-GRAPH_MAX_STEPS:]
+    nodes: Dict[str, dict] = {}
+    edges: Dict[Tuple[str, str], str] = {}
+
+    def add(pid: str, kind: str) -> None:
+        if pid not in nodes:
+            p = PAPERS[pid]
+            nodes[pid] = {"id": pid, "kind": kind, "label": f"{truncate(p.title, 80)} ({p.year})"}
+
+    for pid in steps:
+        if pid == SEED_CHAIN_ID:
+            nodes[pid] = {"id": pid, "kind": "seed", "label": f"Seed: {truncate(SEED_TITLE, 80)}"}
+        elif pid in PAPERS:
+            add(pid, "chain")
+    if steps and steps[-1] in nodes and steps[-1] != SEED_CHAIN_ID:
+        nodes[steps[-1]]["kind"] = "current"
+
+    for pid in list(nodes):
+        if pid == SEED_CHAIN_ID:
+            for nid in PAPERS.store.ids.take(HARDCODED_RESULTS[DEFAULT_QUERY_KEY][:GRAPH_NEIGHBORS]):
+                add(nid, "neighbor")
+                edges[(pid, nid)] = "result"
+            continue
+        for reverse in (False, True):
+            for nid in PAPERS.store.ids.take(neighbor_rows(pid, reverse, CORPUS_VERSION)[:GRAPH_NEIGHBORS]):
+                add(nid, "neighbor")
+
+    paper_ids = [pid for pid in nodes if pid != SEED_CHAIN_ID]
+    rows = PAPERS.store.rows_of(paper_ids)
+    id_of = dict(zip(rows.tolist(), paper_ids))
+    pos, cited = CITATIONS.gather(rows)
+    for src, dst in zip(rows[pos].tolist(), cited.tolist()):
+        if dst in id_of:
+            edges[(id_of[src], id_of[dst])] = "cites"
+    for a, b in zip(steps, steps[1:]):
+        if a in nodes and b in nodes and a != b:
+            edges[(b, a) if (b, a) in edges else (a, b)] = "step"
+    return nodes, edges
+
+@traced
+def chain_scene(chain: List[str], fallback: Layout | None) -> Tuple[Layout, Scene]:
+    """
+    The chain graph, laid out. A new chain is warm-started from its parent's
+    layout (the chain before its last step) when that is cached, else from
+    `fallback` (the graph the browser shows now), else laid out from scratch.
+    """
+    def compute() -> Tuple[Layout, Scene]:
+        nodes, edges = chain_graph(chain)
+        pairs = list(edges)
+        parent = LAYOUT_CACHE.get(scene_key(chain[:-1])) if len(chain) > 1 else None
+        previous = parent[0] if parent is not None else fallback
+        layout = extend_layout(previous, list(nodes), pairs) if previous is not None else layout_graph(list(nodes), pairs)
+        for pid, (x, y) in layout.positions().items():
+            nodes[pid]["x"], nodes[pid]["y"] = round(x, 2), round(y, 2)
+        return layout, (nodes, {(a, b, kind) for (a, b), kind in edges.items()})
+
+    return LAYOUT_CACHE.get_or_compute(scene_key(chain), compute)
+
+def scene_key(chain: List[str]) -> tuple:
+    return ("chain_scene", chain_token(chain), CORPUS_VERSION)
+
+def prefetch_jobs(rows: np.ndarray, chain: List[str]) -> List[Job]:
+    """Warm what each paper's details page reads first, keyed by (paper, chain token)."""
+    size = get_page_size()
+    jobs: List[Job] = []
+    for row, pid in zip(rows.tolist(), PAPERS.store.ids.take(rows)):
+        extended = append_to_chain(chain, pid)
+        jobs.append(((pid, chain_token(extended)), [
+            lambda row=row: PAPERS.store.paper(row),
+            lambda pid=pid: PAPERS.store.papers(neighbor_rows(pid, False, CORPUS_VERSION)[:size]),
+            lambda pid=pid: PAPERS.store.papers(neighbor_rows(pid, True, CORPUS_VERSION)[:size]),
+            # Card links open the page unfiltered, in keyword mode.
+            lambda pid=pid: facet_counts(details_filter_rows(pid), {}, "keyword"),
+            lambda pid=pid: next_rows(pid, CORPUS_VERSION),
+            # The parent first (usually cached by now), so this is a warm start.
+            lambda extended=extended: chain_scene(chain, None) and chain_scene(extended, None),
+        ]))
+    return jobs
+
+@traced
 def inject_css() -> None:
     st.markdown(
         """
@@ -609,108 +680,112 @@ def inject_css() -> None:
 def render_back_left(label: str, where: str) -> None:
     left, _ = st.columns([1, 9])
     with left:
-        if st.button(label, use_container_width=True, key=f"back_{where}"):
-            if where == "landing":
-                goto_landing()
-            elif where == "results":
-                goto_results(get_chain())
-            else:
-                goto_landing()
-
-def render_landing_search(key: str) -> str:
-    with st.form(key="landing_form", clear_on_submit=False):
-        q = st.text_input(
-            "",
-            value=st.session_state.get("query", ""),
-            placeholder=f"e.g., {SEED_TITLE}",
-            key=key,
-            label_visibility="collapsed",
-        )
-        submitted = st.form_submit_button("Search", type="primary", use_container_width=True)
-        if submitted:
-            st.session_state["query"] = q
-            chain = start_new_chain()
-            set_chain(chain)
-            goto_results(chain)
-
-    return st.session_state.get(key, "")
-
-
+        if where == "results":
+            st.button(label, use_container_width=True, key=f"back_{where}", on_click=goto_results)
+        else:
+            st.button(label, use_container_width=True, key=f"back_{where}", on_click=goto_landing)
+
+@traced
+def suggestions(text: str) -> List[dict]:
+    """Search box suggestions for `text`: papers whose title, author or DOI starts with it."""
+    hits = typeahead_index(CORPUS_VERSION, SCORES.version).suggest(text)
+    papers = PAPERS.store.papers([row for row, _ in hits])
+    return [
+        {
+            "id": p.paper_id,
+            "title": truncate(p.title, 120),
+            "meta": f"{truncate(p.authors, 60)} • {p.doi if kind == 'doi' else p.venue} • {p.year}",
+            "kind": kind,
+        }
+        for p, (_, kind) in zip(papers, hits)
+    ]
 
-def render_results_topbar(key: str) -> str:
+@st.fragment(key=SEARCH_FRAGMENT)
+@rerun_root
+def search_box(key: str, placeholder: str) -> None:
     """
-    Results page: input on the left, Search + Back side-by-side on the right.
-    Both buttons are inside the SAME form to avoid weird container behavior.
+    The search input with as-you-type suggestions. Keystrokes rerun only this
+    fragment; submitting or picking a suggestion starts a new search.
     """
-    with st.form(key="results_form", clear_on_submit=False):
-        c1, c2, c3 = st.columns([7.5, 1.25, 1.25], vertical_alignment="bottom")
-
-
-        with c1:
-            q = st.text_input(
-                "Seed paper / query",
-                value=st.session_state.get("query", ""),
-                key=key,
-                placeholder="Type a paper title, DOI, or citation…",
-            )
+    text = typed_text(key)
+    typeahead_component()(
+        key=key,
+        data={
+            "value": st.session_state.get("query", ""),
+            "placeholder": placeholder,
+            "for": text,
+            "items": suggestions(text),
+        },
+        height="content",
+        on_text_change=lambda: None,  # the fragment rerun refreshes the suggestions
+        on_submit_change=lambda: submit_typed(key),
+        on_pick_change=lambda: pick_suggestion(key),
+    )
 
-        with c2:
-            do_search = st.form_submit_button("Search", type="primary", use_container_width=True)
+@traced
+def render_landing_search(key: str) -> str:
+    search_box(key, f"e.g., {SEED_TITLE}")
+    st.button("Search", type="primary", use_container_width=True, key="landing_search", on_click=submit_search, args=(key,))
+    return st.session_state.get("query", "")
 
-        with c3:
-            do_back = st.form_submit_button("Back", use_container_width=True)
+@traced
+def render_results_topbar(key: str) -> str:
+    """Results page: search box on the left, Search + Back side-by-side on the right."""
+    c1, c2, c3 = st.columns([7.5, 1.25, 1.25], vertical_alignment="bottom")
 
-        if do_back:
-            goto_landing()
+    with c1:
+        st.caption("Seed paper / query")
+        search_box(key, "Type a paper title, author or DOI…")
 
-        if do_search:
-            st.session_state["query"] = q
-            chain = start_new_chain()
-            set_chain(chain)
-            goto_results(chain)
+    with c2:
+        st.button("Search", type="primary", use_container_width=True, key="results_search", on_click=submit_search, args=(key,))
 
-    return st.session_state.get(key, "")
+    with c3:
+        st.button("Back", use_container_width=True, key="results_back", on_click=goto_landing)
 
+    return st.session_state.get("query", "")
 
-    # Put the Search button aligned on the right-ish side visually
-    # (Streamlit forms can’t “share” a submit button across columns cleanly, so we do a simple approach:
-    # keep it in the form above, and use a little CSS to make it look right.)
-    with mid:
-        st.write("")  # spacing
-        st.write("")  # spacing
-        st.caption(" ")  # keeps vertical alignment a bit steadier
 
-    with right:
-        st.write("")
-        st.write("")
-        if st.button("Back", use_container_width=True, key="results_back"):
-            goto_landing()
+@traced
+def render_paper_page(section: str, rows: np.ndarray, fragment: str) -> None:
+    """Cards for one window of `rows`; only that slice is materialized and sent."""
+    size = get_page_size()
+    offsets = get_offsets()
+    off = clamp_offset(offsets.get(section, 0), size, len(rows))
 
-    return st.session_state.get(key, "")
+    # One markdown delta for the whole window.
+    chain = get_chain()
+    st.markdown(cards_html(PAPERS.store.papers(rows[off:off + size]), CHAINS.links(chain)), unsafe_allow_html=True)
 
+    if len(rows) > size:
+        render_pager(section, off, size, len(rows), offsets, fragment)
 
-def paper_card(p: Paper) -> None:
-    chain = get_chain()
-    next_chain = append_to_chain(chain, p.paper_id)
+    load_prefetcher().schedule(trail_session(), prefetch_jobs(rows[off:off + PREFETCH_CARDS], chain))
 
-    st.markdown(
-        f"""
-        <a class="paper-card-link" href="?page=details&paper={p.paper_id}&chain={chain_to_str(next_chain)}" target="_self">
-          <div class="paper-card">
-            <div class="paper-title">{p.title}</div>
-            <div class="paper-meta">{p.authors} • {p.venue} • {p.year} • Relevance: {p.relevance:.2f}</div>
-            <div style="margin-bottom: 8px;">{p.snippet}</div>
-            <div><b>Keywords:</b> {", ".join(p.keywords)}</div>
-          </div>
-        </a>
-        """,
-        unsafe_allow_html=True,
-    )
+@traced
+def render_pager(section: str, off: int, size: int, total: int, offsets: Dict[str, int], fragment: str) -> None:
+    prev_col, info_col, next_col = st.columns([1, 3, 1], vertical_alignment="center")
+    with prev_col:
+        st.button(
+            "← Prev", key=f"pager_{section}_prev", disabled=off == 0, use_container_width=True,
+            on_click=navigate, args=(fragment,),
+            kwargs={"off": offsets_to_str({**offsets, section: max(off - size, 0)})},
+        )
+    with info_col:
+        st.caption(f"Showing {off + 1}–{min(off + size, total)} of {total}")
+    with next_col:
+        st.button(
+            "Next →", key=f"pager_{section}_next", disabled=off + size >= total, use_container_width=True,
+            on_click=navigate, args=(fragment,),
+            kwargs={"off": offsets_to_str({**offsets, section: off + size})},
+        )
 
+@traced
 def render_viewing_history() -> None:
     # Always render from URL chain
     chain = get_chain()
     set_chain(chain)
+    record_trail(chain)
 
     st.markdown('<div class="history-sidebar">', unsafe_allow_html=True)
     st.markdown("### 📚 Viewing History")
@@ -722,48 +797,248 @@ def render_viewing_history() -> None:
     else:
         st.caption(f"{len(viewed)} step(s) in your citation chain")
 
-        for idx in range(len(viewed) - 1, -1, -1):
-            paper_id = viewed[idx]
-            step_num = idx + 1
-
-            if paper_id == "seed_paper":
-                st.markdown(
-                    f"""
-                    <div class="history-item" style="background-color: rgba(255, 243, 205, 0.5); border-left: 3px solid #ff9800;">
-                      <div style="color: #ff9800; font-size: 0.7rem; font-weight: 600; margin-bottom: 0.25rem;">STEP {step_num} • SEED</div>
-                      <div class="history-item-title">🌱 {SEED_TITLE[:50]}{'...' if len(SEED_TITLE) > 50 else ''}</div>
-                      <div class="history-item-meta">Starting point</div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True,
-                )
-            elif paper_id in PAPERS:
-                p = PAPERS[paper_id]
-                st.markdown(
-                    f"""
-                    <a href="?page=details&paper={p.paper_id}&chain={chain_to_str(viewed[:idx+1])}" target="_self" style="text-decoration: none; color: inherit;">
-                      <div class="history-item">
-                        <div style="color: rgba(49, 51, 63, 0.5); font-size: 0.7rem; font-weight: 600; margin-bottom: 0.25rem;">STEP {step_num}</div>
-                        <div class="history-item-title">{p.title[:50]}{'...' if len(p.title) > 50 else ''}</div>
-                        <div class="history-item-meta">{p.authors[:25]}{'...' if len(p.authors) > 25 else ''} • {p.year}</div>
-                      </div>
-                    </a>
-                    """,
-                    unsafe_allow_html=True,
-                )
-
-        if st.button("Clear History", use_container_width=True, key="clear_history"):
-            goto_results(start_new_chain())  # reset to seed-only
+        papers = [PAPERS.get(pid) if pid != SEED_CHAIN_ID else None for pid in viewed]
+        st.markdown(history_html(viewed, papers, SEED_TITLE, CHAINS.links(viewed)), unsafe_allow_html=True)
 
+        st.button("Clear History", use_container_width=True, key="clear_history", on_click=clear_history)
+        render_chain_graph(viewed)
+        render_export(viewed)
+
+    render_recent_trails(viewed)
     st.markdown('</div>', unsafe_allow_html=True)
 
+@traced
+def render_recent_trails(current: List[str]) -> None:
+    """This browser's other recorded trails, each a link that resumes it."""
+    session = trail_session()
+    trails = load_trail_store()
+    items = []
+    for t in trails.recent_chains(session, limit=6):
+        chain = trails.resume(session, t["token"])
+        if not chain or chain == current or chain[-1] not in PAPERS:
+            continue
+        when = time.strftime("%b %d %H:%M", time.localtime(t["updated"]))
+        items.append((PAPERS[chain[-1]], chain_to_str(chain), len(chain), when))
+    if items:
+        with st.expander(f"Recent trails ({len(items[:5])})", expanded=False):
+            st.markdown(trails_html(items[:5]), unsafe_allow_html=True)
+
+def open_from_graph() -> None:
+    pid = st.session_state[GRAPH_KEY].get("open")
+    chain = get_chain()
+    if pid in chain:
+        # A step of the chain: back to it, like the history links.
+        chain = chain[:len(chain) - chain[::-1].index(pid)]
+        if pid == SEED_CHAIN_ID:
+            goto_results(chain)
+        else:
+            goto_details(pid, chain)
+    elif pid in PAPERS:
+        goto_details(pid, append_to_chain(chain, pid))
+
+def resync_graph() -> None:
+    # The browser lost the graph it was drawing (remounted); send it whole.
+    st.session_state.pop("_graph_view", None)
+
+@traced
+def render_chain_graph(chain: List[str]) -> None:
+    """
+    The chain and its neighbors as a graph. The browser keeps what it drew;
+    each rerun sends only the delta from the scene this session sent last.
+    """
+    shown = st.session_state.get("_graph_view")
+    layout, scene = chain_scene(chain, shown["layout"] if shown else None)
+    delta, browser = scene_delta(shown["scene"] if shown else None, scene)
+    base = shown["rev"] if shown else None
+    rev = base if base is not None and not any(delta.values()) else (base or 0) + 1
+    st.session_state["_graph_view"] = {"rev": rev, "scene": browser, "layout": layout}
+
+    with st.expander(f"Citation graph ({len(scene[0])} papers)", expanded=True):
+        st.caption("Your chain (highlighted) with each step's top references and citing papers. Click a paper to open it.")
+        chain_graph_component()(
+            key=GRAPH_KEY, data={"rev": rev, "base": base, **delta}, height=290,
+            on_open_change=open_from_graph, on_resync_change=resync_graph,
+        )
+
+_DIRECTION_LABELS = {"cites": "References", "cited_by": "Citing papers", "both": "Both"}
+
+@traced
+def render_export(chain: List[str]) -> None:
+    """Download the chain's citation neighborhood; the file is only built when the button is clicked."""
+    with st.expander("Export", expanded=False):
+        fmt = st.selectbox("Format", list(FORMATS), key="export_format", format_func=lambda f: f"{f} (.{FORMATS[f][1]})")
+        depth = st.select_slider("Citation hops", options=list(range(MAX_HOPS + 1)), value=1, key="export_depth")
+        direction = st.radio(
+            "Follow", DIRECTIONS, horizontal=True, key="export_direction", format_func=_DIRECTION_LABELS.get,
+        )
+        ref = chain_to_str(chain)
+        n = export_size(ref, depth, direction, CORPUS_VERSION)
+        if n > EXPORT_MAX_PAPERS:
+            st.caption(
+                f"{n:,} papers is too many to download here. Export them with "
+                f"`python manage.py export --chain {ref} --depth {depth} --direction {direction} --format {fmt} -o FILE`."
+            )
+            return
+        _, ext, mime = FORMATS[fmt]
+        st.caption(f"{n:,} paper(s) and the citations among them.")
+        st.download_button(
+            f"Download .{ext}", data=lambda: export_text(ref, depth, direction, fmt),
+            file_name=f"citation-chain.{ext}", mime=mime, on_click="ignore",
+            use_container_width=True, key="export_download",
+        )
+
+def render_online_lookup(q: str) -> None:
+    """Look `q` up online in the background; the app keeps rendering meanwhile."""
+    resolver = load_resolver()
+    if resolver is None or not looks_resolvable(q):
+        st.warning(f"No paper matched “{q}”. Showing the demo seed instead.")
+        return
+    lookups = st.session_state.setdefault("lookups", {})
+    if q not in lookups:
+        lookups[q] = resolver.submit([q])
+    if lookups[q].done():
+        render_lookup_result(q, lookups[q])
+    else:
+        lookup_status(q)
+
+@st.fragment(run_every=1.0)
+def lookup_status(q: str) -> None:
+    future = st.session_state["lookups"][q]
+    if future.done():
+        st.rerun()
+    st.info(f"No local match for “{q}”. Looking it up online… Showing the demo seed meanwhile.")
+
+def render_lookup_result(q: str, future) -> None:
+    try:
+        record = future.result()[0]
+    except Exception as e:
+        st.warning(f"No paper matched “{q}” and the online lookup failed ({e}). Showing the demo seed instead.")
+        return
+    if record is None:
+        st.warning(f"No paper matched “{q}”, locally or online. Showing the demo seed instead.")
+    else:
+        st.info(
+            f"Found online: “{record['title']}” ({record['doi']}). It is being added to the corpus "
+            "and will be searchable in about a minute. Showing the demo seed meanwhile."
+        )
+
+def get_hops() -> int:
+    try:
+        return min(max(int(get_qp().get("hops", "1")), 1), MAX_HOPS)
+    except ValueError:
+        return 1
+
+def select_hops(key: str) -> None:
+    navigate(RESULTS_FRAGMENT, hops=st.session_state[key].split("-")[0])
+
+@traced
+def render_hop_selector() -> int:
+    hops = get_hops()
+    options = [f"{h}-hop" for h in range(1, MAX_HOPS + 1)]
+    st.session_state["hops_choice"] = options[hops - 1]
+    st.radio(
+        "Citation depth", options, horizontal=True, key="hops_choice",
+        on_change=select_hops, args=("hops_choice",),
+    )
+    if hops > 1:
+        st.caption("Multi-hop views rank each level by citation score, halved for every extra hop.")
+    return hops
+
+_FILTER_TITLES = {"venue": "Venue", "keyword": "Keyword", "concept": "Concept", "refs": "References"}
+
+def select_years(fragment: str, key: str, bounds: Tuple[int, int]) -> None:
+    lo, hi = st.session_state[key]
+    navigate(fragment, off=None, year=None if (lo, hi) == bounds else f"{lo}-{hi}")
+
+def select_labels(fragment: str, name: str, key: str) -> None:
+    navigate(fragment, off=None, **{name: join_labels(st.session_state[key]) or None})
+
+def render_label_filter(name: str, counts: List[Tuple[str, int]], chosen: Tuple[str, ...], fragment: str) -> None:
+    n = dict(counts)
+    key = f"filter_{name}"
+    st.session_state[key] = list(chosen)
+    st.multiselect(
+        _FILTER_TITLES[name], [label for label, _ in counts] + [label for label in chosen if label not in n],
+        key=key, format_func=lambda label: f"{label} ({n.get(label, 0)})",
+        on_change=select_labels, args=(fragment, name, key),
+    )
+
+@traced
+def render_filters(counts: Dict[str, List[Tuple[str, int]]], selection: Selection, fragment: str) -> None:
+    """Year range, venue, keyword / concept and references filters; option counts follow the other filters."""
+    with st.expander(f"Filters  •  {len(selection)} active" if selection else "Filters", expanded=bool(selection)):
+        years = [int(y) for y, _ in counts["year"]]
+        if len(years) > 1:
+            bounds = (years[0], years[-1])
+            lo, hi = parse_year_range(get_qp().get("year", "")) or bounds
+            st.session_state["filter_year"] = (min(max(lo, bounds[0]), bounds[1]), max(min(hi, bounds[1]), bounds[0]))
+            st.slider(
+                "Year", *bounds, key="filter_year",
+                on_change=select_years, args=(fragment, "filter_year", bounds),
+            )
+        for col, name in zip(st.columns(3), [name for name in counts if name != "year"]):
+            with col:
+                render_label_filter(name, counts[name], tuple(selection.get(name, ())), fragment)
+        if selection:
+            st.button(
+                "Clear filters", key="filter_clear", on_click=navigate, args=(fragment,),
+                kwargs={"off": None, **{name: None for name in FILTER_PARAMS}},
+            )
+
+def render_filtered_page(section: str, rows: np.ndarray, selection: Selection, fragment: str) -> None:
+    shown = apply_filters(rows, selection)
+    if len(shown):
+        render_paper_page(section, shown, fragment)
+    else:
+        st.caption(f"None of these {len(rows)} papers match the filters.")
+
+@traced
+def render_expansion(query_key: str, hops: int, selection: Selection) -> None:
+    best = st.container()  # filled once every level has streamed in
+    shown: List[Level] = []
+    for level in expansion_levels(query_key, hops):
+        rows = apply_filters(level.rows, selection)
+        st.markdown(f"#### {level.hop}-hop  •  {len(rows)} paper(s)")
+        if len(rows):
+            render_paper_page(f"h{level.hop}", rows, RESULTS_FRAGMENT)
+        keep = np.isin(level.rows, rows)
+        shown.append(Level(level.hop, level.rows[keep], level.scores[keep]))
+
+    top = top_k(shown, BEST_ACROSS_HOPS)
+    if top:
+        with best:
+            with st.expander(f"Best {len(top)} across {hops} hops", expanded=False):
+                render_paper_page("best", np.array([row for _, row, _ in top], dtype=np.int32), RESULTS_FRAGMENT)
+
+def render_cache_stats() -> None:
+    # Opt-in via ?debug=1: confirms that reruns are served from cache.
+    if get_qp().get("debug") != "1":
+        return
+    with st.expander("Cache statistics", expanded=False):
+        st.dataframe(all_stats(), hide_index=True, use_container_width=True)
+        st.caption("Prefetch (hits: opened pages that were ready; late: still being prepared)")
+        st.dataframe([load_prefetcher().stats()], hide_index=True, use_container_width=True)
+
+def render_rerun_timings() -> None:
+    # Opt-in via ?debug=1 (see tracing.py); the current rerun is still running, so
+    # the latest entry is the previous one.
+    if get_qp().get("debug") != "1":
+        return
+    traces = recent_traces()
+    with st.expander("Rerun timings", expanded=False):
+        if not traces:
+            st.caption("No traced reruns yet.")
+            return
+        st.dataframe(summary_rows(traces), hide_index=True, use_container_width=True)
+        st.caption(f"Spans of the last {traces[0]['root']} rerun")
+        st.dataframe(span_rows(traces[0]), hide_index=True, use_container_width=True)
+
 # ----------------------------
 # Pages
 # ----------------------------
 
+@traced
 def page_landing() -> None:
-    inject_css()
-
     left, mid, right = st.columns([1.2, 2.6, 1.2])  # tweak middle to change width
     with mid:
         st.markdown('<div class="landing-wrap">', unsafe_allow_html=True)
@@ -772,66 +1047,81 @@ def page_landing() -> None:
         render_landing_search(key="landing_query")
         st.markdown("</div>", unsafe_allow_html=True)
 
+@traced
 def page_results() -> None:
-    inject_css()
-
     query_text = render_results_topbar(key="results_query")
     st.divider()
 
     main_col, history_col = st.columns([3, 1])
 
     with main_col:
-        mode = st.toggle("AI mode (merge similar keywords)", value=False)
-        st.caption(
-            "Non-AI mode groups papers by exact keywords (original order). "
-            "AI mode merges related keywords into concepts (sorted by relevance)."
-        )
-
-        query_key = get_query_key(query_text)
-
-        # ORIGINAL ORDER (important!)
-        papers = HARDCODED_RESULTS.get(
-            query_key,
-            HARDCODED_RESULTS[DEFAULT_QUERY_KEY]
-        )
+        results_list(query_text)
+    with history_col:
+        history_panel()
 
-        st.markdown(
-            f"### Papers cited by: _{st.session_state.get('query', query_text) or 'your query'}_"
-        )
-        st.write(f"Showing **{len(papers)}** cited papers (hardcoded demo set).")
 
-        if mode:
-            # ✅ AI MODE → SORT + GROUP
-            papers_sorted = sorted(papers, key=lambda p: p.relevance, reverse=True)
+@st.fragment(key=RESULTS_FRAGMENT)
+@rerun_root
+def results_list(query_text: str) -> None:
+    mode = st.toggle(
+        "AI mode (merge similar keywords)", value=False, key="ai_mode",
+        on_change=navigate, args=(RESULTS_FRAGMENT,),
+    )
+    st.caption(
+        "Non-AI mode groups papers by exact keywords (original order). "
+        "AI mode merges related keywords into concepts (sorted by citation score: PageRank, relevance, shared references)."
+    )
+    hops = render_hop_selector()
 
-            groups = group_ai(papers_sorted)
+    query_key = resolve_query(query_text)
+    if query_key is None:
+        if query_text.strip():
+            render_online_lookup(query_text.strip())
+        query_key = DEFAULT_QUERY_KEY
 
-            def group_score(item: Tuple[str, List[Paper]]) -> float:
-                _, ps = item
-                return max((p.relevance for p in ps), default=0.0)
+    rows = query_rows(query_key, CORPUS_VERSION)
+    selection = get_filters()
+    # Counts cover every list below; multi-hop levels are only known once they have streamed in.
+    filters = st.container()
 
-            groups_ordered = sorted(groups.items(), key=group_score, reverse=True)
+    st.markdown(
+        f"### Papers cited by: _{st.session_state.get('query', query_text) or 'your query'}_"
+    )
+    shown = apply_filters(rows, selection)
+    count = f"**{len(shown)}** of {len(rows)}" if selection else f"**{len(rows)}**"
+    if query_key in HARDCODED_RESULTS:
+        st.write(f"Showing {count} cited papers (hardcoded demo set).")
+    else:
+        st.write(f"Showing {count} papers cited by _{PAPERS[query_key].title}_.")
+
+    if hops > 1:
+        # ✅ MULTI-HOP → levels stream in as the BFS reaches them
+        render_expansion(query_key, hops, selection)
+
+    elif mode:
+        # ✅ AI MODE → SORT + GROUP (memoized per query key / corpus version)
+        for i, (group_name, members) in enumerate(ai_groups(query_key, CORPUS_VERSION).items()):
+            members = apply_filters(members, selection)
+            if not len(members):
+                continue
+            with st.expander(
+                f"{group_name}  •  {len(members)} paper(s)",
+                expanded=True
+            ):
+                render_paper_page(f"g{i}", members, RESULTS_FRAGMENT)
 
-            for group_name, group_papers in groups_ordered:
-                with st.expander(
-                    f"{group_name}  •  {len(group_papers)} paper(s)",
-                    expanded=True
-                ):
-                    for p in sorted(group_papers, key=lambda x: x.relevance, reverse=True):
-                        paper_card(p)
+    else:
+        # ✅ NON-AI MODE → NO SORTING
+        render_filtered_page("all", rows, selection, RESULTS_FRAGMENT)
 
-        else:
-            # ✅ NON-AI MODE → NO SORTING
-           for p in papers:
-                paper_card(p)
-    with history_col:
-        render_viewing_history()
+    with filters:
+        render_filters(
+            facet_counts(results_filter_rows(query_key, hops), selection, topic_facet()), selection, RESULTS_FRAGMENT,
+        )
 
 
+@traced
 def page_details(paper_id: str) -> None:
-    st.set_page_config(page_title="Paper • Citation Chaining Prototype", layout="wide")
-    inject_css()
-
     render_back_left("← Back", "results")
 
     if paper_id not in PAPERS:
@@ -841,34 +1131,94 @@ def page_details(paper_id: str) -> None:
     main_col, history_col = st.columns([3, 1])
 
     with main_col:
-        p = PAPERS[paper_id]
-        st.markdown(f"# {p.title}")
-        st.caption(f"{p.authors} • {p.venue} • {p.year}")
+        details_pane(paper_id)
+    with history_col:
+        history_panel()
+
 
-        st.markdown("### Keywords")
-        st.write(", ".join(p.keywords))
+@st.fragment(key=DETAILS_FRAGMENT)
+@rerun_root
+def details_pane(paper_id: str) -> None:
+    p = PAPERS[paper_id]
+    st.markdown(f"# {p.title}")
+    st.caption(f"{p.authors} • {p.venue} • {p.year}")
 
-        st.markdown("### Abstract")
-        st.write(p.abstract)
+    st.markdown("### Keywords")
+    st.write(", ".join(p.keywords))
 
+    st.markdown("### Abstract")
+    st.write(p.abstract)
+
+    st.divider()
+    selection = get_filters()
+    render_filters(
+        facet_counts(details_filter_rows(p.paper_id), selection, topic_facet()), selection, DETAILS_FRAGMENT,
+    )
+
+    st.markdown("### Papers this paper cites")
+    kids = neighbor_rows(p.paper_id, False, CORPUS_VERSION)
+
+    if not len(kids):
+        st.info("No cited papers in the demo graph for this paper.")
+    else:
+        render_filtered_page("cites", kids, selection, DETAILS_FRAGMENT)
+
+    st.divider()
+    st.markdown("### Papers that cite this paper")
+    parents = neighbor_rows(p.paper_id, True, CORPUS_VERSION)
+
+    if not len(parents):
+        st.info("No papers in the demo graph cite this paper.")
+    else:
+        render_filtered_page("cited_by", parents, selection, DETAILS_FRAGMENT)
+
+    st.divider()
+    st.markdown("### Related papers")
+    st.caption("Cited alongside this paper (co-citation) or citing the same works (bibliographic coupling).")
+    related = related_rows(p.paper_id)
+
+    if not len(related):
+        st.info("No co-cited or reference-sharing papers in the demo graph.")
+    else:
+        render_filtered_page("related", related, selection, DETAILS_FRAGMENT)
+
+    nxt = next_rows(p.paper_id, CORPUS_VERSION)
+    if len(nxt):
         st.divider()
-        st.markdown("### Papers this paper cites")
-        kids = cited_papers(p.paper_id)
+        st.markdown("### Where readers went next")
+        st.caption("Papers most often opened right after this one, across recorded research trails.")
+        render_filtered_page("next", nxt, selection, DETAILS_FRAGMENT)
 
-        if not kids:
-            st.info("No cited papers in the demo graph for this paper.")
-        else:
-            for cp in sorted(kids, key=lambda x: x.relevance, reverse=True):
-                paper_card(cp)
 
-    with history_col:
-        render_viewing_history()
+@st.fragment(key=HISTORY_FRAGMENT)
+@rerun_root
+def history_panel() -> None:
+    render_viewing_history()
+    render_cache_stats()
+    render_rerun_timings()
 
 # ----------------------------
 # Router (query param based)
 # ----------------------------
 
+@rerun_root
 def main():
+    # Full runs only (first load, browser navigation via card links). Widget
+    # navigation reruns the page fragment below, or a narrower one.
+    st.set_page_config(page_title="Citation Chaining Prototype", layout="wide")
+
+    if "query" not in st.session_state:
+        st.session_state["query"] = ""
+    if "viewed_papers" not in st.session_state:
+        st.session_state["viewed_papers"] = []
+
+    inject_css()
+    page_body()
+
+
+@st.fragment(key=PAGE_FRAGMENT)
+@rerun_root
+def page_body() -> None:
     qp = get_qp()
     page = qp.get("page", "landing")
     paper = qp.get("paper")
@@ -879,12 +1229,13 @@ def main():
     elif page == "details" and paper:
         title = "Paper • Citation Chaining Prototype"
 
-    st.set_page_config(page_title=title, layout="wide")
+    st.set_page_config(page_title=title)
 
-    if "query" not in st.session_state:
-        st.session_state["query"] = ""
-    if "viewed_papers" not in st.session_state:
-        st.session_state["viewed_papers"] = []
+    # Navigation: score the prefetch, then drop what the previous page queued.
+    prefetcher = load_prefetcher()
+    if page == "details" and paper:
+        prefetcher.visited((paper, chain_token(get_chain())))
+    prefetcher.cancel(trail_session())
 
     if page == "results":
         page_results()
@@ -0,0 +1,11 @@
+"""
+Benchmarks over synthetic corpora.
+
+    python -m bench.run [--sizes 1e3,1e4,1e5] [--reps 7] [--no-pages]
+    python -m bench.compare bench/results/OLD.json bench/results/NEW.json
+
+`bench.synth` generates (and caches under data/bench/) a corpus of the
+requested size with a power-law citation graph; `bench.run` times the hot
+paths and full page runs against each size and writes one JSON file per
+commit to bench/results/; `bench.compare` diffs two of those files.
+"""
@@ -0,0 +1,72 @@
+# bench/compare.py
+"""
+Diff two bench/results files.
+
+    python -m bench.compare OLD.json NEW.json [--metric median_ms] [--threshold 1.2]
+
+Prints new/old per benchmark and size; exits 1 if any benchmark slowed down
+by more than `threshold` (and by more than `--min-delta-ms`, so sub-microsecond
+jitter on tiny functions is not reported as a regression).
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+DEFAULT_THRESHOLD = 1.2
+DEFAULT_MIN_DELTA_MS = 0.05
+
+
+def _rows(old: dict, new: dict, metric: str) -> Iterator[Tuple[str, str, Optional[float], Optional[float]]]:
+    for n in sorted(set(old["sizes"]) | set(new["sizes"]), key=int):
+        a, b = old["sizes"].get(n, {}), new["sizes"].get(n, {})
+        for group in ("functions", "pages"):
+            ga, gb = a.get(group, {}), b.get(group, {})
+            for name in list(dict.fromkeys([*ga, *gb])):
+                yield n, name, ga.get(name, {}).get(metric), gb.get(name, {}).get(metric)
+
+
+def compare(old: dict, new: dict, metric: str = "median_ms", threshold: float = DEFAULT_THRESHOLD,
+            min_delta_ms: float = DEFAULT_MIN_DELTA_MS) -> List[str]:
+    """Print the comparison table; return the regressed "<name> n=<size>" entries."""
+    print(f"{old['commit']} -> {new['commit']}  ({metric})")
+    for n in sorted(set(old["sizes"]) & set(new["sizes"]), key=int):
+        a, b = ((c.get("corpus_version"), c.get("citations_version")) for c in
+                (old["sizes"][n]["corpus"], new["sizes"][n]["corpus"]))
+        if a != b:
+            print(f"  note: the n={n} corpora differ (regenerated?); timings are not comparable")
+    regressions: List[str] = []
+    for n, name, a, b in _rows(old, new, metric):
+        if a is None or b is None:
+            print(f"  n={n:<8} {name:<28} {'-' if a is None else f'{a:.3f}':>10} -> {'-' if b is None else f'{b:.3f}':>10}")
+            continue
+        ratio = b / a if a > 0 else float("inf")
+        flag = ""
+        if ratio > threshold and b - a > min_delta_ms:
+            flag = "  REGRESSION"
+            regressions.append(f"{name} n={n}")
+        elif ratio < 1 / threshold and a - b > min_delta_ms:
+            flag = "  faster"
+        print(f"  n={n:<8} {name:<28} {a:>10.3f} -> {b:>10.3f}  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.compare", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("old", type=Path)
+    parser.add_argument("new", type=Path)
+    parser.add_argument("--metric", default="median_ms", choices=["min_ms", "median_ms", "mean_ms", "first_ms"])
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="slowdown ratio that counts as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS)
+    args = parser.parse_args(argv)
+
+    old, new = (json.loads(p.read_text()) for p in (args.old, args.new))
+    regressions = compare(old, new, args.metric, args.threshold, args.min_delta_ms)
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
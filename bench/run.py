@@ -0,0 +1,306 @@
+# bench/run.py
+"""
+Time the app's hot paths and full page runs on synthetic corpora.
+
+    python -m bench.run [--sizes 1e3,1e4,1e5] [--reps 7] [--no-pages] [--out FILE]
+
+Every size runs in a child process with CCP_DATA_DIR pointing at that size's
+stores (app.py binds its stores at import). Function benchmarks call app.py's
+helpers directly, bypassing the result caches; paper cards and the viewing
+history are timed through the HTML they send (`cards_html`, `history_html`). Page benchmarks run app.py headless through
+streamlit.testing's AppTest: one cold run, then `reps` reruns.
+
+The child's resident memory afterwards (heap vs mmap'd file pages) is
+recorded too. Results go to bench/results/<commit>.json (per-call seconds as ms; min,
+median and mean over the samples); diff two files with `python -m bench.compare`.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_PATH = ROOT / "app.py"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+DEFAULT_SIZES = "1e3,1e4,1e5"
+DEFAULT_REPS = 7
+CHAIN_STEPS = 20
+# Samples shorter than this are repeated and averaged (like timeit's autorange).
+MIN_SAMPLE_S = 0.005
+PAGE_TIMEOUT_S = 300
+
+
+# ----------------------------
+# Timing
+# ----------------------------
+
+def _summary(samples: List[float], number: int) -> Dict[str, float]:
+    return {
+        "reps": len(samples),
+        "number": number,
+        "min_ms": round(min(samples) * 1e3, 4),
+        "median_ms": round(statistics.median(samples) * 1e3, 4),
+        "mean_ms": round(statistics.fmean(samples) * 1e3, 4),
+    }
+
+
+def measure(fn: Callable[[], object], reps: int, setup: Optional[Callable[[], object]] = None) -> Dict[str, float]:
+    """Per-call time of `fn`. With a `setup` (run before every call) each sample is a single call."""
+    number = 1
+    if setup is None:
+        fn()  # warm-up
+        while number < 100_000:
+            t0 = time.perf_counter()
+            for _ in range(number):
+                fn()
+            if time.perf_counter() - t0 >= MIN_SAMPLE_S:
+                break
+            number *= 10
+
+    samples: List[float] = []
+    for _ in range(reps):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - t0) / number)
+    return _summary(samples, number)
+
+
+# ----------------------------
+# Child: one corpus size
+# ----------------------------
+
+def _function_benchmarks(app, reps: int) -> Dict[str, dict]:
+    import numpy as np
+
+    from expansion import expand, relevance_decay
+    from render import cards_html, history_html
+
+    store, citations = app.PAPERS.store, app.CITATIONS
+    hub = int(np.argmax(citations.out_degree()))
+    hub_id = store.ids[hub]
+    most_cited_id = store.ids[int(np.argmax(citations.in_degree()))]
+    score = relevance_decay(store.relevance, app.HOP_DECAY)
+
+    def expand3():
+        return list(expand(citations, np.array([hub], dtype=np.int32), 3,
+                           fanout=app.EXPANSION_FANOUT, score=score))
+
+    rows1 = citations.cites(hub)
+    rows1_sorted = rows1[np.argsort(-store.relevance[rows1], kind="stable")]
+    rows3 = np.concatenate([level.rows for level in expand3()])
+    rows3_sorted = rows3[np.argsort(-store.relevance[rows3], kind="stable")]
+
+    # A CHAIN_STEPS-long history: from the query, keep following the newest cited paper.
+    chain = app.start_new_chain() + [hub_id]
+    while len(chain) < CHAIN_STEPS:
+        cited = citations.cites(store.row_of(chain[-1]))
+        if not len(cited):
+            break
+        chain.append(store.ids[int(cited.max())])
+    encoded = app.chain_to_str(chain)
+    page_25 = store.papers(rows3[:app.DEFAULT_PAGE_SIZE])
+    page_200 = store.papers(rows3[:app.MAX_PAGE_SIZE])
+    history = [None] + store.papers(store.rows_of(chain[1:]))
+    app.concept_tables(app.CORPUS_VERSION)  # load once, outside the timings
+    facets = app.facet_index(app.CORPUS_VERSION)
+    selection = {"venue": facets.labels["venue"][:1], "year": facets.labels["year"][-10:], "refs": facets.labels["refs"][:1]}
+    typeahead = app.typeahead_index(app.CORPUS_VERSION, app.SCORES.version)
+    typed = store.columns["title"][hub][:12]
+
+    cases: Dict[str, tuple] = {
+        "resolve_query": (lambda: app._search_query(hub_id), None),
+        "resolve_query[title]": (lambda: app._search_query(store.columns["title"][hub]), None),
+        "expand[3hop]": (expand3, None),
+        "group_non_ai[1hop]": (lambda: app.group_non_ai(rows1), None),
+        "group_ai[1hop]": (lambda: app.group_ai(rows1_sorted), None),
+        "group_non_ai[3hop]": (lambda: app.group_non_ai(rows3), None),
+        "group_ai[3hop]": (lambda: app.group_ai(rows3_sorted), None),
+        "neighbor_rows[most_cited]": (lambda: app.neighbor_rows.__wrapped__(most_cited_id, True, app.CORPUS_VERSION), None),
+        "related_rows[most_cited]": (lambda: app.related_rows(most_cited_id), None),
+        "facet_counts[3hop]": (lambda: facets.counts(rows3, selection, ("year", "venue", "keyword", "refs")), None),
+        "facet_filter[3hop]": (lambda: facets.filter(rows3, selection), None),
+        "typeahead[1char]": (lambda: typeahead.suggest(typed[:1]), None),
+        "typeahead[12chars]": (lambda: typeahead.suggest(typed), None),
+        "suggestions[12chars]": (lambda: app.suggestions(typed), None),
+        "cited_papers[cold]": (lambda: store.papers(rows1), store._materialized.clear),
+        "cited_papers[warm]": (lambda: store.papers(rows1), None),
+        "paper_card[25]": (lambda: cards_html(page_25, app.CHAINS.links(chain)), None),
+        "paper_card[200]": (lambda: cards_html(page_200, app.CHAINS.links(chain)), None),
+        "render_viewing_history[20]": (lambda: history_html(chain, history, app.SEED_TITLE, app.CHAINS.links(chain)), None),
+        "parse_chain[20]": (lambda: app.CHAINS.decode(encoded), None),
+    }
+    results = {name: measure(fn, reps, setup) for name, (fn, setup) in cases.items()}
+    results["_inputs"] = {
+        "query": hub_id,
+        "most_cited": most_cited_id,
+        "rows_1hop": int(len(rows1)),
+        "rows_3hop": int(len(rows3)),
+        "cited_by_most_cited": int(len(citations.cited_by(store.row_of(most_cited_id)))),
+        "chain": encoded,
+    }
+    return results
+
+
+def _page_benchmarks(inputs: dict, reps: int) -> Dict[str, dict]:
+    from streamlit.testing.v1 import AppTest
+
+    base = {"chain": inputs["chain"], "size": "25"}
+    cases = {
+        "page_results": ({**base, "page": "results"}, False),
+        "page_results[ai]": ({**base, "page": "results"}, True),
+        "page_results[3hop]": ({**base, "page": "results", "hops": "3"}, False),
+        "page_details": ({**base, "page": "details", "paper": inputs["most_cited"]}, False),
+    }
+    results: Dict[str, dict] = {}
+    for name, (params, ai_mode) in cases.items():
+        at = AppTest.from_file(str(APP_PATH), default_timeout=PAGE_TIMEOUT_S)
+        at.session_state["query"] = inputs["query"]
+        for k, v in params.items():
+            at.query_params[k] = v
+        t0 = time.perf_counter()
+        at.run()
+        if ai_mode:
+            at.toggle(key="ai_mode").set_value(True).run()
+        first = time.perf_counter() - t0
+
+        samples: List[float] = []
+        for _ in range(reps):
+            t0 = time.perf_counter()
+            at.run()
+            samples.append(time.perf_counter() - t0)
+        results[name] = {
+            **_summary(samples, 1),
+            "first_ms": round(first * 1e3, 4),
+            "markdown_bytes": sum(len(m.value.encode()) for m in at.markdown),
+            "exceptions": [e.message for e in at.exception],
+        }
+    return results
+
+
+def _process_memory() -> Dict[str, float]:
+    """
+    This process's resident MB: heap (anonymous, per process) and file-backed
+    (mmap'd stores and libraries, shared through the page cache). Linux; {} elsewhere.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            kb = {line.split(":")[0]: int(line.split()[1]) for line in f if line.split()[-1] == "kB"}
+    except OSError:
+        return {}
+    return {
+        "rss_mb": round(kb["Rss"] / 1024, 1),
+        "heap_mb": round(kb["Anonymous"] / 1024, 1),
+        "file_mb": round((kb["Rss"] - kb["Anonymous"]) / 1024, 1),
+    }
+
+
+def run_child(reps: int, pages: bool) -> dict:
+    # Importing app.py outside `streamlit run` logs a warning per cached call.
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    import app
+
+    functions = _function_benchmarks(app, reps)
+    inputs = functions.pop("_inputs")
+    pages_result = _page_benchmarks(inputs, reps) if pages else {}
+    return {
+        "inputs": inputs,
+        "functions": functions,
+        "pages": pages_result,
+        "memory": _process_memory(),
+    }
+
+
+# ----------------------------
+# Parent: corpora, child processes, result file
+# ----------------------------
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _environment() -> dict:
+    import numpy
+    import streamlit
+
+    commit = _git("rev-parse", "--short", "HEAD") or "unknown"
+    return {
+        "commit": commit,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "streamlit": streamlit.__version__,
+        "machine": f"{platform.system()} {platform.machine()}",
+        "cpus": os.cpu_count(),
+    }
+
+
+def parse_sizes(text: str) -> List[int]:
+    return [int(float(s)) for s in text.split(",") if s.strip()]
+
+
+def run(sizes: List[int], reps: int, pages: bool, seed: int = 0) -> dict:
+    from bench.synth import ensure_corpus
+
+    report = {**_environment(), "reps": reps, "seed": seed, "sizes": {}}
+    for n in sizes:
+        t0 = time.perf_counter()
+        corpus_dir, info = ensure_corpus(n, seed)
+        print(f"[bench] n={n}: corpus ready ({time.perf_counter() - t0:.1f}s), running benchmarks", file=sys.stderr)
+
+        cmd = [sys.executable, "-m", "bench.run", "--child", "--reps", str(reps)]
+        if not pages:
+            cmd.append("--no-pages")
+        env = {**os.environ, "CCP_DATA_DIR": str(corpus_dir)}
+        proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise SystemExit(f"bench: n={n} failed:\n{proc.stderr}")
+        report["sizes"][str(n)] = {"corpus": info, **json.loads(proc.stdout)}
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m bench.run", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"comma-separated paper counts (default {DEFAULT_SIZES})")
+    parser.add_argument("--reps", type=int, default=DEFAULT_REPS, help="samples per benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic corpus seed")
+    parser.add_argument("--no-pages", action="store_true", help="skip the AppTest page runs")
+    parser.add_argument("--out", type=Path, default=None, help="result file (default: bench/results/<commit>.json)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        json.dump(run_child(args.reps, not args.no_pages), sys.stdout)
+        return
+
+    report = run(parse_sizes(args.sizes), args.reps, not args.no_pages, args.seed)
+    out = args.out or RESULTS_DIR / f"{report['commit']}{'-dirty' if report['dirty'] else ''}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2) + "\n")
+
+    for n, result in report["sizes"].items():
+        print(f"n={n}  ({result['corpus']['edges']} edges, {result['corpus']['keywords']} keywords)")
+        if result.get("memory"):
+            print("  memory: " + ", ".join(f"{k} {v}" for k, v in result["memory"].items()))
+        for name, r in {**result["functions"], **result["pages"]}.items():
+            print(f"  {name:<28} median {r['median_ms']:>10.3f} ms   min {r['min_ms']:>10.3f} ms")
+    print(f"results: {out}")
+
+
+if __name__ == "__main__":
+    main()
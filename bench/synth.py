@@ -0,0 +1,253 @@
+# bench/synth.py
+"""
+Synthetic corpora with a power-law citation graph.
+
+Papers are laid out oldest first and only cite earlier rows. Each paper's
+reference count is log-normal; targets are drawn in proportion to a Pareto
+"fitness", so in-degrees follow a power law (a few papers collect most of the
+citations, most are cited once or never). Keywords come from the demo
+vocabulary: every paper takes most of its keywords from one seed paper's
+topic plus a Zipf-distributed draw over the whole vocabulary, whose long tail
+is made of compounds of the seed keywords' terms.
+
+The stores are written with the same section layouts as manage.py builds,
+straight from numpy arrays, so 1e6-paper corpora never hold one `Paper` per row.
+Building the search and concept indexes still dominates: a 1e6-paper corpus
+takes a few minutes and ~5 GB of memory, once (it is cached under data/bench/).
+"""
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from citation_index import CITATIONS_FILE, CitationIndex, write_citations
+from concepts import CONCEPTS_FILE, ConceptModel, cluster_keywords, write_concepts
+from corpus_store import CORPUS_FILE, CORPUS_FORMAT, CorpusStore, TEXT_COLUMNS
+from facets import FACETS_FILE, write_facets
+from related import RELATED_FILE, write_related
+from scoring import SCORES_FILE, ScoreTable, write_scores
+from search import SEARCH_FILE, tokenize, write_search_index
+from seed_data import AI_CANONICAL, SEED_PAPERS
+from storage import data_path, open_cached, sort_order, string_sections, write_sections
+from typeahead import TYPEAHEAD_FILE, write_typeahead
+
+# Bump when the generated data changes, so cached corpora are rebuilt.
+GENERATOR_VERSION = 2
+MARKER_FILE = "synth.json"
+
+MEAN_REFS = 12.0
+MAX_REFS = 200
+FITNESS_SHAPE = 2.0  # Pareto tail index of citation attractiveness
+KEYWORD_ZIPF = 1.1
+
+TITLE_WORDS = 8
+ABSTRACT_WORDS = 24
+SNIPPET_WORDS = 12
+
+
+def corpus_dir(n: int, seed: int = 0) -> Path:
+    return data_path("bench") / f"n{n}-s{seed}"
+
+
+# ----------------------------
+# Vocabulary
+# ----------------------------
+
+def _vocabulary(n: int) -> Tuple[List[str], List[List[int]]]:
+    """Keywords (seed keywords first, then compound tail) and each seed paper's keyword ids."""
+    seed_keywords = list(dict.fromkeys(kw for p in SEED_PAPERS.values() for kw in p.keywords))
+    seed_keywords += [kw for kw in AI_CANONICAL if kw not in seed_keywords]
+    terms = list(dict.fromkeys(t for kw in seed_keywords for t in kw.lower().split()))
+
+    tail_size = int(4 * np.sqrt(n))
+    pairs = [f"{a} {b}" for a in terms for b in terms if a != b]
+    tail = [kw for kw in pairs if kw not in seed_keywords][:tail_size]
+
+    ids = {kw: i for i, kw in enumerate(seed_keywords)}
+    topics = [[ids[kw] for kw in p.keywords] for p in SEED_PAPERS.values()]
+    return seed_keywords + tail, topics
+
+
+def _words() -> np.ndarray:
+    text = " ".join(f"{p.title} {p.abstract}" for p in SEED_PAPERS.values())
+    return np.array(sorted({t for t in tokenize(text) if len(t) > 2}))
+
+
+def _zipf_weights(k: int, s: float) -> np.ndarray:
+    w = 1.0 / np.arange(1, k + 1) ** s
+    return w / w.sum()
+
+
+# ----------------------------
+# Generation
+# ----------------------------
+
+def citation_graph(n: int, rng: np.random.Generator, mean_refs: float = MEAN_REFS) -> Tuple[np.ndarray, np.ndarray]:
+    """(src, dst) row pairs, src > dst, no duplicates; in-degrees follow a power law."""
+    sigma = 0.8
+    refs = rng.lognormal(np.log(mean_refs) - sigma ** 2 / 2, sigma, n).astype(np.int64)
+    refs = np.minimum(refs, np.minimum(np.arange(n), MAX_REFS))
+
+    fitness = rng.pareto(FITNESS_SHAPE, n) + 1.0
+    cum = np.cumsum(fitness)
+    src = np.repeat(np.arange(n, dtype=np.int64), refs)
+    # Draw a target among rows [0, src) with probability proportional to fitness.
+    dst = np.searchsorted(cum, rng.random(len(src)) * cum[src - 1], side="right")
+    dst = np.minimum(dst, src - 1)
+
+    pairs = np.unique(src * n + dst)
+    return pairs // n, pairs % n
+
+
+def _sentences(words: np.ndarray, rng: np.random.Generator, n: int, length: int) -> List[str]:
+    picks = words[rng.integers(0, len(words), size=(n, length))]
+    return [" ".join(row) for row in picks.tolist()]
+
+
+def corpus_sections(n: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """A corpus store's sections (see corpus_store.py) for `n` synthetic papers."""
+    vocab, topics = _vocabulary(n)
+    words = _words()
+
+    # Keywords: 1-3 from the paper's topic, 0-2 from the Zipf-weighted vocabulary.
+    topic = rng.choice(len(topics), size=n, p=_zipf_weights(len(topics), 0.8))
+    from_topic = rng.integers(1, 4, size=n)
+    from_vocab = rng.integers(0, 3, size=n)
+    extra = rng.choice(len(vocab), size=int(from_vocab.sum()), p=_zipf_weights(len(vocab), KEYWORD_ZIPF))
+    kw_ids: List[int] = []
+    kw_offsets = np.zeros(n + 1, dtype=np.int64)
+    pos = 0
+    for i in range(n):
+        own = topics[topic[i]][:from_topic[i]]
+        k = int(from_vocab[i])
+        kw_ids.extend(dict.fromkeys(own + extra[pos:pos + k].tolist()))
+        pos += k
+        kw_offsets[i + 1] = len(kw_ids)
+
+    # Publication years grow denser towards the present; rows are oldest first.
+    years = np.sort(1980 + (44 * rng.power(3.0, n)).astype(np.int32)).astype(np.int32)
+    seed_titles = [p.title for p in SEED_PAPERS.values()]
+    venues = sorted({p.venue for p in SEED_PAPERS.values()})
+    surnames = sorted({a.split()[-1] for p in SEED_PAPERS.values() for a in p.authors.split(", ") if a.split()})
+
+    abstracts = _sentences(words, rng, n, ABSTRACT_WORDS)
+    topic_titles = [seed_titles[t].split(":")[0] for t in topic.tolist()]
+    titles = [
+        f"{head.capitalize()}: {base}"
+        for head, base in zip(_sentences(words, rng, n, TITLE_WORDS // 2), topic_titles)
+    ]
+    first = rng.choice(len(surnames), size=n)
+    n_authors = rng.integers(1, 5, size=n)
+    authors = [
+        f"{chr(65 + i % 26)}. {surnames[first[i]]}" + (" et al." if n_authors[i] > 2 else "")
+        for i in range(n)
+    ]
+    columns = {
+        "paper_id": [f"syn{i:07d}" for i in range(n)],
+        "title": titles,
+        "authors": authors,
+        "venue": [venues[v] for v in rng.choice(len(venues), size=n, p=_zipf_weights(len(venues), 1.0))],
+        "snippet": [" ".join(a.split()[:SNIPPET_WORDS]).capitalize() + "." for a in abstracts],
+        "abstract": [a.capitalize() + "." for a in abstracts],
+        "doi": [f"10.5555/syn.{i}" if keep else "" for i, keep in enumerate(rng.random(n) < 0.7)],
+    }
+
+    sections: Dict[str, np.ndarray] = {
+        "year": years,
+        "relevance": np.round(rng.beta(2.0, 3.0, n), 3),
+        "kw.offsets": kw_offsets,
+        "kw.ids": np.array(kw_ids, dtype=np.int32),
+    }
+    for col in TEXT_COLUMNS:
+        sections.update(string_sections(col, columns[col]))
+    sections.update(string_sections("keywords", vocab))
+    sections["id_order"] = sort_order(columns["paper_id"])
+    return sections
+
+
+# ----------------------------
+# Building (cached per size / seed)
+# ----------------------------
+
+def build(n: int, seed: int = 0, out_dir: Optional[Path] = None) -> dict:
+    """Write corpus, citation, score, related, search, concept, facet and typeahead stores for `n` papers into `out_dir`."""
+    out_dir = Path(out_dir or corpus_dir(n, seed))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    timings: Dict[str, float] = {}
+
+    t0 = time.perf_counter()
+    write_sections(out_dir / CORPUS_FILE, corpus_sections(n, rng), {"kind": "corpus", "format": CORPUS_FORMAT})
+    store = open_cached(out_dir / CORPUS_FILE, CorpusStore)
+    timings["corpus_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    src, dst = citation_graph(n, rng)
+    citations_version = write_citations(src, dst, store, out_dir / CITATIONS_FILE)
+    timings["citations_s"] = time.perf_counter() - t0
+    edges, in_degree = len(src), np.bincount(dst, minlength=n)
+    del src, dst  # the index builds below peak at several GB for 1e6 papers
+
+    index = open_cached(out_dir / CITATIONS_FILE, CitationIndex)
+    t0 = time.perf_counter()
+    write_scores(store, index, out_dir / SCORES_FILE)
+    timings["scores_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    write_related(store, index, out_dir / RELATED_FILE)
+    timings["related_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    write_search_index(store, out_dir / SEARCH_FILE)
+    timings["search_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    write_concepts(store, cluster_keywords(store, AI_CANONICAL), out_dir / CONCEPTS_FILE)
+    timings["concepts_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    write_facets(store, index, open_cached(out_dir / CONCEPTS_FILE, ConceptModel), out_dir / FACETS_FILE)
+    timings["facets_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    write_typeahead(store, open_cached(out_dir / SCORES_FILE, ScoreTable), out_dir / TYPEAHEAD_FILE)
+    timings["typeahead_s"] = time.perf_counter() - t0
+
+    info = {
+        "generator": GENERATOR_VERSION,
+        "papers": n,
+        "seed": seed,
+        "edges": int(edges),
+        "keywords": len(store.keywords),
+        "max_in_degree": int(in_degree.max(initial=0)),
+        "uncited_share": round(float((in_degree == 0).mean()), 3) if n else 0.0,
+        "corpus_version": store.version,
+        "citations_version": citations_version,
+        "build": {k: round(v, 3) for k, v in timings.items()},
+    }
+    (out_dir / MARKER_FILE).write_text(json.dumps(info, indent=2))
+    return info
+
+
+def ensure_corpus(n: int, seed: int = 0) -> Tuple[Path, dict]:
+    """Directory holding the synthetic stores for (n, seed), generating them if missing or outdated."""
+    out_dir = corpus_dir(n, seed)
+    marker = out_dir / MARKER_FILE
+    if marker.exists():
+        info = json.loads(marker.read_text())
+        if info.get("generator") == GENERATOR_VERSION:
+            return out_dir, info
+    return out_dir, build(n, seed, out_dir)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m bench.synth", description="generate a synthetic corpus")
+    parser.add_argument("n", type=lambda s: int(float(s)), help="number of papers (1e3 .. 1e6)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=None, help="output directory (default: data/bench/n<N>-s<SEED>)")
+    args = parser.parse_args()
+    print(json.dumps(build(args.n, args.seed, args.out), indent=2))
@@ -0,0 +1,75 @@
+# build.py
+"""
+Building every store a corpus needs, in dependency order: the corpus, its
+citation index, then the stores derived from them (scores, related, search,
+concepts, facets, typeahead).
+
+`manage.py build-all` runs `build_all` over the data directory. The resolver's
+inbox (resolver.Inbox) ingests into a staging directory, runs `build_all`
+there and `publish`es the finished files, so the app never finds a new corpus
+next to stores it would have to rebuild on a rerun.
+"""
+import os
+import time
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from citation_index import CITATIONS_FILE, load_citations
+from concepts import CONCEPTS_FILE, load_concepts
+from corpus_store import CORPUS_FILE, load_corpus
+from facets import FACETS_FILE, load_facets
+from related import RELATED_FILE, load_related
+from scoring import SCORES_FILE, load_scores
+from search import SEARCH_FILE, load_search
+from storage import data_path, store_lock
+from typeahead import TYPEAHEAD_FILE, load_typeahead
+
+STORE_FILES = (
+    CORPUS_FILE, CITATIONS_FILE, SCORES_FILE, RELATED_FILE, SEARCH_FILE, CONCEPTS_FILE, FACETS_FILE, TYPEAHEAD_FILE,
+)
+
+
+def _path(name: str, directory: Optional[Path]) -> Path:
+    return Path(directory) / name if directory is not None else data_path(name)
+
+
+def build_all(directory: Optional[Path] = None) -> Iterator[Tuple[str, str, float]]:
+    """
+    Open every store in `directory` (the data directory by default), building
+    the missing or stale ones; yields (file, version, seconds) per store.
+    """
+    def path(name: str) -> Path:
+        return _path(name, directory)
+
+    t0 = time.perf_counter()
+    store = load_corpus(path(CORPUS_FILE))
+    yield CORPUS_FILE, store.version, time.perf_counter() - t0
+    t0 = time.perf_counter()
+    index = load_citations(store, path(CITATIONS_FILE))
+    yield CITATIONS_FILE, index.version, time.perf_counter() - t0
+    for name, load in (
+        (SCORES_FILE, lambda: load_scores(store, index, path(SCORES_FILE))),
+        (RELATED_FILE, lambda: load_related(store, index, path(RELATED_FILE))),
+        (SEARCH_FILE, lambda: load_search(store, path(SEARCH_FILE))),
+        (CONCEPTS_FILE, lambda: load_concepts(store, path(CONCEPTS_FILE))),
+        (FACETS_FILE, lambda: load_facets(store, index, load_concepts(store, path(CONCEPTS_FILE)), path(FACETS_FILE))),
+        (TYPEAHEAD_FILE, lambda: load_typeahead(store, load_scores(store, index, path(SCORES_FILE)), path(TYPEAHEAD_FILE))),
+    ):
+        t0 = time.perf_counter()
+        yield name, load().version, time.perf_counter() - t0
+
+
+def publish(staging: Path, directory: Optional[Path] = None) -> None:
+    """
+    Move the store files built in `staging` into `directory` (the data
+    directory by default). Every store's lock is held throughout, so a reader
+    that finds one of them stale waits for the move instead of rebuilding it;
+    the corpus goes last, so one that opens the new corpus finds the rest current.
+    """
+    names = [name for name in STORE_FILES if (Path(staging) / name).exists()]
+    with ExitStack() as locks:
+        for name in names:
+            locks.enter_context(store_lock(_path(name, directory)))
+        for name in reversed(names):
+            os.replace(Path(staging) / name, _path(name, directory))
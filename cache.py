@@ -0,0 +1,113 @@
+# cache.py
+"""
+Process-wide, bounded LRU caches with TTL eviction and hit/miss counters.
+
+Streamlit re-executes app.py on every rerun, but imported modules (and so the
+caches registered here) live for the whole server process and are shared by
+every session.
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, name: str, maxsize: int = 256, ttl: float = 600.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def peek(self, key: Hashable) -> bool:
+        """True if `key` is cached and fresh; does not touch LRU order or counters."""
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[0] > time.monotonic()
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], T]) -> T:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            # Computed outside the lock; concurrent misses may compute twice.
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "cache": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+_REGISTRY: Dict[str, TTLCache] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+def get_cache(name: str, maxsize: int = 256, ttl: float = 600.0) -> TTLCache:
+    """Process-wide cache `name`, created on first use."""
+    with _REGISTRY_LOCK:
+        cache = _REGISTRY.get(name)
+        if cache is None:
+            cache = _REGISTRY[name] = TTLCache(name, maxsize, ttl)
+        return cache
+
+
+def memoized(cache: TTLCache) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Memoize a function of hashable positional args in `cache`."""
+    def decorator(fn: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(fn)
+        def wrapper(*args):
+            return cache.get_or_compute((fn.__name__, *args), lambda: fn(*args))
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+def all_stats() -> List[Dict[str, Any]]:
+    with _REGISTRY_LOCK:
+        caches = list(_REGISTRY.values())
+    return [c.stats() for c in caches]
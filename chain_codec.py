@@ -0,0 +1,255 @@
+# chain_codec.py
+"""
+Compact encoding for the `chain` query parameter.
+
+A chain is a list of paper ids (plus the seed pseudo-id). In URLs it is
+written as a reference:
+
+    ref := kind ver "~" payload ("." op)*
+    kind: "r"  payload = base64url(varint(row + 1) ...), 0 standing for the seed
+          "t"  payload = content-addressed token into the ChainStore
+    ver:  first 4 hex chars of the corpus version the rows refer to; a ref
+          whose "r" payload or "x" ops were packed for another corpus
+          version is stale, while tokens and "p" ops (ids, a length) are not
+    op:   "p<n>"    keep the first n entries
+          "x<b64>"  append the varint-packed rows
+
+Short chains are inlined as rows; longer ones are interned once in the chain
+store, so card links ("<token>.x<row>") and history links ("<token>.p<n>")
+stay the same size however deep the chain goes. Plain comma-joined ids (the
+old format, no "~") still decode.
+"""
+import base64
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence
+
+from cache import get_cache
+from corpus_store import CorpusStore
+from storage import data_path
+
+CHAINS_FILE = "chains.sqlite"
+
+# Chains up to this many entries go inline as rows; longer ones get a token.
+INLINE_MAX_IDS = 8
+# Stored chains kept before the least recently used are evicted.
+CHAIN_STORE_MAX = 100_000
+
+_VERSION_CHARS = 4
+_TOKEN_BYTES = 9  # 12 base64url chars
+
+
+# ----------------------------
+# Varints / base64url
+# ----------------------------
+
+def pack_varints(values: Iterable[int]) -> bytes:
+    out = bytearray()
+    for v in values:
+        if v < 0:
+            raise ValueError("varints must be non-negative")
+        while v >= 0x80:
+            out.append((v & 0x7F) | 0x80)
+            v >>= 7
+        out.append(v)
+    return bytes(out)
+
+
+def unpack_varints(data: bytes) -> List[int]:
+    values: List[int] = []
+    v = shift = 0
+    for byte in data:
+        v |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(v)
+            v = shift = 0
+    if shift:
+        raise ValueError("truncated varint")
+    return values
+
+
+def b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def chain_token(chain: Sequence[str]) -> str:
+    """Content address of a chain: the same ids always give the same token."""
+    return b64encode(hashlib.sha1("\n".join(chain).encode("utf-8")).digest()[:_TOKEN_BYTES])
+
+
+# ----------------------------
+# Server-side chain store
+# ----------------------------
+
+class ChainStore:
+    """token -> chain, in SQLite, with least-recently-used eviction."""
+
+    def __init__(self, path: Optional[Path] = None, max_entries: int = CHAIN_STORE_MAX):
+        self.path = Path(path or data_path(CHAINS_FILE))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chains (token TEXT PRIMARY KEY, chain TEXT NOT NULL, used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS chains_used ON chains (used)")
+        self._count = self._db.execute("SELECT COUNT(*) FROM chains").fetchone()[0]
+        # Hot tokens are served from memory; SQLite only sees first use and misses.
+        self._hot = get_cache(f"chains:{self.path.name}", maxsize=4096, ttl=600.0)
+
+    def put(self, chain: Sequence[str]) -> str:
+        token = chain_token(chain)
+        if self._hot.get(token) is not None:
+            return token
+        with self._lock:
+            now = time.time()
+            cur = self._db.execute(
+                "INSERT OR IGNORE INTO chains (token, chain, used) VALUES (?, ?, ?)",
+                (token, "\n".join(chain), now),
+            )
+            if cur.rowcount:
+                self._count += 1
+                if self._count > self.max_entries:
+                    self._evict()
+            else:
+                self._db.execute("UPDATE chains SET used = ? WHERE token = ?", (now, token))
+        self._hot.put(token, list(chain))
+        return token
+
+    def get(self, token: str) -> Optional[List[str]]:
+        chain = self._hot.get(token)
+        if chain is not None:
+            return chain
+        with self._lock:
+            row = self._db.execute("SELECT chain FROM chains WHERE token = ?", (token,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE chains SET used = ? WHERE token = ?", (time.time(), token))
+        chain = row[0].split("\n") if row[0] else []
+        self._hot.put(token, chain)
+        return chain
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM chains").fetchone()[0]
+
+    def _evict(self) -> None:
+        # Drop the oldest tenth in one statement rather than one row per insert.
+        keep = self.max_entries - self.max_entries // 10
+        self._db.execute(
+            "DELETE FROM chains WHERE token IN (SELECT token FROM chains ORDER BY used LIMIT ?)",
+            (self._count - keep,),
+        )
+        self._count = self._db.execute("SELECT COUNT(*) FROM chains").fetchone()[0]
+        self._hot.clear()
+
+
+# ----------------------------
+# Codec
+# ----------------------------
+
+class ChainLinks:
+    """Chain params for the links a page renders: the chain's prefixes and one-step extensions."""
+
+    def __init__(self, codec: "ChainCodec", chain: Sequence[str]):
+        self._codec = codec
+        self.chain = list(chain)
+        self.ref = codec.encode(self.chain)
+
+    def extend(self, paper_id: str) -> str:
+        """The chain with `paper_id` appended (unchanged if it is already the last step)."""
+        if self.chain and self.chain[-1] == paper_id:
+            return self.ref
+        row = self._codec.row_of(paper_id)
+        if row is None or not self.ref:
+            return self._codec.encode(self.chain + [paper_id])
+        return f"{self.ref}.x{b64encode(pack_varints([row]))}"
+
+    def prefix(self, n: int) -> str:
+        """The first `n` steps of the chain."""
+        if n >= len(self.chain):
+            return self.ref
+        if not self.ref:
+            return ""
+        return f"{self.ref}.p{n}"
+
+
+class ChainCodec:
+    def __init__(
+        self,
+        store: CorpusStore,
+        chains: ChainStore,
+        seed_id: str,
+        inline_max: int = INLINE_MAX_IDS,
+    ):
+        self.store = store
+        self.chains = chains
+        self.seed_id = seed_id
+        self.inline_max = inline_max
+        self.version = store.version[:_VERSION_CHARS]
+
+    def row_of(self, paper_id: str) -> Optional[int]:
+        """Packed value for `paper_id` (row + 1, 0 for the seed); None if not in the corpus."""
+        if paper_id == self.seed_id:
+            return 0
+        row = self.store.row_of(paper_id)
+        return row + 1 if row >= 0 else None
+
+    def _unpack(self, payload: str) -> List[str]:
+        ids = self.store.ids
+        return [self.seed_id if v == 0 else ids[v - 1] for v in unpack_varints(b64decode(payload))]
+
+    def encode(self, chain: Sequence[str]) -> str:
+        if not chain:
+            return ""
+        if len(chain) <= self.inline_max:
+            rows = [self.row_of(pid) for pid in chain]
+            if None not in rows:
+                return f"r{self.version}~{b64encode(pack_varints(rows))}"
+        return f"t{self.version}~{self.chains.put(chain)}"
+
+    def decode(self, param: str) -> List[str]:
+        """Chain for a URL param; [] if it is malformed, its rows stale or its token was evicted."""
+        if not param:
+            return []
+        if "~" not in param:
+            return [x for x in param.split(",") if x]
+
+        head, _, tail = param.partition("~")
+        kind, version = head[:1], head[1:]
+        payload, *ops = tail.split(".")
+        # Rows only mean something in the corpus version they were packed for.
+        stale = version != self.version
+        try:
+            if kind == "r" and not stale:
+                chain = self._unpack(payload)
+            elif kind == "t":
+                chain = self.chains.get(payload)
+                if chain is None:
+                    return []
+            else:
+                return []
+            for op in ops:
+                if op[:1] == "p":
+                    chain = chain[:int(op[1:])]
+                elif op[:1] == "x" and not stale:
+                    chain = chain + self._unpack(op[1:])
+                else:
+                    return []
+        except (ValueError, IndexError):
+            return []
+        return chain
+
+    def links(self, chain: Sequence[str]) -> ChainLinks:
+        return ChainLinks(self, chain)
@@ -0,0 +1,125 @@
+# citation_index.py
+"""
+Compressed-sparse-row citation graph over corpus rows.
+
+  cites.offsets   int32[n + 1]   cites.targets   int32[m]   (row -> rows it cites)
+  cited_by.offsets int32[n + 1]  cited_by.targets int32[m]  (transposed copy)
+
+Neighbor lookups are O(degree) slices of the mmap'd arrays; no per-edge Python
+objects are kept. Edge order within a row follows the input order.
+"""
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from corpus_store import CorpusStore
+from storage import Sections, StoreFormatError, csr_from_pairs, csr_gather, data_path, open_current, write_sections
+
+CITATIONS_FILE = "citations.bin"
+CITATIONS_FORMAT = 1
+
+
+# ----------------------------
+# Building
+# ----------------------------
+
+def resolve_edges(
+    edges: Dict[str, List[str]], store: CorpusStore
+) -> Tuple[np.ndarray, np.ndarray, List[Tuple[str, str]]]:
+    """Map string-id edges to row pairs. Edges touching unknown ids are returned separately."""
+    src: List[int] = []
+    dst: List[int] = []
+    unresolved: List[Tuple[str, str]] = []
+    for citing, cited_ids in edges.items():
+        s = store.row_of(citing)
+        for cited in cited_ids:
+            d = store.row_of(cited)
+            if s < 0 or d < 0:
+                unresolved.append((citing, cited))
+            else:
+                src.append(s)
+                dst.append(d)
+    return np.array(src, dtype=np.int64), np.array(dst, dtype=np.int64), unresolved
+
+
+def build_citation_sections(src: np.ndarray, dst: np.ndarray, n: int) -> Dict[str, np.ndarray]:
+    fwd_offsets, fwd_targets = csr_from_pairs(src, dst.astype(np.int32), n)
+    rev_offsets, rev_targets = csr_from_pairs(dst, src.astype(np.int32), n)
+    return {
+        "cites.offsets": fwd_offsets,
+        "cites.targets": fwd_targets,
+        "cited_by.offsets": rev_offsets,
+        "cited_by.targets": rev_targets,
+    }
+
+
+def write_citations(src: np.ndarray, dst: np.ndarray, store: CorpusStore, path: Optional[Path] = None) -> str:
+    path = path or data_path(CITATIONS_FILE)
+    meta = {"kind": "citations", "format": CITATIONS_FORMAT, "corpus": store.version}
+    return write_sections(path, build_citation_sections(src, dst, len(store)), meta)
+
+
+# ----------------------------
+# Reading
+# ----------------------------
+
+class CitationIndex:
+    def __init__(self, sections: Sections):
+        if sections.meta.get("kind") != "citations":
+            raise ValueError("section file is not a citation index")
+        self.sections = sections
+        self.version: str = sections.build_id
+        self.corpus_version: str = sections.meta["corpus"]
+        self._fwd_offsets = sections["cites.offsets"]
+        self._fwd_targets = sections["cites.targets"]
+        self._rev_offsets = sections["cited_by.offsets"]
+        self._rev_targets = sections["cited_by.targets"]
+
+    def __len__(self) -> int:
+        return len(self._fwd_offsets) - 1
+
+    @property
+    def num_edges(self) -> int:
+        return len(self._fwd_targets)
+
+    def cites(self, row: int) -> np.ndarray:
+        return self._fwd_targets[self._fwd_offsets[row]:self._fwd_offsets[row + 1]]
+
+    def cited_by(self, row: int) -> np.ndarray:
+        return self._rev_targets[self._rev_offsets[row]:self._rev_offsets[row + 1]]
+
+    def gather(self, rows: np.ndarray, reverse: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Neighbors of many rows at once: (position in `rows`, neighbor row) pairs."""
+        if reverse:
+            return csr_gather(self._rev_offsets, self._rev_targets, rows)
+        return csr_gather(self._fwd_offsets, self._fwd_targets, rows)
+
+    def csr(self, reverse: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """The (offsets, targets) arrays of the cites (or, if `reverse`, cited-by) graph."""
+        if reverse:
+            return self._rev_offsets, self._rev_targets
+        return self._fwd_offsets, self._fwd_targets
+
+    def out_degree(self) -> np.ndarray:
+        return np.diff(self._fwd_offsets)
+
+    def in_degree(self) -> np.ndarray:
+        return np.diff(self._rev_offsets)
+
+
+def load_citations(store: CorpusStore, path: Optional[Path] = None) -> CitationIndex:
+    """
+    Open the citation index for `store`, rebuilding it from the seed edges if
+    stale. An ingested corpus has its citations written by the ingest: if
+    they are missing or stale, that ingest did not finish.
+    """
+    path = Path(path or data_path(CITATIONS_FILE))
+
+    def build(_):
+        if store.sections.meta.get("source") == "ingest":
+            raise StoreFormatError(f"{path} does not match the ingested corpus; re-run `manage.py ingest`")
+        from seed_data import SEED_CITES
+        src, dst, _ = resolve_edges(SEED_CITES, store)
+        write_citations(src, dst, store, path)
+    return open_current(path, CitationIndex, lambda index: index.corpus_version == store.version, build)
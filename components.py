@@ -0,0 +1,292 @@
+# components.py
+"""
+Bidirectional Streamlit components (`st.components.v2`): their browser-side
+JS and CSS, and the component definitions app.py mounts.
+
+Each component is registered once per process; app.py mounts it with a
+key, a data payload and `on_<state>_change` callbacks.
+"""
+import streamlit as st
+
+
+# ----------------------------
+# Chain graph (a bidirectional component, see app.render_chain_graph)
+# ----------------------------
+# The browser keeps the drawn graph between reruns and applies the deltas
+# the server sends (layout.scene_delta). Each payload names the revision it
+# builds on; when that is not what the browser holds (a remount, a missed
+# rerun) it asks for a full redraw through the "resync" trigger. Labels go
+# in via textContent, never as markup.
+
+GRAPH_CSS = """
+svg { display: block; width: 100%; height: 280px; }
+.edge { stroke: rgba(49, 51, 63, 0.25); stroke-width: 1; vector-effect: non-scaling-stroke; }
+.edge.step, .edge.result { stroke: #ff9800; stroke-width: 2; }
+.edge.result { stroke-opacity: 0.4; }
+.node { cursor: pointer; }
+.node circle { fill: #9aa5b1; stroke: #fff; stroke-width: 1; vector-effect: non-scaling-stroke; }
+.node.chain circle { fill: var(--st-primary-color, #ff4b4b); }
+.node.current circle { fill: var(--st-primary-color, #ff4b4b); stroke: #31333f; stroke-width: 2; }
+.node.seed circle { fill: #ff9800; }
+.node:hover circle { stroke: #31333f; stroke-width: 2; }
+"""
+
+GRAPH_JS = """
+const SVG = "http://www.w3.org/2000/svg";
+const RADIUS = { current: 0.55, chain: 0.45, seed: 0.45, neighbor: 0.3 };
+const TWEEN_MS = 300;
+
+function el(name, cls) {
+  const e = document.createElementNS(SVG, name);
+  if (cls) e.setAttribute("class", cls);
+  return e;
+}
+
+function setNode(view, node, setTriggerValue) {
+  let n = view.nodes.get(node.id);
+  if (!n) {
+    const g = el("g");
+    const circle = el("circle");
+    const title = el("title");
+    g.append(circle, title);
+    g.addEventListener("click", () => setTriggerValue("open", node.id));
+    view.nodeLayer.appendChild(g);
+    n = { g, circle, title, x: node.x, y: node.y };
+    view.nodes.set(node.id, n);
+  }
+  n.g.setAttribute("class", "node " + node.kind);
+  n.circle.setAttribute("r", RADIUS[node.kind] || RADIUS.neighbor);
+  n.title.textContent = node.label;
+  n.fx = n.x; n.fy = n.y; n.tx = node.x; n.ty = node.y;
+}
+
+function draw(view, k) {
+  for (const n of view.nodes.values()) {
+    n.x = n.fx + (n.tx - n.fx) * k;
+    n.y = n.fy + (n.ty - n.fy) * k;
+    n.g.setAttribute("transform", `translate(${n.x} ${n.y})`);
+  }
+  for (const e of view.edges.values()) {
+    const a = view.nodes.get(e.source), b = view.nodes.get(e.target);
+    e.line.setAttribute("x1", a.x); e.line.setAttribute("y1", a.y);
+    e.line.setAttribute("x2", b.x); e.line.setAttribute("y2", b.y);
+  }
+}
+
+function fit(view) {
+  let x0 = Infinity, y0 = Infinity, x1 = -Infinity, y1 = -Infinity;
+  for (const n of view.nodes.values()) {
+    x0 = Math.min(x0, n.tx); y0 = Math.min(y0, n.ty);
+    x1 = Math.max(x1, n.tx); y1 = Math.max(y1, n.ty);
+  }
+  if (x0 === Infinity) return;
+  const pad = 1.5;
+  view.svg.setAttribute("viewBox", `${x0 - pad} ${y0 - pad} ${x1 - x0 + 2 * pad} ${y1 - y0 + 2 * pad}`);
+}
+
+function apply(view, delta, setTriggerValue) {
+  if (delta.base === null) {
+    view.nodeLayer.replaceChildren();
+    view.edgeLayer.replaceChildren();
+    view.nodes.clear();
+    view.edges.clear();
+  }
+  for (const [source, target] of delta.remove_edges) {
+    const key = source + "\\n" + target;
+    view.edges.get(key)?.line.remove();
+    view.edges.delete(key);
+  }
+  for (const id of delta.remove) {
+    view.nodes.get(id)?.g.remove();
+    view.nodes.delete(id);
+  }
+  for (const n of view.nodes.values()) { n.fx = n.tx = n.x; n.fy = n.ty = n.y; }
+  for (const node of delta.add.concat(delta.update)) setNode(view, node, setTriggerValue);
+  for (const [source, target, kind] of delta.add_edges) {
+    const line = el("line", "edge " + kind);
+    view.edgeLayer.appendChild(line);
+    view.edges.set(source + "\\n" + target, { source, target, line });
+  }
+  view.rev = delta.rev;
+  fit(view);
+
+  cancelAnimationFrame(view.frame);
+  const start = performance.now();
+  const step = (now) => {
+    const k = Math.min((now - start) / TWEEN_MS, 1);
+    draw(view, k);
+    if (k < 1) view.frame = requestAnimationFrame(step);
+  };
+  draw(view, 0);
+  view.frame = requestAnimationFrame(step);
+}
+
+export default function (component) {
+  const { data, parentElement, setTriggerValue } = component;
+  let view = parentElement.__chainGraph;
+  if (!view || !view.svg.isConnected) {
+    const svg = el("svg");
+    const edgeLayer = el("g"), nodeLayer = el("g");
+    svg.append(edgeLayer, nodeLayer);
+    parentElement.appendChild(svg);
+    view = parentElement.__chainGraph = { svg, edgeLayer, nodeLayer, nodes: new Map(), edges: new Map(), rev: null };
+  }
+  if (!data || (data.base !== null && data.rev === view.rev)) return;
+  if (data.base !== null && data.base !== view.rev) {
+    setTriggerValue("resync", data.rev);
+    return;
+  }
+  apply(view, data, setTriggerValue);
+}
+"""
+
+
+@st.cache_resource(show_spinner=False)
+def chain_graph_component():
+    """The chain graph's browser side (registered once per process)."""
+    return st.components.v2.component("chain_graph", js=GRAPH_JS, css=GRAPH_CSS)
+
+
+# ----------------------------
+# Search box with suggestions (a bidirectional component, see app.search_box)
+# ----------------------------
+# The browser owns the input: it reports the text as it changes ("text"
+# state, debounced) and shows the suggestions the server sends back for it,
+# dropping answers to text that is no longer in the box. Enter submits the
+# text ("submit") or the highlighted suggestion ("pick", a paper id).
+
+TYPEAHEAD_CSS = """
+.typeahead { position: relative; font-family: inherit; }
+.typeahead-input {
+  box-sizing: border-box; width: 100%; height: 2.5rem; padding: 0 0.75rem;
+  font: inherit; font-size: 1rem; color: inherit;
+  background: var(--st-secondary-background-color, #f0f2f6);
+  border: 1px solid transparent; border-radius: 0.5rem; outline: none;
+}
+.typeahead-input:focus { border-color: var(--st-primary-color, #ff4b4b); }
+.typeahead-list {
+  display: none; list-style: none; margin: 4px 0 0; padding: 4px 0;
+  border: 1px solid rgba(49, 51, 63, 0.2); border-radius: 0.5rem;
+  background: var(--st-background-color, #fff);
+}
+.typeahead-list.open { display: block; }
+.typeahead-item { padding: 6px 12px; cursor: pointer; }
+.typeahead-item.active { background: rgba(49, 51, 63, 0.08); }
+.typeahead-title { font-weight: 600; line-height: 1.25; }
+.typeahead-meta { color: rgba(49, 51, 63, 0.7); font-size: 0.85rem; }
+.typeahead-kind {
+  margin-left: 6px; padding: 0 6px; border-radius: 8px; font-size: 0.75rem;
+  background: rgba(49, 51, 63, 0.08); color: rgba(49, 51, 63, 0.7);
+}
+"""
+
+TYPEAHEAD_JS = """
+const DEBOUNCE_MS = 40;
+const KIND_LABELS = { author: "author", doi: "DOI" };
+
+function div(cls, text) {
+  const e = document.createElement("div");
+  e.className = cls;
+  e.textContent = text;
+  return e;
+}
+
+function highlight(box, i) {
+  box.active = i;
+  box.list.querySelectorAll(".typeahead-item").forEach((li, j) => li.classList.toggle("active", j === i));
+}
+
+function show(box, items) {
+  box.items = items;
+  box.list.replaceChildren();
+  items.forEach((item, i) => {
+    const li = document.createElement("li");
+    li.className = "typeahead-item";
+    const title = div("typeahead-title", item.title);
+    if (KIND_LABELS[item.kind]) {
+      const kind = document.createElement("span");
+      kind.className = "typeahead-kind";
+      kind.textContent = KIND_LABELS[item.kind];
+      title.appendChild(kind);
+    }
+    li.append(title, div("typeahead-meta", item.meta));
+    // mousedown, not click: the input would lose focus (and close the list) first.
+    li.addEventListener("mousedown", (e) => { e.preventDefault(); box.api.setTriggerValue("pick", item.id); });
+    li.addEventListener("mouseenter", () => highlight(box, i));
+    box.list.appendChild(li);
+  });
+  box.active = -1;
+  box.list.classList.toggle("open", items.length > 0 && box.input.matches(":focus"));
+}
+
+function flush(box) {
+  if (!box.timer) return;
+  clearTimeout(box.timer);
+  box.timer = 0;
+  box.api.setStateValue("text", box.input.value);
+}
+
+export default function (component) {
+  const { data, parentElement, setStateValue, setTriggerValue } = component;
+  let box = parentElement.__typeahead;
+  if (!box || !box.input.isConnected) {
+    const wrap = div("typeahead", "");
+    const input = document.createElement("input");
+    input.className = "typeahead-input";
+    input.type = "text";
+    input.autocomplete = "off";
+    input.spellcheck = false;
+    input.value = data.value;
+    const list = document.createElement("ul");
+    list.className = "typeahead-list";
+    wrap.append(input, list);
+    parentElement.appendChild(wrap);
+    box = parentElement.__typeahead = { input, list, items: [], active: -1, timer: 0, api: null, value: undefined };
+
+    input.addEventListener("input", () => {
+      clearTimeout(box.timer);
+      box.timer = setTimeout(() => flush(box), DEBOUNCE_MS);
+    });
+    input.addEventListener("keydown", (e) => {
+      const n = box.items.length;
+      if ((e.key === "ArrowDown" || e.key === "ArrowUp") && n) {
+        e.preventDefault();
+        box.list.classList.add("open");
+        // Cycles through the suggestions and back to the typed text (-1).
+        const step = e.key === "ArrowDown" ? 1 : -1;
+        highlight(box, (box.active + 1 + step + n + 1) % (n + 1) - 1);
+      } else if (e.key === "Enter") {
+        e.preventDefault();
+        const item = box.list.classList.contains("open") ? box.items[box.active] : undefined;
+        if (item) box.api.setTriggerValue("pick", item.id);
+        else { flush(box); box.api.setTriggerValue("submit", input.value); }
+      } else if (e.key === "Escape") {
+        box.list.classList.remove("open");
+        highlight(box, -1);
+      }
+    });
+    // Buttons next to the box read the "text" state: settle it before they rerun.
+    input.addEventListener("blur", () => { flush(box); box.list.classList.remove("open"); });
+    input.addEventListener("focus", () => box.list.classList.toggle("open", box.items.length > 0));
+  }
+  box.api = { setStateValue, setTriggerValue };
+  box.input.placeholder = data.placeholder || "";
+  if (data.value !== box.value) {
+    // A new search (a picked suggestion's title): show it and report it as typed.
+    if (box.value !== undefined) {
+      box.input.value = data.value;
+      clearTimeout(box.timer);
+      box.timer = 0;
+      setStateValue("text", data.value);
+    }
+    box.value = data.value;
+  }
+  if (data.for === box.input.value) show(box, data.items);
+}
+"""
+
+
+@st.cache_resource(show_spinner=False)
+def typeahead_component():
+    """The search box's browser side (registered once per process)."""
+    return st.components.v2.component("typeahead", js=TYPEAHEAD_JS, css=TYPEAHEAD_CSS)
@@ -0,0 +1,363 @@
+# concepts.py
+"""
+Offline keyword -> concept clustering for AI mode.
+
+Each keyword gets a hashed TF-IDF vector built from the papers tagged with
+it: their title / abstract / snippet tokens plus the keywords they co-occur
+with, and the keyword's own name. Vectors are clustered with spherical
+k-means (numpy, no network or GPU). Keywords in a curated table
+(seed_data.AI_CANONICAL) are pinned to their curated concept and name it;
+other clusters are named after their most used keywords. Keywords that are
+not close to any centroid stay their own concept.
+
+The result is written to data/concepts.bin (a section file): concept_of is
+indexed by corpus keyword id, so group_rows maps a keyword in O(1). When the
+corpus changes, known keywords keep their concept and only new keywords are
+vectorized and assigned to the stored centroids (`update_concepts`).
+"""
+import zlib
+from array import array
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from corpus_store import CorpusStore
+from grouping import ConceptTable
+from search import tokenize
+from storage import (
+    Sections,
+    StringColumn,
+    csr_from_pairs,
+    csr_gather,
+    data_path,
+    open_current,
+    string_sections,
+    write_sections,
+)
+
+CONCEPTS_FILE = "concepts.bin"
+CONCEPTS_FORMAT = 1
+
+VECTOR_DIM = 1 << 10
+KMEANS_ITERS = 50
+# Cosine similarity below which a keyword is not merged into any concept.
+MIN_CONCEPT_SIM = 0.2
+
+# Term weights for a paper's contribution to its keywords' vectors.
+TEXT_WEIGHTS = {"title": 2.0, "abstract": 1.0, "snippet": 1.0}
+COKEYWORD_WEIGHT = 2.0
+# Share of a keyword's vector taken by its own name (vs. its papers).
+OWN_NAME_WEIGHT = 0.5
+# Keywords whose vectors are accumulated at once: bounds the scratch space to
+# VECTOR_BLOCK * VECTOR_DIM floats, however large the vocabulary.
+VECTOR_BLOCK = 4096
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from how in into is it its of on or our that the their this to we what "
+    "when which with".split()
+)
+
+
+# ----------------------------
+# Keyword vectors
+# ----------------------------
+
+def _bucket(term: str, dim: int) -> int:
+    # crc32 rather than hash(): buckets must agree across processes and runs.
+    return zlib.crc32(term.encode("utf-8")) % dim
+
+
+def _terms(text: str) -> List[str]:
+    return [t for t in tokenize(text) if t not in _STOPWORDS and len(t) > 1]
+
+
+def _doc_vectors(store: CorpusStore, dim: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-paper L2-normalized TF-IDF over hashed terms, as CSR (offsets, buckets, weights)."""
+    cols = store.columns
+    doc = array("i")
+    bucket = array("i")
+    weight = array("d")
+    for row in range(len(store)):
+        for field, w in TEXT_WEIGHTS.items():
+            for term in _terms(cols[field][row]):
+                doc.append(row)
+                bucket.append(_bucket(term, dim))
+                weight.append(w)
+        for kw in store.keyword_ids(row):
+            doc.append(row)
+            bucket.append(_bucket(f"kw:{store.keywords[int(kw)]}", dim))
+            weight.append(COKEYWORD_WEIGHT)
+
+    n = len(store)
+    # Sum duplicate (paper, bucket) pairs.
+    pairs, inverse = np.unique(np.array(doc, dtype=np.int64) * dim + np.array(bucket, dtype=np.int64),
+                               return_inverse=True)
+    tf = np.bincount(inverse, weights=np.array(weight, dtype=np.float64))
+    docs, buckets = np.divmod(pairs, dim)
+
+    df = np.bincount(buckets, minlength=dim)
+    w = tf * np.log1p(n / np.maximum(df[buckets], 1))
+    norms = np.sqrt(np.bincount(docs, weights=w * w, minlength=n))
+    w = w / np.maximum(norms[docs], 1e-12)
+
+    offsets, order = csr_from_pairs(docs, np.arange(len(docs)), n)
+    return offsets, buckets[order], w[order]
+
+
+def keyword_vectors(store: CorpusStore, keyword_ids: Optional[np.ndarray] = None, dim: int = VECTOR_DIM) -> np.ndarray:
+    """float32[len(keyword_ids), dim] unit vectors (all keywords by default)."""
+    if keyword_ids is None:
+        keyword_ids = np.arange(len(store.keywords))
+    keyword_ids = np.asarray(keyword_ids, dtype=np.int64)
+    slot = np.full(len(store.keywords), -1, dtype=np.int64)
+    slot[keyword_ids] = np.arange(len(keyword_ids))
+
+    # (paper, keyword) pairs restricted to the requested keywords.
+    pos, kw = csr_gather(store.kw_offsets, store.kw_ids, np.arange(len(store)))
+    keep = slot[kw] >= 0
+    papers, kw_slot = pos[keep], slot[kw[keep]]
+
+    offsets, buckets, weights = _doc_vectors(store, dim)
+    # Pairs by keyword slot, so each block's papers are one slice.
+    order = np.argsort(kw_slot, kind="stable")
+    papers, kw_slot = papers[order], kw_slot[order]
+
+    vectors = np.empty((len(keyword_ids), dim), dtype=np.float32)
+    for start in range(0, len(keyword_ids), VECTOR_BLOCK):
+        stop = min(start + VECTOR_BLOCK, len(keyword_ids))
+        lo, hi = np.searchsorted(kw_slot, [start, stop])
+        pair, b = csr_gather(offsets, buckets, papers[lo:hi])
+        _, w = csr_gather(offsets, weights, papers[lo:hi])
+        flat = (kw_slot[lo:hi][pair] - start) * dim + b
+        from_papers = np.bincount(flat, weights=w, minlength=(stop - start) * dim)
+        from_papers = from_papers.astype(np.float32).reshape(stop - start, dim)
+
+        own = np.zeros_like(from_papers)
+        for i, kw_id in enumerate(keyword_ids[start:stop].tolist()):
+            for term in _terms(store.keywords[kw_id]) or [store.keywords[kw_id].lower()]:
+                own[i, _bucket(term, dim)] += 1.0
+        block = (1.0 - OWN_NAME_WEIGHT) * _normalize(from_papers) + OWN_NAME_WEIGHT * _normalize(own)
+        vectors[start:stop] = _normalize(block)
+    return vectors
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+# ----------------------------
+# Clustering
+# ----------------------------
+
+def _kmeans_pp(x: np.ndarray, centroids: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """Add `k` k-means++ centroids (cosine distance) to `centroids`."""
+    chosen = list(centroids)
+    for _ in range(k):
+        if chosen:
+            dist = np.clip(1.0 - (x @ np.array(chosen).T).max(axis=1), 0.0, None)
+        else:
+            dist = np.ones(len(x))
+        total = dist.sum()
+        i = rng.choice(len(x), p=dist / total) if total > 0 else rng.integers(len(x))
+        chosen.append(x[i])
+    return np.array(chosen, dtype=np.float32).reshape(-1, x.shape[1])
+
+
+def spherical_kmeans(
+    x: np.ndarray, centroids: np.ndarray, pinned: np.ndarray, iters: int = KMEANS_ITERS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cluster unit rows of `x` starting from `centroids`. Rows with pinned[i] >= 0
+    keep that cluster. Returns (assignment, centroids).
+    """
+    free = pinned < 0
+    assign = pinned.copy()
+    for _ in range(iters):
+        new = assign.copy()
+        if free.any():
+            new[free] = (x[free] @ centroids.T).argmax(axis=1)
+        sums = np.zeros_like(centroids, dtype=np.float64)
+        np.add.at(sums, new, x)
+        filled = np.bincount(new, minlength=len(centroids)) > 0
+        centroids = np.where(filled[:, None], _normalize(sums), centroids).astype(np.float32)
+        if np.array_equal(new, assign):
+            break
+        assign = new
+    return assign, centroids
+
+
+def _keyword_counts(store: CorpusStore) -> np.ndarray:
+    return np.bincount(store.kw_ids, minlength=len(store.keywords))
+
+
+def _label(members: np.ndarray, store: CorpusStore, counts: np.ndarray) -> str:
+    top = members[np.argsort(-counts[members], kind="stable")[:2]]
+    return " / ".join(store.keywords[int(k)] for k in top)
+
+
+def _split_outliers(
+    x: np.ndarray, assign: np.ndarray, centroids: np.ndarray, pinned: np.ndarray, min_sim: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Free rows below `min_sim` to their centroid become clusters of their own."""
+    sim = np.einsum("ij,ij->i", x, centroids[assign])
+    outliers = np.flatnonzero((pinned < 0) & (sim < min_sim))
+    assign = assign.copy()
+    assign[outliers] = len(centroids) + np.arange(len(outliers))
+    return assign, np.concatenate([centroids, x[outliers]])
+
+
+def cluster_keywords(
+    store: CorpusStore,
+    canonical: Mapping[str, str],
+    k: Optional[int] = None,
+    dim: int = VECTOR_DIM,
+    min_sim: float = MIN_CONCEPT_SIM,
+    seed: int = 0,
+) -> Dict[str, np.ndarray]:
+    """Full clustering of the corpus keyword vocabulary; returns the concepts.bin sections."""
+    num_kw = len(store.keywords)
+    x = keyword_vectors(store, dim=dim)
+    names = [store.keywords[i] for i in range(num_kw)]
+
+    # Curated labels pin their keywords and seed one centroid each.
+    labels: List[str] = []
+    pinned = np.full(num_kw, -1, dtype=np.int64)
+    for i, kw in enumerate(names):
+        label = canonical.get(kw.strip())
+        if label is not None:
+            if label not in labels:
+                labels.append(label)
+            pinned[i] = labels.index(label)
+    seeds = np.zeros((len(labels), dim), dtype=np.float32)
+    if labels:
+        np.add.at(seeds, pinned[pinned >= 0], x[pinned >= 0])
+        seeds = _normalize(seeds)
+
+    free = int((pinned < 0).sum())
+    extra = k - len(labels) if k is not None else int(round(np.sqrt(free / 2)))
+    extra = min(max(extra, 0 if labels else 1), free)
+    rng = np.random.default_rng(seed)
+    centroids = _kmeans_pp(x[pinned < 0], seeds, extra, rng)
+    if len(centroids):
+        assign, centroids = spherical_kmeans(x, centroids, pinned)
+        assign, centroids = _split_outliers(x, assign, centroids, pinned, min_sim)
+    else:
+        assign = np.zeros(0, dtype=np.int64)
+
+    return _compact(store, assign, centroids, labels, names)
+
+
+def _compact(
+    store: CorpusStore,
+    assign: np.ndarray,
+    centroids: np.ndarray,
+    labels: List[str],
+    corpus_keywords: List[str],
+) -> Dict[str, np.ndarray]:
+    """
+    Drop empty clusters and lay out the sections. Cluster `c` is named
+    labels[c] when that is set (curated), else after its most used keywords.
+    """
+    used, concept_of = np.unique(assign, return_inverse=True)
+    counts = _keyword_counts(store)
+    names: List[str] = []
+    curated: List[bool] = []
+    for c, old in enumerate(used.tolist()):
+        label = labels[old] if old < len(labels) else ""
+        curated.append(bool(label))
+        names.append(label or _label(np.flatnonzero(concept_of == c), store, counts))
+
+    sections: Dict[str, np.ndarray] = {}
+    sections.update(string_sections("keywords", corpus_keywords))
+    sections.update(string_sections("names", names))
+    sections["concept_of"] = concept_of.astype(np.int32)
+    sections["centroids"] = centroids[used].astype(np.float32)
+    sections["sizes"] = np.bincount(concept_of, minlength=len(used)).astype(np.int32)
+    sections["labeled"] = np.array(curated, dtype=bool)
+    return sections
+
+
+# ----------------------------
+# Reading / incremental update
+# ----------------------------
+
+class ConceptModel:
+    def __init__(self, sections: Sections):
+        if sections.meta.get("kind") != "concepts":
+            raise ValueError("section file is not a concept table")
+        self.sections = sections
+        self.version: str = sections.build_id
+        self.corpus_version: str = sections.meta["corpus"]
+        self.dim: int = sections.meta["dim"]
+
+        self.keywords = StringColumn.from_sections(sections, "keywords")
+        self.names = [StringColumn.from_sections(sections, "names")[i] for i in range(len(sections["sizes"]))]
+        self.concept_of: np.ndarray = sections["concept_of"]
+        self.centroids: np.ndarray = sections["centroids"]
+        self.sizes: np.ndarray = sections["sizes"]
+        self.labeled: np.ndarray = sections["labeled"]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def table(self) -> ConceptTable:
+        """Concept table over the corpus keyword ids this model was built for."""
+        return ConceptTable(self.concept_of, self.names)
+
+
+def update_concepts(store: CorpusStore, model: ConceptModel, min_sim: float = MIN_CONCEPT_SIM) -> Dict[str, np.ndarray]:
+    """
+    Re-key `model` onto `store`'s keyword vocabulary. Known keywords keep their
+    concept; only new ones are vectorized and assigned to the nearest centroid
+    (or their own concept below `min_sim`). Centroids move by running mean.
+    """
+    previous = {model.keywords[i]: int(model.concept_of[i]) for i in range(len(model.keywords))}
+    names = [store.keywords[i] for i in range(len(store.keywords))]
+    assign = np.array([previous.get(kw, -1) for kw in names], dtype=np.int64)
+    centroids = np.array(model.centroids, dtype=np.float64) * model.sizes[:, None]
+    labels = [name if labeled else "" for name, labeled in zip(model.names, model.labeled.tolist())]
+
+    new = np.flatnonzero(assign < 0)
+    if len(new):
+        x_new = keyword_vectors(store, new, dim=model.dim)
+        if len(model.centroids):
+            sim = x_new @ model.centroids.T
+            best = sim.argmax(axis=1)
+            close = sim[np.arange(len(new)), best] >= min_sim
+        else:
+            best = np.zeros(len(new), dtype=np.int64)
+            close = np.zeros(len(new), dtype=bool)
+        assign[new[close]] = best[close]
+        np.add.at(centroids, best[close], x_new[close])
+        fresh = np.flatnonzero(~close)
+        assign[new[fresh]] = len(centroids) + np.arange(len(fresh))
+        centroids = np.concatenate([centroids, x_new[fresh]])
+
+    # Curated labels are kept; the rest are renamed from their current members.
+    return _compact(store, assign, _normalize(centroids).astype(np.float32), labels, names)
+
+
+def write_concepts(store: CorpusStore, sections: Dict[str, np.ndarray], path: Optional[Path] = None) -> str:
+    path = path or data_path(CONCEPTS_FILE)
+    meta = {
+        "kind": "concepts",
+        "format": CONCEPTS_FORMAT,
+        "corpus": store.version,
+        "dim": int(sections["centroids"].shape[1]),
+    }
+    return write_sections(path, sections, meta)
+
+
+def load_concepts(store: CorpusStore, path: Optional[Path] = None) -> ConceptModel:
+    """Open the concept table for `store`: cluster on first use, update incrementally if stale."""
+    path = Path(path or data_path(CONCEPTS_FILE))
+
+    def build(model: Optional[ConceptModel]) -> None:
+        if model is not None:
+            write_concepts(store, update_concepts(store, model), path)
+        else:
+            from seed_data import AI_CANONICAL
+            write_concepts(store, cluster_keywords(store, AI_CANONICAL), path)
+    return open_current(path, ConceptModel, lambda model: model.corpus_version == store.version, build)
@@ -0,0 +1,230 @@
+# corpus_store.py
+"""
+Columnar, memory-mapped paper corpus.
+
+Layout (one section file, see storage.py):
+  - fixed-width columns: year (int32), relevance (float64)
+  - offset + blob columns: paper_id, title, authors, venue, snippet, abstract, doi
+  - keyword ids: kw.offsets (int64, n + 1) / kw.ids (int32) into the keyword vocabulary
+  - id_order: rows sorted by paper_id, for O(log n) id -> row lookups
+
+`Paper` objects are only materialized for the rows a page actually renders.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from models import Paper
+from storage import (
+    Sections,
+    StoreFormatError,
+    StringColumn,
+    data_path,
+    open_current,
+    sort_order,
+    sorted_lookup,
+    string_sections,
+    write_sections,
+)
+
+CORPUS_FILE = "corpus.bin"
+CORPUS_FORMAT = 1
+
+TEXT_COLUMNS = ("paper_id", "title", "authors", "venue", "snippet", "abstract", "doi")
+# Columns added after the first format; stores written before them read as "".
+_OPTIONAL_COLUMNS = ("doi",)
+
+_MATERIALIZED_CACHE_SIZE = 4096
+
+
+# ----------------------------
+# Building
+# ----------------------------
+
+def build_corpus_sections(papers: Iterable[Paper]) -> Dict[str, np.ndarray]:
+    papers = list(papers)
+
+    vocab: Dict[str, int] = {}
+    kw_ids: List[int] = []
+    kw_offsets = np.zeros(len(papers) + 1, dtype=np.int64)
+    for i, p in enumerate(papers):
+        for kw in p.keywords:
+            kw = kw.strip()
+            kw_ids.append(vocab.setdefault(kw, len(vocab)))
+        kw_offsets[i + 1] = len(kw_ids)
+
+    sections: Dict[str, np.ndarray] = {
+        "year": np.array([p.year for p in papers], dtype=np.int32),
+        "relevance": np.array([p.relevance for p in papers], dtype=np.float64),
+        "kw.offsets": kw_offsets,
+        "kw.ids": np.array(kw_ids, dtype=np.int32),
+    }
+    for col in TEXT_COLUMNS:
+        sections.update(string_sections(col, (getattr(p, col) for p in papers)))
+    sections.update(string_sections("keywords", vocab))
+    sections["id_order"] = sort_order([p.paper_id for p in papers])
+    return sections
+
+
+def write_corpus(papers: Iterable[Paper], path: Optional[Path] = None, meta: Optional[dict] = None) -> str:
+    path = path or data_path(CORPUS_FILE)
+    meta = {"kind": "corpus", "format": CORPUS_FORMAT, **(meta or {})}
+    return write_sections(path, build_corpus_sections(papers), meta)
+
+
+# ----------------------------
+# Reading
+# ----------------------------
+
+class CorpusStore:
+    def __init__(self, sections: Sections):
+        if sections.meta.get("kind") != "corpus":
+            raise ValueError("section file is not a corpus store")
+        self.sections = sections
+        self.version: str = sections.build_id
+
+        self.year: np.ndarray = sections["year"]
+        self.relevance: np.ndarray = sections["relevance"]
+        self.kw_offsets: np.ndarray = sections["kw.offsets"]
+        self.kw_ids: np.ndarray = sections["kw.ids"]
+        self.keywords = StringColumn.from_sections(sections, "keywords")
+        self.columns = {
+            col: StringColumn.from_sections(sections, col)
+            for col in TEXT_COLUMNS
+            if col not in _OPTIONAL_COLUMNS or f"{col}.offsets" in sections
+        }
+        self.ids = self.columns["paper_id"]
+        self._id_order: np.ndarray = sections["id_order"]
+
+        self._materialized: "OrderedDict[int, Paper]" = OrderedDict()
+        # Sessions and prefetch workers share the store.
+        self._materialized_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.year)
+
+    def row_of(self, paper_id: str) -> int:
+        return sorted_lookup(self.ids, paper_id, self._id_order)
+
+    def rows_of(self, paper_ids: Iterable[str]) -> np.ndarray:
+        rows = [self.row_of(pid) for pid in paper_ids]
+        return np.array([r for r in rows if r >= 0], dtype=np.int32)
+
+    def keyword_ids(self, row: int) -> np.ndarray:
+        return self.kw_ids[self.kw_offsets[row]:self.kw_offsets[row + 1]]
+
+    def paper(self, row: int) -> Paper:
+        with self._materialized_lock:
+            p = self._materialized.get(row)
+            if p is not None:
+                self._materialized.move_to_end(row)
+                return p
+
+        cols = self.columns
+        p = Paper(
+            paper_id=cols["paper_id"][row],
+            title=cols["title"][row],
+            authors=cols["authors"][row],
+            year=int(self.year[row]),
+            venue=cols["venue"][row],
+            relevance=float(self.relevance[row]),
+            keywords=[self.keywords[int(k)] for k in self.keyword_ids(row)],
+            snippet=cols["snippet"][row],
+            abstract=cols["abstract"][row],
+            doi=cols["doi"][row] if "doi" in cols else "",
+        )
+        with self._materialized_lock:
+            self._materialized[row] = p
+            if len(self._materialized) > _MATERIALIZED_CACHE_SIZE:
+                self._materialized.popitem(last=False)
+        return p
+
+    def papers(self, rows: Sequence[int], cache: bool = True) -> List[Paper]:
+        if cache:
+            return [self.paper(int(r)) for r in rows]
+        # Bulk reads (exports): decode column by column and leave the
+        # materialized-paper cache alone, which they would only churn.
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = self.columns
+        text = {name: cols[name].take(rows) for name in TEXT_COLUMNS if name in cols}
+        vocab: Dict[int, str] = {}
+        keywords = [
+            [vocab[k] if k in vocab else vocab.setdefault(k, self.keywords[k]) for k in self.keyword_ids(r).tolist()]
+            for r in rows.tolist()
+        ]
+        return [
+            Paper(
+                paper_id=pid, title=title, authors=authors, year=year, venue=venue, relevance=relevance,
+                keywords=kws, snippet=snippet, abstract=abstract, doi=doi,
+            )
+            for pid, title, authors, year, venue, relevance, kws, snippet, abstract, doi in zip(
+                text["paper_id"], text["title"], text["authors"], self.year[rows].tolist(), text["venue"],
+                self.relevance[rows].tolist(), keywords, text["snippet"], text["abstract"],
+                text.get("doi", [""] * len(rows)),
+            )
+        ]
+
+
+class PaperMapping(Mapping[str, Paper]):
+    """Dict-like `paper_id -> Paper` view over a CorpusStore."""
+
+    def __init__(self, store: CorpusStore):
+        self.store = store
+
+    def __getitem__(self, paper_id: str) -> Paper:
+        row = self.store.row_of(paper_id)
+        if row < 0:
+            raise KeyError(paper_id)
+        return self.store.paper(row)
+
+    def __contains__(self, paper_id) -> bool:
+        return isinstance(paper_id, str) and self.store.row_of(paper_id) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        ids = self.store.ids
+        return (ids[i] for i in range(len(ids)))
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+
+# ----------------------------
+# Loading
+# ----------------------------
+
+def _seed_digest() -> str:
+    from seed_data import SEED_PAPERS
+    return hashlib.sha1(repr(list(SEED_PAPERS.values())).encode()).hexdigest()[:16]
+
+
+def write_seed_corpus(path: Optional[Path] = None) -> str:
+    """Write the demo seed papers, marked with a digest of the seed data."""
+    from seed_data import SEED_PAPERS
+    return write_corpus(SEED_PAPERS.values(), path, {"source": "seed", "seed": _seed_digest()})
+
+
+def load_corpus(path: Optional[Path] = None) -> CorpusStore:
+    """
+    Open the corpus store, building it from the demo seed data on first use
+    and whenever the format or (for a seed-built store) the seed data changed.
+    Ingested stores in an old format are not replaced: re-run the ingest.
+    """
+    path = Path(path or data_path(CORPUS_FILE))
+    seed = _seed_digest()
+
+    def is_current(store: CorpusStore) -> bool:
+        meta = store.sections.meta
+        return meta.get("format") == CORPUS_FORMAT and meta.get("seed", seed) == seed
+
+    def build(previous: Optional[CorpusStore]) -> None:
+        if previous is not None and previous.sections.meta.get("source") == "ingest":
+            raise StoreFormatError(
+                f"{path} is an ingested corpus in format {previous.sections.meta.get('format')}, "
+                f"expected {CORPUS_FORMAT}; re-run `manage.py ingest`"
+            )
+        write_seed_corpus(path)
+    return open_current(path, CorpusStore, is_current, build)
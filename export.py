@@ -0,0 +1,188 @@
+# export.py
+"""
+Streaming export of a citation subgraph: the papers within `depth` hops of a
+set of seed rows (a chain's papers, or seeds given on the command line) and
+the citations among them.
+
+Selection is a hop array over the whole corpus (int32, -1 = not exported),
+filled by the same level-synchronous BFS as the multi-hop view
+(expansion.expand). The writers are generators of text chunks: they walk the
+hop array in fixed-size row blocks, materialize CHUNK_ROWS papers at a time
+and gather each block's edges from the CSR index, so memory stays bounded by
+the corpus-sized arrays however large the subgraph is.
+
+  jsonl    {"type": "paper", ..., "hop": h} per paper, then
+           {"type": "cites", "source": id, "target": id} per edge
+  bibtex   one @misc entry per paper; the keys it cites inside the subgraph
+           go in a `cites` field (ignored by BibTeX styles, kept by managers)
+  graphml  directed graph, paper fields as node data
+"""
+import json
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+
+from citation_index import CitationIndex
+from corpus_store import CorpusStore
+from expansion import expand
+from models import Paper
+
+# Corpus rows scanned per block of the hop array, and papers per emitted chunk.
+BLOCK_ROWS = 1 << 16
+CHUNK_ROWS = 1024
+
+DIRECTIONS = ("cites", "cited_by", "both")
+
+
+# ----------------------------
+# Selection
+# ----------------------------
+
+def subgraph_hops(index: CitationIndex, seeds: Iterable[int], depth: int, direction: str = "cites") -> np.ndarray:
+    """Hop of every corpus row from `seeds` (0 for the seeds themselves), -1 beyond `depth`."""
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction must be one of {', '.join(DIRECTIONS)}")
+    seeds = np.unique(np.asarray(list(seeds), dtype=np.int64))
+    hops = np.full(len(index), -1, dtype=np.int32)
+    hops[seeds] = 0
+    for reverse in {"cites": (False,), "cited_by": (True,), "both": (False, True)}[direction]:
+        for level in expand(index, seeds, depth, reverse=reverse):
+            fresh = level.rows[hops[level.rows] < 0]
+            hops[fresh] = level.hop
+    return hops
+
+
+def subgraph_size(hops: np.ndarray) -> int:
+    return int(np.count_nonzero(hops >= 0))
+
+
+def _blocks(hops: np.ndarray) -> Iterator[np.ndarray]:
+    """Selected rows, ascending, at most CHUNK_ROWS at a time."""
+    for start in range(0, len(hops), BLOCK_ROWS):
+        rows = start + np.flatnonzero(hops[start:start + BLOCK_ROWS] >= 0)
+        for i in range(0, len(rows), CHUNK_ROWS):
+            yield rows[i:i + CHUNK_ROWS]
+
+
+def _papers(store: CorpusStore, rows: np.ndarray) -> List[Paper]:
+    return store.papers(rows, cache=False)
+
+
+def _edges(index: CitationIndex, hops: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Citations from `rows` to selected rows, as (citing row, cited row) arrays."""
+    pos, cited = index.gather(rows)
+    keep = hops[cited] >= 0
+    return rows[pos[keep]], cited[keep]
+
+
+def _edge_ids(store: CorpusStore, src: np.ndarray, dst: np.ndarray, quote: Callable[[str], str]) -> Iterator[Tuple[str, str]]:
+    """(citing, cited) ids, each distinct row decoded and quoted once per block."""
+    rows, inverse = np.unique(np.concatenate([src, dst]), return_inverse=True)
+    quoted = [quote(pid) for pid in store.ids.take(rows)]
+    inverse = inverse.tolist()
+    return ((quoted[s], quoted[d]) for s, d in zip(inverse[:len(src)], inverse[len(src):]))
+
+
+# ----------------------------
+# Writers
+# ----------------------------
+
+def _json(value: object) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+
+def write_jsonl(store: CorpusStore, index: CitationIndex, hops: np.ndarray) -> Iterator[str]:
+    for rows in _blocks(hops):
+        yield "".join(
+            _json({"type": "paper", **vars(p), "hop": h}) + "\n"
+            for p, h in zip(_papers(store, rows), hops[rows].tolist())
+        )
+    for rows in _blocks(hops):
+        yield "".join(
+            f'{{"type": "cites", "source": {s}, "target": {d}}}\n'
+            for s, d in _edge_ids(store, *_edges(index, hops, rows), _json)
+        )
+
+
+_BIB_SPECIAL = re.compile(r"([\\{}&%$#_])")
+_BIB_KEY = re.compile(r"[^A-Za-z0-9_:.-]")
+
+
+def _bib(text: str) -> str:
+    return _BIB_SPECIAL.sub(lambda m: r"\textbackslash{}" if m.group(1) == "\\" else "\\" + m.group(1), text)
+
+
+def bibtex_key(paper_id: str) -> str:
+    return _BIB_KEY.sub("_", paper_id)
+
+
+def _bibtex_entry(p: Paper, cites: List[str]) -> str:
+    fields = [
+        ("title", p.title),
+        ("author", " and ".join(a.strip() for a in p.authors.split(",") if a.strip())),
+        ("year", str(p.year)),
+        ("howpublished", p.venue),
+        ("doi", p.doi),
+        ("keywords", ", ".join(p.keywords)),
+        ("abstract", p.abstract),
+    ]
+    body = ",\n".join(f"  {name} = {{{_bib(value)}}}" for name, value in fields if value)
+    if cites:
+        body += ",\n  cites = {" + ", ".join(cites) + "}"
+    return f"@misc{{{bibtex_key(p.paper_id)},\n{body}\n}}\n\n"
+
+
+def write_bibtex(store: CorpusStore, index: CitationIndex, hops: np.ndarray) -> Iterator[str]:
+    for rows in _blocks(hops):
+        src, dst = _edges(index, hops, rows)
+        cited: Dict[int, List[str]] = {}
+        for s, (_, d) in zip(src.tolist(), _edge_ids(store, src, dst, bibtex_key)):
+            cited.setdefault(s, []).append(d)
+        yield "".join(_bibtex_entry(p, cited.get(int(r), [])) for r, p in zip(rows, _papers(store, rows)))
+
+
+_GRAPHML_KEYS = (
+    ("title", "string"), ("authors", "string"), ("year", "int"), ("venue", "string"),
+    ("doi", "string"), ("relevance", "double"), ("hop", "int"),
+)
+
+
+def write_graphml(store: CorpusStore, index: CitationIndex, hops: np.ndarray) -> Iterator[str]:
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+        + "".join(f'  <key id="{k}" for="node" attr.name="{k}" attr.type="{t}"/>\n' for k, t in _GRAPHML_KEYS)
+        + '  <graph id="citations" edgedefault="directed">\n'
+    )
+    for rows in _blocks(hops):
+        chunk = []
+        for p, h in zip(_papers(store, rows), hops[rows].tolist()):
+            values = {**vars(p), "hop": h}
+            data = "".join(f'<data key="{k}">{escape(str(values[k]))}</data>' for k, _ in _GRAPHML_KEYS if values[k] != "")
+            chunk.append(f"    <node id={quoteattr(p.paper_id)}>{data}</node>\n")
+        yield "".join(chunk)
+    for rows in _blocks(hops):
+        yield "".join(
+            f"    <edge source={s} target={d}/>\n"
+            for s, d in _edge_ids(store, *_edges(index, hops, rows), quoteattr)
+        )
+    yield "  </graph>\n</graphml>\n"
+
+
+Writer = Callable[[CorpusStore, CitationIndex, np.ndarray], Iterator[str]]
+
+# format -> (writer, file extension, MIME type)
+FORMATS: Dict[str, Tuple[Writer, str, str]] = {
+    "jsonl": (write_jsonl, "jsonl", "application/x-ndjson"),
+    "bibtex": (write_bibtex, "bib", "application/x-bibtex"),
+    "graphml": (write_graphml, "graphml", "application/graphml+xml"),
+}
+
+
+def export(store: CorpusStore, index: CitationIndex, hops: np.ndarray, fmt: str) -> Iterator[str]:
+    """The subgraph selected by `hops` as text chunks in `fmt` (see FORMATS)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    return FORMATS[fmt][0](store, index, hops)
@@ -0,0 +1,252 @@
+# facets.py
+"""
+Facet filters for result lists, backed by bitmap indexes (data/facets.bin).
+
+Every facet value has a precomputed bitmap over the corpus rows (row r is bit
+r & 7 of byte r >> 3, np.packbits(bitorder="little") order):
+
+  year     one bitmap per publication year (a range is the OR of its years)
+  venue    one per venue                      } the MAX_VALUES most frequent
+  keyword  one per exact keyword              } values of each; rarer ones
+  concept  one per AI-mode concept            } are not offered as filters
+  refs     "with references" / "without references" (cites a corpus paper or not)
+
+  <facet>.labels.offsets / .blob   value labels, in display order
+  <facet>.bits                     uint8[values, ceil(n / 8)]
+
+Queries only touch the bitmap bytes the current result set falls in (at most
+one per result row, however large the corpus): over those bytes the result
+set is itself a bitmap, a filter is an OR of the chosen values' bitmaps
+within a facet and an AND across facets, and a facet's counts are one
+popcount of its values' bitmaps against the result set and the *other*
+facets' masks, so picking a venue keeps the other venues' counts visible.
+A facet whose chosen labels are all unknown (a year range no year falls in)
+matches no rows.
+
+In URLs a facet's chosen labels are one parameter, joined by LABEL_SEP
+(`join_labels` / `split_labels`; a separator or backslash inside a label is
+backslash-escaped).
+"""
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from citation_index import CitationIndex
+from concepts import ConceptModel
+from corpus_store import CorpusStore
+from grouping import ConceptTable
+from storage import (
+    Sections,
+    StringColumn,
+    csr_from_pairs,
+    csr_gather,
+    data_path,
+    open_current,
+    string_sections,
+    write_sections,
+)
+
+FACETS_FILE = "facets.bin"
+FACETS_FORMAT = 1
+
+FACETS = ("year", "venue", "keyword", "concept", "refs")
+MAX_VALUES = 256
+REFS_LABELS = ("with references", "without references")
+
+# facet -> chosen labels; OR within a facet, AND across facets.
+Selection = Mapping[str, Sequence[str]]
+
+LABEL_SEP = "|"
+_LABEL = re.compile(r"(?:\\.|[^\\%s])+" % re.escape(LABEL_SEP))
+_LABEL_ESCAPE = re.compile(r"\\(.)")
+
+
+# ----------------------------
+# Labels in URLs
+# ----------------------------
+
+def join_labels(labels: Iterable[str]) -> str:
+    return LABEL_SEP.join(label.replace("\\", "\\\\").replace(LABEL_SEP, "\\" + LABEL_SEP) for label in labels)
+
+
+def split_labels(value: str) -> Tuple[str, ...]:
+    return tuple(_LABEL_ESCAPE.sub(r"\1", label) for label in _LABEL.findall(value))
+
+
+# ----------------------------
+# Building
+# ----------------------------
+
+def _bitmaps(rows: np.ndarray, values: np.ndarray, num_values: int, n: int) -> np.ndarray:
+    """Packed bitmaps [num_values, ceil(n / 8)], with bit rows[i] set in bitmap values[i]."""
+    offsets, grouped = csr_from_pairs(values, rows, num_values)
+    bits = np.zeros((num_values, (n + 7) // 8), dtype=np.uint8)
+    member = np.zeros(n, dtype=bool)
+    for v in range(num_values):
+        members = grouped[offsets[v]:offsets[v + 1]]
+        member[members] = True
+        bits[v] = np.packbits(member, bitorder="little")
+        member[members] = False
+    return bits
+
+
+def _most_frequent(
+    rows: np.ndarray, values: np.ndarray, labels: Sequence[str], max_values: int
+) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Keep the `max_values` most frequent values, renumbered most frequent first."""
+    counts = np.bincount(values, minlength=len(labels))
+    keep = np.argsort(-counts, kind="stable")[:max_values]
+    keep = keep[counts[keep] > 0]
+    renumber = np.full(len(labels), -1, dtype=np.int64)
+    renumber[keep] = np.arange(len(keep))
+    kept = renumber[values] >= 0
+    return rows[kept], renumber[values[kept]], [labels[i] for i in keep]
+
+
+def _encode(values: Iterable[str]) -> Tuple[np.ndarray, List[str]]:
+    vocab: Dict[str, int] = {}
+    ids = np.array([vocab.setdefault(v, len(vocab)) for v in values], dtype=np.int64)
+    return ids, list(vocab)
+
+
+def build_facet_sections(
+    store: CorpusStore, index: CitationIndex, concepts: ConceptTable, max_values: int = MAX_VALUES
+) -> Dict[str, np.ndarray]:
+    n = len(store)
+    all_rows = np.arange(n, dtype=np.int32)
+    sections: Dict[str, np.ndarray] = {}
+
+    def add(name: str, rows: np.ndarray, values: np.ndarray, labels: List[str]) -> None:
+        sections.update(string_sections(f"{name}.labels", labels))
+        sections[f"{name}.bits"] = _bitmaps(rows, values, len(labels), n)
+
+    years, year_of = np.unique(store.year, return_inverse=True)
+    add("year", all_rows, year_of, [str(y) for y in years.tolist()])
+
+    venue_of, venues = _encode(store.columns["venue"].take(all_rows))
+    named = np.array([v.strip() != "" for v in venues], dtype=bool)[venue_of]
+    add("venue", *_most_frequent(all_rows[named], venue_of[named], venues, max_values))
+
+    pos, kw = csr_gather(store.kw_offsets, store.kw_ids, all_rows)
+    kw_rows = pos.astype(np.int32)
+    keywords = store.keywords.take(np.arange(len(store.keywords)))
+    add("keyword", *_most_frequent(kw_rows, kw.astype(np.int64), keywords, max_values))
+    add("concept", *_most_frequent(kw_rows, concepts.concept_of[kw].astype(np.int64), concepts.names, max_values))
+
+    add("refs", all_rows, (index.out_degree() == 0).astype(np.int64), list(REFS_LABELS))
+    return sections
+
+
+def write_facets(store: CorpusStore, index: CitationIndex, concepts: ConceptModel, path: Optional[Path] = None) -> str:
+    path = path or data_path(FACETS_FILE)
+    meta = {
+        "kind": "facets",
+        "format": FACETS_FORMAT,
+        "corpus": store.version,
+        "citations": index.version,
+        "concepts": concepts.version,
+        "max_values": MAX_VALUES,
+    }
+    return write_sections(path, build_facet_sections(store, index, concepts), meta)
+
+
+# ----------------------------
+# Reading
+# ----------------------------
+
+class FacetIndex:
+    def __init__(self, sections: Sections):
+        if sections.meta.get("kind") != "facets":
+            raise ValueError("section file is not a facet index")
+        self.sections = sections
+        self.version: str = sections.build_id
+        self.corpus_version: str = sections.meta["corpus"]
+        self.citations_version: str = sections.meta["citations"]
+        self.concepts_version: str = sections.meta["concepts"]
+
+        self.labels: Dict[str, List[str]] = {}
+        self._ids: Dict[str, Dict[str, int]] = {}
+        self._bits: Dict[str, np.ndarray] = {}
+        for name in FACETS:
+            col = StringColumn.from_sections(sections, f"{name}.labels")
+            self.labels[name] = col.take(np.arange(len(col)))
+            self._ids[name] = {label: i for i, label in enumerate(self.labels[name])}
+            self._bits[name] = sections[f"{name}.bits"]
+
+    def _space(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The bitmap bytes `rows` fall in, and the result set as a bitmap over
+        just those bytes; both padded to a multiple of 8 (repeating the last
+        byte, with no result bits) so masks can be ANDed 64 bits at a time.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        bytes_, at = np.unique(rows >> 3, return_inverse=True)
+        pad = -len(bytes_) % 8
+        own = np.zeros(len(bytes_) + pad, dtype=np.uint8)
+        np.bitwise_or.at(own, at, (1 << (rows & 7)).astype(np.uint8))
+        return np.concatenate([bytes_, np.repeat(bytes_[-1:], pad)]), own
+
+    def _gather(self, name: str, ids: Optional[Sequence[int]], bytes_: np.ndarray) -> np.ndarray:
+        """Bytes `bytes_` of the facet's bitmaps (all, or the value ids `ids`): uint8[values, len(bytes_)]."""
+        if ids is None:
+            return np.take(self._bits[name], bytes_, axis=1)
+        return self._bits[name][np.ix_(ids, bytes_)]
+
+    def _masks(self, bytes_: np.ndarray, selection: Selection) -> Dict[str, np.ndarray]:
+        """Per selected facet, the OR of the chosen values' bitmaps at `bytes_` (none if no label is known)."""
+        masks: Dict[str, np.ndarray] = {}
+        for name, labels in selection.items():
+            if name not in self._ids:
+                continue
+            ids = [self._ids[name][label] for label in labels if label in self._ids[name]]
+            if ids:
+                masks[name] = np.bitwise_or.reduce(self._gather(name, ids, bytes_), axis=0)
+            else:
+                masks[name] = np.zeros(len(bytes_), dtype=np.uint8)
+        return masks
+
+    def filter(self, rows: np.ndarray, selection: Selection) -> np.ndarray:
+        """The rows of `rows` matching `selection`, in order."""
+        rows = np.asarray(rows)
+        masks = self._masks(rows >> 3, selection)  # one byte per row: no dedupe needed
+        if not masks:
+            return rows
+        mask = np.bitwise_and.reduce(list(masks.values()))
+        return rows[((mask >> (rows & 7).astype(np.uint8)) & 1).astype(bool)]
+
+    def counts(
+        self, rows: np.ndarray, selection: Selection, facets: Sequence[str] = FACETS
+    ) -> Dict[str, List[Tuple[str, int]]]:
+        """
+        Per facet, (label, count) for the values present among `rows` that
+        match the other facets' selection: years in order, the rest most
+        frequent first. Repeated rows count once.
+        """
+        bytes_, own = self._space(rows)
+        masks = self._masks(bytes_, selection)
+        out: Dict[str, List[Tuple[str, int]]] = {}
+        for name in facets:
+            mask = np.bitwise_and.reduce([own, *(m for other, m in masks.items() if other != name)])
+            block = self._gather(name, None, bytes_)
+            n = np.bitwise_count(block.view(np.uint64) & mask.view(np.uint64)).sum(axis=1)
+            present = np.flatnonzero(n)
+            if name != "year":
+                present = present[np.argsort(-n[present], kind="stable")]
+            out[name] = [(self.labels[name][i], int(n[i])) for i in present.tolist()]
+        return out
+
+
+def load_facets(store: CorpusStore, index: CitationIndex, concepts: ConceptModel, path: Optional[Path] = None) -> FacetIndex:
+    """Open the facet index for `store` / `index` / `concepts`, rebuilding it if missing or stale."""
+    path = Path(path or data_path(FACETS_FILE))
+    return open_current(
+        path, FacetIndex,
+        lambda facets: (
+            facets.corpus_version == store.version
+            and facets.citations_version == index.version
+            and facets.concepts_version == concepts.version
+        ),
+        lambda _: write_facets(store, index, concepts, path),
+    )
@@ -0,0 +1,87 @@
+# grouping.py
+"""
+Keyword grouping over corpus rows.
+
+Keywords are already dictionary-encoded in the corpus store (kw.offsets /
+kw.ids). A concept table maps keyword id -> concept id, so grouping a result
+set is a gather over those arrays plus a unique/bincount, with group
+membership and the best-member group score produced in the same pass.
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from corpus_store import CorpusStore
+from storage import csr_gather
+
+
+@dataclass
+class ConceptTable:
+    concept_of: np.ndarray  # int32[num_keywords] -> concept id
+    names: List[str]        # concept id -> display label
+
+
+@dataclass
+class Grouping:
+    names: List[str]           # group labels, in display order
+    members: List[np.ndarray]  # corpus rows per group, in input order
+    scores: np.ndarray         # best member score per group
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def items(self) -> List[Tuple[str, np.ndarray]]:
+        return list(zip(self.names, self.members))
+
+
+def identity_concepts(store: CorpusStore) -> ConceptTable:
+    """One concept per exact keyword (non-AI mode)."""
+    n = len(store.keywords)
+    return ConceptTable(np.arange(n, dtype=np.int32), [store.keywords[i] for i in range(n)])
+
+
+def group_rows(
+    store: CorpusStore,
+    rows: np.ndarray,
+    concepts: ConceptTable,
+    by_score: bool = False,
+    row_scores: Optional[np.ndarray] = None,
+) -> Grouping:
+    """
+    Group `rows` by concept. A group's score is its best member's (from
+    `row_scores`, aligned with `rows`, or the stored relevance). Groups come in
+    first-appearance order (or by descending score with first appearance
+    breaking ties when `by_score`); members keep their order in `rows`, and a
+    paper appears once per group.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if len(rows) == 0:
+        return Grouping([], [], np.zeros(0))
+    if row_scores is None:
+        row_scores = store.relevance[rows]
+
+    # Gather every (result position, keyword id) pair in one shot.
+    pos, kw = csr_gather(store.kw_offsets, store.kw_ids, rows)
+    group = concepts.concept_of[kw].astype(np.int64)
+
+    # Dedupe (group, position) pairs; sorted keys are grouped by concept, then by position.
+    pairs = np.unique(group * len(rows) + pos)
+    pair_group, pair_pos = np.divmod(pairs, len(rows))
+
+    present, first_seen = np.unique(group, return_index=True)
+    counts = np.bincount(np.searchsorted(present, pair_group), minlength=len(present))
+    scores = np.full(len(present), -np.inf)
+    np.maximum.at(scores, np.searchsorted(present, pair_group), row_scores[pair_pos])
+
+    order = np.argsort(first_seen, kind="stable")
+    if by_score:
+        order = order[np.argsort(-scores[order], kind="stable")]
+
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    member_rows = rows[pair_pos].astype(np.int32)
+    return Grouping(
+        names=[concepts.names[int(present[g])] for g in order],
+        members=[member_rows[bounds[g]:bounds[g + 1]] for g in order],
+        scores=scores[order],
+    )
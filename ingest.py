@@ -0,0 +1,564 @@
+# ingest.py
+"""
+Streaming bulk ingest of paper dumps into the corpus and citation stores.
+
+    python manage.py ingest papers.jsonl [more.csv.gz ...] [--append]
+
+Records flow through a generator pipeline in bounded memory:
+
+  read (JSONL / CSV, optionally gzipped) -> validate against Paper's fields
+  -> external sort by dedupe key (normalized DOI, else normalized title)
+  -> merge duplicates -> external sort by title, fold DOI-less duplicates
+  into the record with a DOI -> external sort by paper id
+  -> column spill files, written in batches -> corpus.bin
+  -> reference strings resolved through a sorted 64-bit key table -> citations.bin
+
+At most one sort chunk (`chunk_size` records) is in memory at a time. Rows are
+written in paper-id order, so the corpus id index is the identity
+permutation. Rejected records and unresolved references go to TSV reports
+next to the stores.
+
+Record fields are Paper's fields plus `references`: a list of paper ids,
+DOIs or titles. In CSV cells, lists are a JSON array or separated by ";"
+(keywords) or "|" (references).
+"""
+import csv
+import dataclasses
+import gzip
+import heapq
+import json
+import pickle
+import tempfile
+import time
+import typing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+import numpy as np
+
+from citation_index import CITATIONS_FILE, CitationIndex, write_citations
+from corpus_store import CORPUS_FILE, CORPUS_FORMAT, TEXT_COLUMNS, CorpusStore
+from models import Paper
+from search import normalize_doi, normalize_title
+from storage import data_path, open_cached, store_lock, string_sections, write_sections
+
+T = TypeVar("T")
+
+SORT_CHUNK = 200_000
+_BATCH = 4096
+
+REJECTED_FILE = "ingest-rejected.tsv"
+UNRESOLVED_FILE = "ingest-unresolved.tsv"
+
+_LIST_SEPARATORS = {"keywords": ";", "references": "|"}
+
+# Between stages a record is a plain tuple (cheap to pickle):
+#   (*Paper fields in declaration order, references, aliases, normalized title, dedupe key)
+_FIELDS = [f.name for f in dataclasses.fields(Paper)]
+_TYPES = typing.get_type_hints(Paper)
+_COL = {name: i for i, name in enumerate(_FIELDS)}
+_REFS = len(_FIELDS)
+_ALIASES = _REFS + 1
+_NORM_TITLE = _REFS + 2
+_DEDUPE = _REFS + 3
+_REQUIRED = ("paper_id", "title")
+_DEFAULTS = {"authors": "", "year": 0, "venue": "", "relevance": 0.0, "keywords": [], "snippet": "", "abstract": "", "doi": ""}
+
+Record = tuple
+
+
+class RecordError(ValueError):
+    pass
+
+
+@dataclass
+class IngestReport:
+    read: int = 0
+    rejected: int = 0
+    duplicates: int = 0
+    papers: int = 0
+    edges: int = 0
+    unresolved: int = 0
+    seconds: float = 0.0
+    corpus_build: str = ""
+    citations_build: str = ""
+    rejected_path: Optional[Path] = None
+    unresolved_path: Optional[Path] = None
+
+
+# ----------------------------
+# Reading / validation
+# ----------------------------
+
+def _open_text(path: Path) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def read_records(path: Path) -> Iterator[Tuple[str, Any]]:
+    """(location, raw record) pairs; unparsable lines come through as RecordError."""
+    path = Path(path)
+    fmt = path.with_suffix("").suffix if path.suffix == ".gz" else path.suffix
+    if fmt not in (".jsonl", ".ndjson", ".csv"):
+        raise ValueError(f"unsupported dump format: {path.name} (expected .jsonl or .csv, optionally .gz)")
+    with _open_text(path) as f:
+        if fmt == ".csv":
+            for lineno, row in enumerate(csv.DictReader(f), start=2):
+                yield f"{path.name}:{lineno}", row
+            return
+        for lineno, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield f"{path.name}:{lineno}", json.loads(line)
+            except json.JSONDecodeError as e:
+                yield f"{path.name}:{lineno}", RecordError(f"bad JSON: {e.msg}")
+
+
+def _as_list(value: Any, sep: str) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.strip()
+        if not value.startswith("["):
+            return [v.strip() for v in value.split(sep) if v.strip()]
+        value = json.loads(value)
+    if not isinstance(value, list):
+        raise RecordError("expected a list")
+    return [str(v).strip() for v in value if str(v).strip()]
+
+
+def _coerce(name: str, value: Any) -> Any:
+    kind = _TYPES[name]
+    if kind is int:
+        return int(str(value).strip())
+    if kind is float:
+        return float(value)
+    if kind is str:
+        return str(value).strip()
+    return _as_list(value, _LIST_SEPARATORS[name])
+
+
+def validate(raw: Iterable[Tuple[str, Any]], reject: Callable[[str, str], None]) -> Iterator[Record]:
+    """Records coerced to Paper's field types; anything else is passed to `reject(location, reason)`."""
+    for where, obj in raw:
+        if isinstance(obj, RecordError):
+            reject(where, str(obj))
+            continue
+        if not isinstance(obj, dict):
+            reject(where, "record is not an object")
+            continue
+        values = []
+        name = ""
+        try:
+            for name in _FIELDS:
+                value = obj.get(name)
+                if value is None or value == "":
+                    if name in _REQUIRED:
+                        raise RecordError("missing value")
+                    values.append(_DEFAULTS[name])
+                else:
+                    values.append(_coerce(name, value))
+            name = "references"
+            refs = _as_list(obj.get(name), _LIST_SEPARATORS[name])
+        except (ValueError, TypeError) as e:
+            reject(where, f"{name}: {e}")
+            continue
+        norm_title = normalize_title(values[_COL["title"]])
+        if not norm_title:
+            reject(where, "title has no words")
+            continue
+        doi = normalize_doi(values[_COL["doi"]]) if values[_COL["doi"]] else None
+        yield (*values, refs, [], norm_title, f"d:{doi}" if doi else f"t:{norm_title}")
+
+
+def existing_records(store: CorpusStore, citations: Optional[CitationIndex]) -> Iterator[Tuple[str, Any]]:
+    """The current corpus (and its edges, as id references) in read_records' shape."""
+    # Column reads: the app shares this store, and its paper cache is not ours to churn.
+    for start in range(0, len(store), _BATCH):
+        rows = np.arange(start, min(start + _BATCH, len(store)))
+        for row, p in zip(rows.tolist(), store.papers(rows, cache=False)):
+            refs = [store.ids[int(r)] for r in citations.cites(row)] if citations is not None else []
+            yield f"{CORPUS_FILE}:{row}", {**dataclasses.asdict(p), "references": refs}
+
+
+# ----------------------------
+# External sort / dedupe
+# ----------------------------
+
+def _write_run(items: List[T], tmpdir: Path) -> Path:
+    f = tempfile.NamedTemporaryFile(dir=tmpdir, suffix=".run", delete=False)
+    with f:
+        for i in range(0, len(items), _BATCH):
+            pickle.dump(items[i:i + _BATCH], f, protocol=pickle.HIGHEST_PROTOCOL)
+    return Path(f.name)
+
+
+def _read_run(path: Path) -> Iterator[T]:
+    try:
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    batch = pickle.load(f)
+                except EOFError:
+                    return
+                yield from batch
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def external_sort(items: Iterable[T], key: Callable[[T], Any], tmpdir: Path, chunk_size: int = SORT_CHUNK) -> Iterator[T]:
+    """Stable sort of an arbitrarily long stream: sorted runs of `chunk_size` spilled to disk, then merged."""
+    runs: List[Path] = []
+    chunk: List[T] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            chunk.sort(key=key)
+            runs.append(_write_run(chunk, tmpdir))
+            chunk = []
+    chunk.sort(key=key)
+    if not runs:
+        yield from chunk
+        return
+    runs.append(_write_run(chunk, tmpdir))
+    del chunk
+    # heapq.merge keeps ties in run order, so earlier input still wins.
+    yield from heapq.merge(*(_read_run(r) for r in runs), key=key)
+
+
+def dedupe_key(rec: Record) -> str:
+    """Normalized DOI, else normalized title (computed once, in validate)."""
+    return rec[_DEDUPE]
+
+
+def title_key(rec: Record) -> Tuple[str, bool]:
+    """Normalized title, records with a DOI first."""
+    return rec[_NORM_TITLE], not rec[_DEDUPE].startswith("d:")
+
+
+def paper_id_key(rec: Record) -> str:
+    return rec[_COL["paper_id"]]
+
+
+def _merge_group(group: List[Record]) -> Record:
+    """First record wins; later duplicates fill its empty fields and add keywords, references and ids."""
+    first = list(group[0])
+    for dup in group[1:]:
+        for name in _FIELDS:
+            i = _COL[name]
+            if not first[i] and dup[i]:
+                first[i] = dup[i]
+        first[_COL["keywords"]] = list(dict.fromkeys([*first[_COL["keywords"]], *dup[_COL["keywords"]]]))
+        first[_REFS] = list(dict.fromkeys([*first[_REFS], *dup[_REFS]]))
+        if dup[_COL["paper_id"]] != first[_COL["paper_id"]]:
+            first[_ALIASES] = [*first[_ALIASES], dup[_COL["paper_id"]]]
+    return tuple(first)
+
+
+def merge_duplicates(records: Iterable[Record], report: IngestReport) -> Iterator[Record]:
+    """Collapse runs of equal dedupe key (input sorted by it)."""
+    group: List[Record] = []
+    group_key = None
+    for rec in records:
+        key = dedupe_key(rec)
+        if group and key != group_key:
+            yield _merge_group(group)
+            group = []
+        group.append(rec)
+        group_key = key
+        if len(group) > 1:
+            report.duplicates += 1
+    if group:
+        yield _merge_group(group)
+
+
+def merge_doiless(records: Iterable[Record], report: IngestReport) -> Iterator[Record]:
+    """
+    Fold records without a DOI into the first record with the same normalized
+    title (input sorted by title_key). Records with different DOIs stay apart.
+    """
+    def flush(group: List[Record]) -> Iterator[Record]:
+        with_doi = [r for r in group if r[_DEDUPE].startswith("d:")]
+        without = [r for r in group if not r[_DEDUPE].startswith("d:")]
+        if with_doi:
+            report.duplicates += len(without)
+            yield _merge_group([with_doi[0], *without])
+            yield from with_doi[1:]
+        else:
+            yield _merge_group(without)
+
+    group: List[Record] = []
+    for rec in records:
+        if group and rec[_NORM_TITLE] != group[0][_NORM_TITLE]:
+            yield from flush(group)
+            group = []
+        group.append(rec)
+    if group:
+        yield from flush(group)
+
+
+def unique_ids(records: Iterable[Record], reject: Callable[[str, str], None]) -> Iterator[Record]:
+    """Drop later records reusing a paper id (input sorted by id)."""
+    last = None
+    for rec in records:
+        pid = paper_id_key(rec)
+        if pid == last:
+            reject(pid, "paper_id reused by a different paper")
+            continue
+        last = pid
+        yield rec
+
+
+# ----------------------------
+# Writing
+# ----------------------------
+
+def _key_hash(key: str) -> int:
+    # The key table only lives for one ingest run, so the (per-process salted)
+    # builtin string hash is enough; 64 bits keep collisions negligible.
+    return hash(key)
+
+
+class _Spill:
+    """Append-only binary column on disk, read back as a memmap."""
+
+    def __init__(self, path: Path, dtype):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.count = 0
+        self._f = open(path, "wb")
+
+    def append(self, values) -> None:
+        arr = np.asarray(values, dtype=self.dtype)
+        self._f.write(arr.tobytes())
+        self.count += len(arr)
+
+    def array(self) -> np.ndarray:
+        self._f.close()
+        if self.count == 0:
+            return np.zeros(0, dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode="r", shape=(self.count,))
+
+
+class CorpusWriter:
+    """Writes id-sorted records as corpus.bin sections, one batch of rows at a time."""
+
+    def __init__(self, tmpdir: Path):
+        self.tmpdir = tmpdir
+        self.rows = 0
+        self._year = _Spill(tmpdir / "year", np.int32)
+        self._relevance = _Spill(tmpdir / "relevance", np.float64)
+        self._text = {
+            col: (_Spill(tmpdir / f"{col}.offsets", np.uint64), _Spill(tmpdir / f"{col}.blob", np.uint8))
+            for col in TEXT_COLUMNS
+        }
+        self._text_end = {col: 0 for col in TEXT_COLUMNS}
+        for offsets, _ in self._text.values():
+            offsets.append([0])
+        self._kw_offsets = _Spill(tmpdir / "kw.offsets", np.int64)
+        self._kw_offsets.append([0])
+        self._kw_ids = _Spill(tmpdir / "kw.ids", np.int32)
+        self._vocab: Dict[str, int] = {}
+        # (hash of "i:<id>" / "d:<doi>" / "t:<title>", row) for reference resolution.
+        self._key_hash = _Spill(tmpdir / "keys.hash", np.int64)
+        self._key_row = _Spill(tmpdir / "keys.row", np.int32)
+        self._refs = open(tmpdir / "refs", "wb")
+
+    def add(self, batch: List[Record]) -> None:
+        first_row = self.rows
+        self._year.append([r[_COL["year"]] for r in batch])
+        self._relevance.append([r[_COL["relevance"]] for r in batch])
+        for col, (offsets, blob) in self._text.items():
+            encoded = [r[_COL[col]].encode("utf-8") for r in batch]
+            ends = self._text_end[col] + np.cumsum([len(b) for b in encoded], dtype=np.uint64)
+            offsets.append(ends)
+            blob.append(np.frombuffer(b"".join(encoded), dtype=np.uint8))
+            if len(ends):
+                self._text_end[col] = int(ends[-1])
+
+        kw_ids = [self._vocab.setdefault(kw, len(self._vocab)) for r in batch for kw in r[_COL["keywords"]]]
+        self._kw_ids.append(kw_ids)
+        self._kw_offsets.append(self._kw_ids.count - len(kw_ids) + np.cumsum([len(r[_COL["keywords"]]) for r in batch]))
+
+        hashes: List[int] = []
+        rows: List[int] = []
+        refs: List[Tuple[int, str]] = []
+        for row, r in enumerate(batch, start=first_row):
+            keys = [f"i:{r[_COL['paper_id']]}", f"t:{r[_NORM_TITLE]}"]
+            if r[_DEDUPE].startswith("d:"):
+                keys.append(r[_DEDUPE])
+            keys.extend(f"i:{alias}" for alias in r[_ALIASES])
+            hashes.extend(_key_hash(k) for k in keys)
+            rows.extend([row] * len(keys))
+            refs.extend((row, ref) for ref in r[_REFS])
+        self._key_hash.append(hashes)
+        self._key_row.append(rows)
+        pickle.dump(refs, self._refs, protocol=pickle.HIGHEST_PROTOCOL)
+        self.rows += len(batch)
+
+    def sections(self) -> Dict[str, np.ndarray]:
+        sections: Dict[str, np.ndarray] = {
+            "year": self._year.array(),
+            "relevance": self._relevance.array(),
+            "kw.offsets": self._kw_offsets.array(),
+            "kw.ids": self._kw_ids.array(),
+        }
+        for col, (offsets, blob) in self._text.items():
+            sections[f"{col}.offsets"] = offsets.array()
+            sections[f"{col}.blob"] = blob.array()
+        sections.update(string_sections("keywords", self._vocab))
+        sections["id_order"] = np.arange(self.rows, dtype=np.int32)
+        return sections
+
+    def references(self) -> Iterator[List[Tuple[int, str]]]:
+        self._refs.close()
+        with open(self._refs.name, "rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def key_table(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(sorted key hashes, row per hash); the first row wins among equal keys."""
+        hashes = self._key_hash.array()
+        order = np.argsort(hashes, kind="stable")
+        return np.asarray(hashes[order]), np.asarray(self._key_row.array()[order])
+
+
+def _lookup(sorted_hashes: np.ndarray, key_rows: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+    if len(sorted_hashes) == 0:
+        return np.full(len(hashes), -1, dtype=np.int64)
+    pos = np.minimum(np.searchsorted(sorted_hashes, hashes), len(sorted_hashes) - 1)
+    return np.where(sorted_hashes[pos] == hashes, key_rows[pos], -1).astype(np.int64)
+
+
+def resolve_references(
+    writer: CorpusWriter, store: CorpusStore, unresolved: Callable[[str, str], None]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Reference strings -> (src, dst) rows, trying paper id, then DOI, then normalized title."""
+    sorted_hashes, key_rows = writer.key_table()
+    src_parts: List[np.ndarray] = []
+    dst_parts: List[np.ndarray] = []
+    for batch in writer.references():
+        if not batch:
+            continue
+        src = np.array([row for row, _ in batch], dtype=np.int64)
+        refs = [ref for _, ref in batch]
+        dst = _lookup(sorted_hashes, key_rows, np.array([_key_hash(f"i:{r}") for r in refs], dtype=np.int64))
+        # Only references that are not ids get normalized.
+        for key_of in (lambda r: f"d:{normalize_doi(r)}", lambda r: f"t:{normalize_title(r)}"):
+            miss = np.flatnonzero(dst < 0)
+            if not len(miss):
+                break
+            hashes = np.array([_key_hash(key_of(refs[i])) for i in miss.tolist()], dtype=np.int64)
+            dst[miss] = _lookup(sorted_hashes, key_rows, hashes)
+
+        for i in np.flatnonzero(dst < 0).tolist():
+            unresolved(store.ids[int(src[i])], refs[i])
+        ok = dst >= 0
+        src_parts.append(src[ok])
+        dst_parts.append(dst[ok])
+
+    if not src_parts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    src, dst = np.concatenate(src_parts), np.concatenate(dst_parts)
+    # Same edge listed twice (e.g. by merged duplicates): keep the first.
+    _, first = np.unique(src * len(store) + dst, return_index=True)
+    first.sort()
+    return src[first], dst[first]
+
+
+# ----------------------------
+# Pipeline
+# ----------------------------
+
+def _batches(items: Iterable[T], size: int = _BATCH) -> Iterator[List[T]]:
+    batch: List[T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _counted(raw: Iterable[Tuple[str, Any]], report: IngestReport) -> Iterator[Tuple[str, Any]]:
+    for item in raw:
+        report.read += 1
+        yield item
+
+
+def ingest(
+    paths: Iterable[Path],
+    append: bool = False,
+    corpus_path: Optional[Path] = None,
+    citations_path: Optional[Path] = None,
+    chunk_size: int = SORT_CHUNK,
+) -> IngestReport:
+    """
+    Replace the corpus and citation stores with the papers in `paths` (plus
+    the current corpus first when `append`, so existing papers win dedupe).
+    Both are written under their store locks.
+    """
+    t0 = time.perf_counter()
+    corpus_path = Path(corpus_path or data_path(CORPUS_FILE))
+    citations_path = Path(citations_path or data_path(CITATIONS_FILE))
+    report = IngestReport(
+        rejected_path=corpus_path.with_name(REJECTED_FILE),
+        unresolved_path=corpus_path.with_name(UNRESOLVED_FILE),
+    )
+    corpus_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Readers that find the citations stale rebuild them under the same lock,
+    # so they wait for both stores instead of rebuilding between the writes.
+    with store_lock(corpus_path), store_lock(citations_path):
+        sources: List[Iterable[Tuple[str, Any]]] = []
+        if append and corpus_path.exists():
+            store = open_cached(corpus_path, CorpusStore)
+            citations = None
+            if citations_path.exists():
+                citations = open_cached(citations_path, CitationIndex)
+                if citations.corpus_version != store.version:
+                    citations = None
+            sources.append(existing_records(store, citations))
+        sources.extend(read_records(Path(p)) for p in paths)
+
+        with tempfile.TemporaryDirectory(dir=corpus_path.parent, prefix="ingest-") as tmp, \
+                open(report.rejected_path, "w", encoding="utf-8") as rejected_out, \
+                open(report.unresolved_path, "w", encoding="utf-8") as unresolved_out:
+            tmpdir = Path(tmp)
+
+            def reject(where: str, reason: str) -> None:
+                report.rejected += 1
+                rejected_out.write(f"{where}\t{reason}\n")
+
+            def unresolved(citing: str, ref: str) -> None:
+                report.unresolved += 1
+                unresolved_out.write(f"{citing}\t{ref}\n")
+
+            raw = (item for source in sources for item in _counted(source, report))
+            records = validate(raw, reject)
+            records = merge_duplicates(external_sort(records, dedupe_key, tmpdir, chunk_size), report)
+            records = merge_doiless(external_sort(records, title_key, tmpdir, chunk_size), report)
+            records = unique_ids(external_sort(records, paper_id_key, tmpdir, chunk_size), reject)
+
+            writer = CorpusWriter(tmpdir)
+            for batch in _batches(records):
+                writer.add(batch)
+            report.papers = writer.rows
+            report.corpus_build = write_sections(
+                corpus_path, writer.sections(), {"kind": "corpus", "format": CORPUS_FORMAT, "source": "ingest"}
+            )
+
+            store = open_cached(corpus_path, CorpusStore)
+            src, dst = resolve_references(writer, store, unresolved)
+            report.edges = len(src)
+            report.citations_build = write_citations(src, dst, store, citations_path)
+
+    report.seconds = time.perf_counter() - t0
+    return report
@@ -0,0 +1,366 @@
+# manage.py
+"""
+Offline maintenance commands for the citation chaining prototype.
+
+    python manage.py build-corpus
+    python manage.py build-citations
+    python manage.py build-search
+    python manage.py build-concepts [--k N] [--incremental]
+    python manage.py build-scores
+    python manage.py build-related [--k N]
+    python manage.py build-facets
+    python manage.py build-typeahead
+    python manage.py build-all
+    python manage.py build-snapshot [--prune]
+    python manage.py export (--chain REF | --seed ID [ID ...]) [--depth N] [--direction cites|cited_by|both]
+                            [--format jsonl|bibtex|graphml] [-o FILE]
+    python manage.py ingest DUMP [DUMP ...] [--append] [--chunk-size N]
+    python manage.py resolve QUERY [QUERY ...] [--url URL] [--api crossref|openalex] [--no-ingest]
+"""
+import argparse
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from storage import data_path
+
+
+def cmd_build_corpus(args: argparse.Namespace) -> None:
+    from corpus_store import CORPUS_FILE, write_seed_corpus
+    from seed_data import SEED_PAPERS
+
+    t0 = time.perf_counter()
+    build_id = write_seed_corpus(data_path(CORPUS_FILE))
+    print(f"corpus: {len(SEED_PAPERS)} papers, build {build_id} ({time.perf_counter() - t0:.3f}s)")
+
+
+def cmd_build_citations(args: argparse.Namespace) -> None:
+    from citation_index import CITATIONS_FILE, resolve_edges, write_citations
+    from corpus_store import load_corpus
+    from seed_data import SEED_CITES
+
+    t0 = time.perf_counter()
+    store = load_corpus()
+    src, dst, unresolved = resolve_edges(SEED_CITES, store)
+    build_id = write_citations(src, dst, store, data_path(CITATIONS_FILE))
+    print(f"citations: {len(src)} edges over {len(store)} papers, build {build_id} ({time.perf_counter() - t0:.3f}s)")
+    for citing, cited in unresolved:
+        print(f"  unresolved edge: {citing} -> {cited}")
+
+
+def cmd_build_search(args: argparse.Namespace) -> None:
+    from corpus_store import load_corpus
+    from search import SEARCH_FILE, write_search_index
+
+    t0 = time.perf_counter()
+    store = load_corpus()
+    build_id = write_search_index(store, data_path(SEARCH_FILE))
+    print(f"search: indexed {len(store)} papers, build {build_id} ({time.perf_counter() - t0:.3f}s)")
+
+
+def cmd_build_concepts(args: argparse.Namespace) -> None:
+    from concepts import CONCEPTS_FILE, ConceptModel, cluster_keywords, update_concepts, write_concepts
+    from corpus_store import load_corpus
+    from seed_data import AI_CANONICAL
+    from storage import open_cached
+
+    t0 = time.perf_counter()
+    store = load_corpus()
+    path = data_path(CONCEPTS_FILE)
+    if args.incremental and path.exists():
+        sections = update_concepts(store, open_cached(path, ConceptModel))
+    else:
+        sections = cluster_keywords(store, AI_CANONICAL, k=args.k)
+    build_id = write_concepts(store, sections, path)
+    print(
+        f"concepts: {len(sections['concept_of'])} keywords -> {len(sections['sizes'])} concepts, "
+        f"build {build_id} ({time.perf_counter() - t0:.3f}s)"
+    )
+
+
+def cmd_build_scores(args: argparse.Namespace) -> None:
+    from citation_index import load_citations
+    from corpus_store import load_corpus
+    from scoring import SCORES_FILE, ScoreTable, write_scores
+    from storage import open_cached
+
+    t0 = time.perf_counter()
+    store = load_corpus()
+    index = load_citations(store)
+    path = data_path(SCORES_FILE)
+    build_id = write_scores(store, index, path)
+    table = open_cached(path, ScoreTable)
+    print(
+        f"scores: PageRank over {index.num_edges} edges, {table.sections.meta['iterations']} iterations, "
+        f"build {build_id} ({time.perf_counter() - t0:.3f}s)"
+    )
+
+
+def cmd_build_related(args: argparse.Namespace) -> None:
+    from citation_index import load_citations
+    from corpus_store import load_corpus
+    from related import RELATED_FILE, TOP_K, write_related
+
+    t0 = time.perf_counter()
+    k = args.k or TOP_K
+    store = load_corpus()
+    index = load_citations(store)
+    build_id = write_related(store, index, data_path(RELATED_FILE), k=k)
+    print(f"related: top {k} co-cited / coupled papers over {len(store)} papers, build {build_id} ({time.perf_counter() - t0:.3f}s)")
+
+
+def cmd_build_facets(args: argparse.Namespace) -> None:
+    from citation_index import load_citations
+    from concepts import load_concepts
+    from corpus_store import load_corpus
+    from facets import FACETS, FACETS_FILE, FacetIndex, write_facets
+    from storage import Sections
+
+    t0 = time.perf_counter()
+    store = load_corpus()
+    index = load_citations(store)
+    path = data_path(FACETS_FILE)
+    build_id = write_facets(store, index, load_concepts(store), path)
+    facets = FacetIndex(Sections.open(path))
+    values = ", ".join(f"{len(facets.labels[name])} {name}" for name in FACETS)
+    print(f"facets: {values} bitmaps over {len(store)} papers, build {build_id} ({time.perf_counter() - t0:.3f}s)")
+
+
+def cmd_build_typeahead(args: argparse.Namespace) -> None:
+    from citation_index import load_citations
+    from corpus_store import load_corpus
+    from scoring import load_scores
+    from storage import Sections
+    from typeahead import TYPEAHEAD_FILE, TypeaheadIndex, write_typeahead
+
+    t0 = time.perf_counter()
+    store = load_corpus()
+    scores = load_scores(store, load_citations(store))
+    path = data_path(TYPEAHEAD_FILE)
+    build_id = write_typeahead(store, scores, path)
+    index = TypeaheadIndex(Sections.open(path))
+    print(
+        f"typeahead: {len(index)} title / author / DOI entries over {len(store)} papers, "
+        f"{path.stat().st_size / 2**20:.1f} MB, build {build_id} ({time.perf_counter() - t0:.3f}s)"
+    )
+
+
+def cmd_build_all(args: argparse.Namespace) -> None:
+    from build import build_all
+    from citation_index import CITATIONS_FILE
+    from corpus_store import CORPUS_FILE
+
+    t0 = time.perf_counter()
+    versions = {}
+    for name, version, seconds in build_all():
+        versions[name] = version
+        print(f"{name}: build {version} ({seconds:.3f}s)")
+    print(
+        f"all stores current for corpus {versions[CORPUS_FILE]}, citations {versions[CITATIONS_FILE]} "
+        f"({time.perf_counter() - t0:.3f}s)"
+    )
+
+
+def cmd_build_snapshot(args: argparse.Namespace) -> None:
+    from citation_index import CITATIONS_FILE, CitationIndex
+    from concepts import CONCEPTS_FILE, ConceptModel
+    from corpus_store import CORPUS_FILE, CorpusStore
+    from facets import FACETS_FILE, FacetIndex
+    from related import RELATED_FILE, RelatedIndex
+    from scoring import SCORES_FILE, ScoreTable
+    from search import SEARCH_FILE, SearchIndex
+    from storage import SNAPSHOT_FILE, Sections, write_snapshot
+    from typeahead import TYPEAHEAD_FILE, TypeaheadIndex
+
+    cmd_build_all(args)
+    stores = {
+        CORPUS_FILE: CorpusStore,
+        CITATIONS_FILE: CitationIndex,
+        SCORES_FILE: ScoreTable,
+        RELATED_FILE: RelatedIndex,
+        SEARCH_FILE: SearchIndex,
+        CONCEPTS_FILE: ConceptModel,
+        FACETS_FILE: FacetIndex,
+        TYPEAHEAD_FILE: TypeaheadIndex,
+    }
+    path = data_path(SNAPSHOT_FILE)
+    t0 = time.perf_counter()
+    build_id = write_snapshot(path, [data_path(name) for name in stores])
+    print(f"snapshot: {len(stores)} stores, {path.stat().st_size / 2**20:.1f} MB, build {build_id} ({time.perf_counter() - t0:.3f}s)")
+
+    t0 = time.perf_counter()
+    for name, factory in stores.items():
+        factory(Sections.open(data_path(name)))
+    t1 = time.perf_counter()
+    snapshot = Sections.open(path)
+    for name, factory in stores.items():
+        factory(snapshot.store(name))
+    t2 = time.perf_counter()
+    print(f"  open all stores: {(t1 - t0) * 1e3:.2f} ms from {len(stores)} files, {(t2 - t1) * 1e3:.2f} ms from the snapshot")
+
+    if args.prune:
+        for name in stores:
+            data_path(name).unlink()
+        print(f"  removed {', '.join(stores)}")
+
+
+def cmd_export(args: argparse.Namespace) -> None:
+    import gzip
+    import sys
+
+    from chain_codec import ChainCodec, ChainStore
+    from citation_index import load_citations
+    from corpus_store import load_corpus
+    from export import export, subgraph_hops, subgraph_size
+    from render import SEED_CHAIN_ID
+    from seed_data import SEED_RESULTS, SEED_TITLE
+
+    store = load_corpus()
+    index = load_citations(store)
+    if args.chain:
+        ids = ChainCodec(store, ChainStore(), SEED_CHAIN_ID).decode(args.chain)
+        if not ids:
+            raise SystemExit(f"export: cannot decode chain {args.chain!r}")
+    else:
+        ids = args.seed
+    # The demo seed is not a corpus paper; its hardcoded results stand in for it.
+    ids = [x for pid in ids for x in (SEED_RESULTS[SEED_TITLE] if pid == SEED_CHAIN_ID else [pid])]
+    seeds = store.rows_of(ids)
+    missing = len(ids) - len(seeds)
+    if not len(seeds):
+        raise SystemExit("export: none of the seed ids are in the corpus")
+
+    t0 = time.perf_counter()
+    hops = subgraph_hops(index, seeds, args.depth, args.direction)
+    out = sys.stdout
+    if args.output:
+        out = gzip.open(args.output, "wt", encoding="utf-8") if args.output.suffix == ".gz" else open(args.output, "w", encoding="utf-8")
+    try:
+        for chunk in export(store, index, hops, args.format):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(
+        f"export: {subgraph_size(hops)} papers within {args.depth} hop(s) of {len(seeds)} seed(s)"
+        f"{f' ({missing} unknown ids skipped)' if missing else ''}, {args.format} ({time.perf_counter() - t0:.3f}s)",
+        file=sys.stderr,
+    )
+
+
+def cmd_ingest(args: argparse.Namespace) -> None:
+    from ingest import ingest
+
+    report = ingest(args.dumps, append=args.append, chunk_size=args.chunk_size)
+    print(
+        f"ingest: read {report.read} records, {report.rejected} rejected, {report.duplicates} duplicates merged "
+        f"-> {report.papers} papers, {report.edges} edges ({report.seconds:.3f}s)"
+    )
+    print(f"  corpus build {report.corpus_build}, citations build {report.citations_build}")
+    if report.rejected:
+        print(f"  rejected records: {report.rejected_path}")
+    if report.unresolved:
+        print(f"  {report.unresolved} unresolved references: {report.unresolved_path}")
+
+
+def cmd_resolve(args: argparse.Namespace) -> None:
+    import asyncio
+
+    from resolver import Inbox, Resolver, ResolverConfig
+
+    config = ResolverConfig.from_env()
+    if args.url:
+        config = ResolverConfig(base_url=args.url, api=args.api or (config.api if config else "crossref"))
+    elif config is None:
+        raise SystemExit("resolve: set CCP_RESOLVER_URL or pass --url")
+    elif args.api:
+        config.api = args.api
+
+    async def run():
+        resolver = Resolver(config)
+        try:
+            return await resolver.resolve_many(args.queries), resolver.stats()
+        finally:
+            resolver.close()
+
+    t0 = time.perf_counter()
+    records, stats = asyncio.run(run())
+    for query, record in zip(args.queries, records):
+        print(f"{query} -> {record['paper_id'] + ': ' + record['title'] if record else 'not found'}")
+    print(f"resolve: {sum(r is not None for r in records)}/{len(records)} found, {stats} ({time.perf_counter() - t0:.3f}s)")
+
+    found = [r for r in records if r]
+    if found and not args.no_ingest:
+        inbox = Inbox()
+        inbox.add(found)
+        report = inbox.flush()
+        print(f"  ingested: {report.papers} papers, {report.edges} edges, {report.unresolved} unresolved references")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="manage.py", description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("build-corpus", help="rebuild data/corpus.bin from the demo seed data")
+    p.set_defaults(func=cmd_build_corpus)
+
+    p = sub.add_parser("build-citations", help="rebuild data/citations.bin (CSR cites / cited-by index)")
+    p.set_defaults(func=cmd_build_citations)
+
+    p = sub.add_parser("build-search", help="rebuild data/search.bin (BM25 index, id/DOI table, title trigrams)")
+    p.set_defaults(func=cmd_build_search)
+
+    p = sub.add_parser("build-concepts", help="recluster keywords into AI-mode concepts (data/concepts.bin)")
+    p.add_argument("--k", type=int, default=None, help="total number of clusters (default: curated + sqrt(n/2))")
+    p.add_argument("--incremental", action="store_true", help="keep existing assignments, place new keywords only")
+    p.set_defaults(func=cmd_build_concepts)
+
+    p = sub.add_parser("build-scores", help="recompute PageRank / citation counts (data/scores.bin)")
+    p.set_defaults(func=cmd_build_scores)
+
+    p = sub.add_parser("build-related", help="precompute co-citation / coupling related papers (data/related.bin)")
+    p.add_argument("--k", type=int, default=None, help="related papers kept per paper (default: 20)")
+    p.set_defaults(func=cmd_build_related)
+
+    p = sub.add_parser("build-facets", help="rebuild data/facets.bin (bitmap indexes for the result filters)")
+    p.set_defaults(func=cmd_build_facets)
+
+    p = sub.add_parser("build-typeahead", help="rebuild data/typeahead.bin (title / author / DOI prefixes for search suggestions)")
+    p.set_defaults(func=cmd_build_typeahead)
+
+    p = sub.add_parser("build-all", help="build every missing or stale store (run before read-only servers)")
+    p.set_defaults(func=cmd_build_all)
+
+    p = sub.add_parser("build-snapshot", help="bundle every store into data/snapshot.bin (one file to deploy / mmap)")
+    p.add_argument("--prune", action="store_true", help="delete the individual store files afterwards")
+    p.set_defaults(func=cmd_build_snapshot)
+
+    p = sub.add_parser("export", help="stream a chain's citation neighborhood as JSONL, BibTeX or GraphML")
+    group = p.add_mutually_exclusive_group(required=True)
+    group.add_argument("--chain", help="chain param from a results/details URL (or comma-separated ids)")
+    group.add_argument("--seed", nargs="+", help="paper ids to start from")
+    p.add_argument("--depth", type=int, default=1, help="citation hops from the seeds (default 1)")
+    p.add_argument("--direction", choices=["cites", "cited_by", "both"], default="cites")
+    p.add_argument("--format", choices=["jsonl", "bibtex", "graphml"], default="jsonl")
+    p.add_argument("-o", "--output", type=Path, help="output file (.gz compresses; default stdout)")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("ingest", help="stream JSONL/CSV paper dumps into data/corpus.bin and data/citations.bin")
+    p.add_argument("dumps", nargs="+", type=Path, help=".jsonl / .csv files, optionally .gz")
+    p.add_argument("--append", action="store_true", help="keep the current corpus; dump papers are added to it")
+    p.add_argument("--chunk-size", type=int, default=200_000, help="records per in-memory sort run")
+    p.set_defaults(func=cmd_ingest)
+
+    p = sub.add_parser("resolve", help="look up DOIs / citations online and add them to the stores")
+    p.add_argument("queries", nargs="+", help="DOIs or citation strings")
+    p.add_argument("--url", help="API base url (default: $CCP_RESOLVER_URL)")
+    p.add_argument("--api", choices=["crossref", "openalex"], help="response format (default: $CCP_RESOLVER_API or crossref)")
+    p.add_argument("--no-ingest", action="store_true", help="only print what was found")
+    p.set_defaults(func=cmd_resolve)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+# models.py
+from dataclasses import dataclass
+from typing import List
+
+# ----------------------------
+# Data model
+# ----------------------------
+
+@dataclass
+class Paper:
+    paper_id: str
+    title: str
+    authors: str
+    year: int
+    venue: str
+    relevance: float
+    keywords: List[str]
+    snippet: str
+    abstract: str
+    doi: str = ""
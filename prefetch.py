@@ -0,0 +1,175 @@
+# prefetch.py
+"""
+Speculative prefetch of the pages a user is likely to open next.
+
+While a page is shown, the papers on its first visible cards are prepared
+on a small thread pool: the jobs call the same memoized functions the
+details page calls (results land in the shared caches, with their usual
+LRU / TTL eviction), so the click that follows finds them cached.
+
+Work is grouped per owner (a browser session). `cancel(owner)` drops the
+owner's queued jobs and makes running ones stop at their next step;
+navigation calls it before the new page schedules its own. Jobs are keyed
+(by paper id); a key that is queued, running or recently done is not
+scheduled twice, whoever asked.
+
+`visited(key)` records whether an opened page had been prefetched: `hits`
+(done), `late` (still running or queued) or `misses`. `stats()` reports
+those and the pool's counters for the debug panel.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Sequence, Set, Tuple
+
+PREFETCH_WORKERS = 2
+# Jobs queued across all owners; beyond this new ones are dropped.
+MAX_QUEUED = 64
+# How long a finished prefetch counts as warm (the result caches' TTL).
+DONE_TTL_S = 600.0
+DONE_MAX = 4096
+# Workers share the GIL with the script thread: a batch waits this long so
+# the rerun that scheduled it finishes rendering first.
+START_DELAY_S = 0.15
+
+# A job is a key and the steps that warm it; cancellation is checked between steps.
+Job = Tuple[Hashable, Sequence[Callable[[], Any]]]
+
+
+class Prefetcher:
+    def __init__(self, workers: int = PREFETCH_WORKERS, max_queued: int = MAX_QUEUED, delay: float = START_DELAY_S):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self.max_queued = max_queued
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._generation: Dict[str, int] = {}
+        self._futures: Dict[str, List[Future]] = {}
+        self._pending: Dict[Hashable, Tuple[str, int]] = {}  # key -> (owner, generation), queued or running
+        self._running: Set[Hashable] = set()
+        self._done: "OrderedDict[Hashable, float]" = OrderedDict()  # key -> finished at
+
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.dropped = 0
+        self.failed = 0
+        self.hits = 0
+        self.late = 0
+        self.misses = 0
+
+    def schedule(self, owner: str, jobs: Sequence[Job]) -> int:
+        """Queue `jobs` (most likely first) for `owner`; returns how many were new."""
+        queued = 0
+        start = time.monotonic() + self.delay
+        with self._lock:
+            generation = self._generation.setdefault(owner, 0)
+            futures = self._futures.setdefault(owner, [])
+            futures[:] = [f for f in futures if not f.done()]
+            for key, steps in jobs:
+                if key in self._pending or self._is_done(key):
+                    continue
+                if len(self._pending) >= self.max_queued:
+                    self.dropped += 1
+                    continue
+                self._pending[key] = (owner, generation)
+                futures.append(self._pool.submit(self._run, owner, generation, key, steps, start))
+                self.submitted += 1
+                queued += 1
+        return queued
+
+    def cancel(self, owner: str) -> None:
+        """Drop `owner`'s queued jobs; running ones stop before their next step."""
+        with self._lock:
+            self._generation[owner] = self._generation.get(owner, 0) + 1
+            for future in self._futures.pop(owner, []):
+                if future.cancel():
+                    self.cancelled += 1
+            for key in [k for k, (o, _) in self._pending.items() if o == owner and k not in self._running]:
+                del self._pending[key]  # running jobs remove themselves when they notice
+
+    def visited(self, key: Hashable) -> None:
+        """Count an opened page as a prefetch hit, late hit or miss."""
+        with self._lock:
+            if self._is_done(key):
+                self.hits += 1
+            elif key in self._pending:
+                self.late += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            visits = self.hits + self.late + self.misses
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "pending": len(self._pending),
+                "hits": self.hits,
+                "late": self.late,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / visits, 3) if visits else 0.0,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            for owner in list(self._generation):
+                self._generation[owner] += 1
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ----------------------------
+    # Internals
+    # ----------------------------
+
+    def _is_done(self, key: Hashable) -> bool:
+        finished = self._done.get(key)
+        if finished is None:
+            return False
+        if time.monotonic() - finished > DONE_TTL_S:
+            del self._done[key]
+            return False
+        return True
+
+    def _stale(self, owner: str, generation: int) -> bool:
+        with self._lock:
+            return self._generation.get(owner) != generation
+
+    def _release(self, key: Hashable, owner: str, generation: int) -> None:
+        """Forget `key` as pending, unless cancel() let a later job (of any owner) queue it since."""
+        if self._pending.get(key) == (owner, generation):
+            del self._pending[key]
+            self._running.discard(key)
+
+    def _run(self, owner: str, generation: int, key: Hashable, steps: Sequence[Callable[[], Any]], start: float) -> None:
+        wait = start - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        with self._lock:
+            if self._generation.get(owner) != generation:
+                self._release(key, owner, generation)
+                self.cancelled += 1
+                return
+            self._running.add(key)
+        try:
+            for step in steps:
+                if self._stale(owner, generation):
+                    with self._lock:
+                        self.cancelled += 1
+                    return
+                step()
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            return
+        finally:
+            with self._lock:
+                self._release(key, owner, generation)
+        with self._lock:
+            self.completed += 1
+            self._done[key] = time.monotonic()
+            self._done.move_to_end(key)
+            while len(self._done) > DONE_MAX:
+                self._done.popitem(last=False)
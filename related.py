@@ -0,0 +1,210 @@
+# related.py
+"""
+"Related papers" lists, materialized offline into data/related.bin.
+
+With A the citation matrix (A[u, v] = 1 when u cites v):
+  - co-citation           A^T A   papers cited by the same papers as this one
+  - bibliographic coupling A A^T  papers citing the same papers as this one
+
+Both products are computed block by block over the CSR index (a gather of
+two-hop pairs plus a sort-and-count per block, so memory stays bounded), with
+each count Salton-normalized by the two papers' degrees. Pivot papers with
+more than MAX_PIVOT_DEGREE edges are skipped, the way stop words are: a paper
+cited by thousands relates its citers only weakly and would dominate the cost.
+The two scores are summed and only the top k per paper are kept, so the
+details page reads a k-long slice:
+
+  related.offsets  int64[n + 1]   related.rows  int32[m]   related.score  float32[m]
+  related.cocited  int32[m]       related.coupled int32[m]  (raw counts, for display)
+"""
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from citation_index import CitationIndex
+from corpus_store import CorpusStore
+from storage import Sections, csr_gather, data_path, open_current, write_sections
+
+RELATED_FILE = "related.bin"
+RELATED_FORMAT = 1
+
+TOP_K = 20
+MAX_PIVOT_DEGREE = 200
+# Two-hop pairs handled per block (a few hundred MB of temporaries), and a
+# row cap so block positions stay small enough for _top_k's float sort key.
+BLOCK_PAIRS = 8_000_000
+BLOCK_ROWS = 65_536
+
+
+# ----------------------------
+# Building
+# ----------------------------
+
+def _two_hop(
+    rows: np.ndarray,
+    first: Tuple[np.ndarray, np.ndarray],
+    second: Tuple[np.ndarray, np.ndarray],
+    pivot_degree: np.ndarray,
+    max_pivot_degree: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(position in `rows`, other row) for every row -> pivot -> other path, self excluded."""
+    pos, pivot = csr_gather(*first, rows)
+    keep = pivot_degree[pivot] <= max_pivot_degree
+    pos, pivot = pos[keep], pivot[keep]
+    via, other = csr_gather(*second, pivot)
+    pos = pos[via]
+    not_self = other != rows[pos]
+    return pos[not_self], other[not_self].astype(np.int64)
+
+
+def _counts(pos: np.ndarray, other: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    keys, counts = np.unique(pos * n + other, return_counts=True)
+    return keys, counts
+
+
+def _salton(keys: np.ndarray, counts: np.ndarray, rows: np.ndarray, degree: np.ndarray, n: int) -> np.ndarray:
+    pos, other = np.divmod(keys, n)
+    return counts / np.sqrt(degree[rows[pos]].astype(np.float64) * degree[other])
+
+
+def _merge(co_keys: np.ndarray, cp_keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Union of two sorted key arrays and each input key's index into it."""
+    both = np.concatenate([co_keys, cp_keys])
+    order = np.argsort(both, kind="stable")  # two sorted runs: a merge
+    merged = both[order]
+    first = np.empty(len(merged), dtype=bool)
+    first[:1] = True
+    np.not_equal(merged[1:], merged[:-1], out=first[1:])
+    inverse = np.empty(len(both), dtype=np.int64)
+    inverse[order] = np.cumsum(first) - 1
+    return merged[first], inverse
+
+
+def _top_k(pos: np.ndarray, score: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the best `k` entries per position, given entries sorted by
+    (position, row): by position, then score desc, then row. Scores are
+    below 4, so position * 4 - score orders the first two and the stable
+    sort keeps the third (about 10x faster than a three-key lexsort).
+    """
+    order = np.argsort(pos * 4.0 - score, kind="stable")
+    sorted_pos = pos[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_pos, sorted_pos, side="left")
+    return order[rank < k]
+
+
+def _blocks(work: np.ndarray, budget: int) -> List[Tuple[int, int]]:
+    """Split rows 0..n into consecutive ranges whose summed `work` stays near `budget` (at most BLOCK_ROWS rows)."""
+    bounds = [0]
+    cum = np.cumsum(work)
+    while bounds[-1] < len(work):
+        done = cum[bounds[-1] - 1] if bounds[-1] else 0
+        end = int(np.searchsorted(cum, done + budget, side="right"))
+        bounds.append(min(max(end, bounds[-1] + 1), bounds[-1] + BLOCK_ROWS, len(work)))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def build_related_sections(
+    index: CitationIndex, k: int = TOP_K, max_pivot_degree: int = MAX_PIVOT_DEGREE, block_pairs: int = BLOCK_PAIRS
+) -> Dict[str, np.ndarray]:
+    n = len(index)
+    cites, cited_by = index.csr(), index.csr(reverse=True)
+    out_degree, in_degree = index.out_degree(), index.in_degree()
+
+    # Pairs each row will generate, to size the blocks.
+    capped_out = np.where(out_degree <= max_pivot_degree, out_degree, 0).astype(np.int64)
+    capped_in = np.where(in_degree <= max_pivot_degree, in_degree, 0).astype(np.int64)
+    work = np.zeros(n, dtype=np.int64)
+    for (offsets, targets), pivot_work in ((cited_by, capped_out), (cites, capped_in)):
+        pos, pivot = csr_gather(offsets, targets, np.arange(n))
+        work += np.bincount(pos, weights=pivot_work[pivot], minlength=n).astype(np.int64)
+
+    parts: Dict[str, List[np.ndarray]] = {"row": [], "rows": [], "score": [], "cocited": [], "coupled": []}
+    for lo, hi in _blocks(work, block_pairs):
+        rows = np.arange(lo, hi, dtype=np.int64)
+        co_keys, co_counts = _counts(*_two_hop(rows, cited_by, cites, out_degree, max_pivot_degree), n)
+        cp_keys, cp_counts = _counts(*_two_hop(rows, cites, cited_by, in_degree, max_pivot_degree), n)
+
+        keys, inverse = _merge(co_keys, cp_keys)
+        score = np.bincount(inverse, weights=np.concatenate([
+            _salton(co_keys, co_counts, rows, in_degree, n),
+            _salton(cp_keys, cp_counts, rows, out_degree, n),
+        ]), minlength=len(keys))
+        cocited = np.zeros(len(keys), dtype=np.int32)
+        coupled = np.zeros(len(keys), dtype=np.int32)
+        cocited[inverse[:len(co_keys)]] = co_counts
+        coupled[inverse[len(co_keys):]] = cp_counts
+
+        pos, other = np.divmod(keys, n)
+        best = _top_k(pos, score, k)
+        parts["row"].append(rows[pos[best]])
+        parts["rows"].append(other[best].astype(np.int32))
+        parts["score"].append(score[best].astype(np.float32))
+        parts["cocited"].append(cocited[best])
+        parts["coupled"].append(coupled[best])
+
+    flat = {name: np.concatenate(arrs) if arrs else np.zeros(0) for name, arrs in parts.items()}
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(flat["row"].astype(np.int64), minlength=n), out=offsets[1:])
+    return {
+        "related.offsets": offsets,
+        "related.rows": flat["rows"].astype(np.int32),
+        "related.score": flat["score"].astype(np.float32),
+        "related.cocited": flat["cocited"].astype(np.int32),
+        "related.coupled": flat["coupled"].astype(np.int32),
+    }
+
+
+def write_related(store: CorpusStore, index: CitationIndex, path: Optional[Path] = None, k: int = TOP_K) -> str:
+    path = path or data_path(RELATED_FILE)
+    meta = {
+        "kind": "related",
+        "format": RELATED_FORMAT,
+        "corpus": store.version,
+        "citations": index.version,
+        "k": k,
+        "max_pivot_degree": MAX_PIVOT_DEGREE,
+    }
+    return write_sections(path, build_related_sections(index, k), meta)
+
+
+# ----------------------------
+# Reading
+# ----------------------------
+
+class RelatedIndex:
+    def __init__(self, sections: Sections):
+        if sections.meta.get("kind") != "related":
+            raise ValueError("section file is not a related-papers index")
+        self.sections = sections
+        self.version: str = sections.build_id
+        self.corpus_version: str = sections.meta["corpus"]
+        self.citations_version: str = sections.meta["citations"]
+        self._offsets = sections["related.offsets"]
+        self._rows = sections["related.rows"]
+        self._score = sections["related.score"]
+        self._cocited = sections["related.cocited"]
+        self._coupled = sections["related.coupled"]
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def related(self, row: int) -> np.ndarray:
+        """Up to k related rows, best first."""
+        return self._rows[self._offsets[row]:self._offsets[row + 1]]
+
+    def details(self, row: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(rows, score, co-citation count, shared reference count), best first."""
+        s = slice(self._offsets[row], self._offsets[row + 1])
+        return self._rows[s], self._score[s], self._cocited[s], self._coupled[s]
+
+
+def load_related(store: CorpusStore, index: CitationIndex, path: Optional[Path] = None) -> RelatedIndex:
+    """Open the related-papers index for `store` / `index`, rebuilding it if missing or stale."""
+    path = Path(path or data_path(RELATED_FILE))
+    return open_current(
+        path, RelatedIndex,
+        lambda related: related.corpus_version == store.version and related.citations_version == index.version,
+        lambda _: write_related(store, index, path),
+    )
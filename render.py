@@ -0,0 +1,126 @@
+# render.py
+"""
+Single-pass HTML for paper-card lists and the viewing-history sidebar
+(history steps and recorded trails).
+
+Each list becomes one string (one `st.markdown` delta) built from
+precompiled templates. Text fields are HTML-escaped and URL params quoted.
+Chain params come from a `ChainLinks` (see chain_codec.py).
+"""
+import html
+from typing import Iterable, List, Sequence, Tuple
+from urllib.parse import quote
+
+from chain_codec import ChainLinks
+from models import Paper
+
+SEED_CHAIN_ID = "seed_paper"
+
+# `<a ...>` sits alone on the first line so the markdown parser treats the
+# whole card (and the cards after it, no blank lines between) as one raw HTML block.
+_CARD = (
+    '<a class="paper-card-link" href="?page=details&amp;paper={pid}&amp;chain={chain}" target="_self">\n'
+    '<div class="paper-card">'
+    '<div class="paper-title">{title}</div>'
+    '<div class="paper-meta">{authors} • {venue} • {year} • Relevance: {relevance:.2f}</div>'
+    '<div style="margin-bottom: 8px;">{snippet}</div>'
+    '<div><b>Keywords:</b> {keywords}</div>'
+    '</div>\n'
+    '</a>'
+).format
+
+_HISTORY_SEED = (
+    '<div class="history-item" style="background-color: rgba(255, 243, 205, 0.5); border-left: 3px solid #ff9800;">'
+    '<div style="color: #ff9800; font-size: 0.7rem; font-weight: 600; margin-bottom: 0.25rem;">STEP {step} • SEED</div>'
+    '<div class="history-item-title">🌱 {title}</div>'
+    '<div class="history-item-meta">Starting point</div>'
+    '</div>'
+).format
+
+_HISTORY_ITEM = (
+    '<a href="?page=details&amp;paper={pid}&amp;chain={chain}" target="_self" style="text-decoration: none; color: inherit;">\n'
+    '<div class="history-item">'
+    '<div style="color: rgba(49, 51, 63, 0.5); font-size: 0.7rem; font-weight: 600; margin-bottom: 0.25rem;">STEP {step}</div>'
+    '<div class="history-item-title">{title}</div>'
+    '<div class="history-item-meta">{authors} • {year}</div>'
+    '</div>\n'
+    '</a>'
+).format
+
+_TRAIL_ITEM = (
+    '<a href="?page=details&amp;paper={pid}&amp;chain={chain}" target="_self" style="text-decoration: none; color: inherit;">\n'
+    '<div class="history-item">'
+    '<div style="color: rgba(49, 51, 63, 0.5); font-size: 0.7rem; font-weight: 600; margin-bottom: 0.25rem;">{steps} STEPS • {when}</div>'
+    '<div class="history-item-title">{title}</div>'
+    '<div class="history-item-meta">{authors} • {year}</div>'
+    '</div>\n'
+    '</a>'
+).format
+
+_esc = html.escape
+
+
+def _q(value: str) -> str:
+    return _esc(quote(value, safe=","))
+
+
+def truncate(text: str, limit: int) -> str:
+    return f"{text[:limit]}..." if len(text) > limit else text
+
+
+def cards_html(papers: Iterable[Paper], links: ChainLinks) -> str:
+    """All cards for `papers`; each links to its details page with the chain extended by it."""
+    return "\n".join(
+        _CARD(
+            pid=_q(p.paper_id),
+            chain=_q(links.extend(p.paper_id)),
+            title=_esc(p.title),
+            authors=_esc(p.authors),
+            venue=_esc(p.venue),
+            year=p.year,
+            relevance=p.relevance,
+            snippet=_esc(p.snippet),
+            keywords=_esc(", ".join(p.keywords)),
+        )
+        for p in papers
+    )
+
+
+def history_html(
+    viewed: Sequence[str], papers: Sequence[Paper | None], seed_title: str, links: ChainLinks
+) -> str:
+    """
+    Viewing-history items, newest first. `papers[i]` is the Paper for `viewed[i]`
+    (None for the seed or unknown ids); each links to the chain's first i + 1 steps.
+    """
+    items: List[str] = []
+    for idx in range(len(viewed) - 1, -1, -1):
+        pid, p = viewed[idx], papers[idx]
+        if pid == SEED_CHAIN_ID:
+            items.append(_HISTORY_SEED(step=idx + 1, title=_esc(truncate(seed_title, 50))))
+        elif p is not None:
+            items.append(_HISTORY_ITEM(
+                pid=_q(p.paper_id),
+                chain=_q(links.prefix(idx + 1)),
+                step=idx + 1,
+                title=_esc(truncate(p.title, 50)),
+                authors=_esc(truncate(p.authors, 25)),
+                year=p.year,
+            ))
+    return "\n".join(items)
+
+
+def trails_html(trails: Sequence[Tuple[Paper, str, int, str]]) -> str:
+    """Resume links for recorded trails: (last paper, chain param, steps, when) each."""
+    return "\n".join(
+        _TRAIL_ITEM(
+            pid=_q(p.paper_id),
+            chain=_q(chain),
+            steps=steps,
+            when=_esc(when),
+            title=_esc(truncate(p.title, 50)),
+            authors=_esc(truncate(p.authors, 25)),
+            year=p.year,
+        )
+        for p, chain, steps, when in trails
+    )
@@ -0,0 +1,603 @@
+# resolver.py
+"""
+Online DOI / citation lookup against a Crossref- or OpenAlex-compatible API.
+
+  - asyncio HTTP/1.1 client (stdlib only): bounded keep-alive connection pool,
+    a concurrency limit, retries with exponential backoff + jitter (honours
+    Retry-After on 429/503)
+  - DOI lookups are batched into one filter query per `batch_size` DOIs;
+    free-text citations are one bibliographic search each
+  - responses are cached on disk (SQLite) with a TTL, misses for a shorter one
+  - resolved works become ingest records (Paper fields + references) and are
+    appended to an inbox that is merged into the stores with ingest(append=True);
+    the derived stores are rebuilt alongside, off the script thread
+
+BackgroundResolver runs all of it on its own event-loop thread; callers get
+concurrent.futures.Future objects, so the Streamlit script thread never waits.
+Configured by CCP_RESOLVER_URL (unset: no online lookups) and
+CCP_RESOLVER_API ("crossref" or "openalex").
+"""
+import asyncio
+import concurrent.futures
+import gzip
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import sqlite3
+import ssl
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, urlencode, urlsplit
+
+from search import normalize_doi, tokenize
+from storage import data_path
+
+RESOLVER_CACHE_FILE = "resolver_cache.sqlite"
+INBOX_DIR = "inbox"
+
+USER_AGENT = "citation-chaining-prototype/0.1"
+MAX_BODY_BYTES = 16 << 20
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Free text shorter than this (in words) is not worth an online search.
+MIN_CITATION_WORDS = 4
+# Resolved records wait this long in the inbox so bursts are ingested together.
+INBOX_FLUSH_DELAY_S = 5.0
+
+log = logging.getLogger("ccp.resolver")
+
+
+@dataclass
+class ResolverConfig:
+    base_url: str
+    api: str = "crossref"
+    mailto: str = ""
+    max_connections: int = 8
+    concurrency: int = 8
+    batch_size: int = 20
+    timeout_s: float = 10.0
+    retries: int = 3
+    backoff_s: float = 0.5
+    cache_ttl_s: float = 30 * 86400.0
+    miss_ttl_s: float = 86400.0
+
+    @classmethod
+    def from_env(cls) -> Optional["ResolverConfig"]:
+        url = os.environ.get("CCP_RESOLVER_URL", "").strip()
+        if not url:
+            return None
+        return cls(
+            base_url=url,
+            api=os.environ.get("CCP_RESOLVER_API", "crossref"),
+            mailto=os.environ.get("CCP_RESOLVER_MAILTO", ""),
+        )
+
+
+class ResolverError(RuntimeError):
+    pass
+
+
+def looks_resolvable(query: str) -> bool:
+    """A DOI, or free text long enough to be a citation."""
+    return normalize_doi(query) is not None or len(tokenize(query)) >= MIN_CITATION_WORDS
+
+
+# ----------------------------
+# HTTP/1.1 client
+# ----------------------------
+
+_Conn = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class ConnectionPool:
+    """At most `max_connections` open connections; idle ones are kept alive for reuse."""
+
+    def __init__(self, max_connections: int, timeout_s: float):
+        self.max_connections = max_connections
+        self.timeout_s = timeout_s
+        self._slots = asyncio.Semaphore(max_connections)
+        self._idle: Dict[Tuple[str, int, bool], List[_Conn]] = {}
+        self._ssl = ssl.create_default_context()
+        self.opened = 0
+        self.reused = 0
+
+    async def acquire(self, host: str, port: int, tls: bool) -> _Conn:
+        await self._slots.acquire()
+        idle = self._idle.get((host, port, tls), [])
+        while idle:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                self.reused += 1
+                return reader, writer
+            writer.close()
+        try:
+            conn = await asyncio.wait_for(
+                asyncio.open_connection(host, port, ssl=self._ssl if tls else None), self.timeout_s
+            )
+        except BaseException:
+            self._slots.release()
+            raise
+        self.opened += 1
+        return conn
+
+    def release(self, host: str, port: int, tls: bool, conn: _Conn, reusable: bool) -> None:
+        idle = self._idle.setdefault((host, port, tls), [])
+        if reusable and len(idle) < self.max_connections:
+            idle.append(conn)
+        else:
+            conn[1].close()
+        self._slots.release()
+
+    def close(self) -> None:
+        for idle in self._idle.values():
+            for _, writer in idle:
+                writer.close()
+        self._idle.clear()
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str], bytes, bool]:
+    """(status, headers, body, keep_alive) for one response."""
+    status_line = await reader.readline()
+    parts = status_line.split(None, 2)
+    if len(parts) < 2 or not parts[0].startswith(b"HTTP/1."):
+        raise ResolverError(f"bad status line: {status_line[:80]!r}")
+    status = int(parts[1])
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    keep_alive = headers.get("connection", "").lower() != "close" and parts[0] == b"HTTP/1.1"
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        body = bytearray()
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                break
+            if len(body) + size > MAX_BODY_BYTES:
+                raise ResolverError("response too large")
+            body += await reader.readexactly(size)
+            await reader.readexactly(2)
+        data = bytes(body)
+    elif "content-length" in headers:
+        length = int(headers["content-length"])
+        if length > MAX_BODY_BYTES:
+            raise ResolverError("response too large")
+        data = await reader.readexactly(length)
+    else:
+        data = await reader.read(MAX_BODY_BYTES)
+        keep_alive = False
+
+    if headers.get("content-encoding", "").lower() == "gzip":
+        data = gzip.decompress(data)
+    return status, headers, data, keep_alive
+
+
+class HttpClient:
+    def __init__(self, config: ResolverConfig):
+        self.config = config
+        self.pool = ConnectionPool(config.max_connections, config.timeout_s)
+        self.requests = 0
+        self.retries = 0
+
+    async def _request(self, url: str) -> Tuple[int, Dict[str, str], bytes]:
+        parts = urlsplit(url)
+        tls = parts.scheme == "https"
+        host = parts.hostname or ""
+        port = parts.port or (443 if tls else 80)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        request = (
+            f"GET {target} HTTP/1.1\r\n"
+            f"Host: {parts.netloc}\r\n"
+            f"User-Agent: {USER_AGENT}\r\n"
+            "Accept: application/json\r\n"
+            "Accept-Encoding: gzip\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        ).encode("latin-1")
+
+        reader, writer = await self.pool.acquire(host, port, tls)
+        reusable = False
+        try:
+            writer.write(request)
+            await writer.drain()
+            status, headers, body, reusable = await asyncio.wait_for(_read_response(reader), self.config.timeout_s)
+            return status, headers, body
+        finally:
+            self.pool.release(host, port, tls, (reader, writer), reusable)
+
+    async def get(self, url: str) -> Tuple[int, bytes]:
+        """GET with retries on connection errors and retryable statuses."""
+        cfg = self.config
+        for attempt in range(cfg.retries + 1):
+            self.requests += 1
+            delay = cfg.backoff_s * (2 ** attempt) * (0.5 + random.random())
+            try:
+                status, headers, body = await self._request(url)
+                if status not in RETRY_STATUSES:
+                    return status, body
+                retry_after = headers.get("retry-after", "")
+                if retry_after.isdigit():
+                    delay = min(float(retry_after), 30.0)
+                error: Exception = ResolverError(f"HTTP {status} from {url}")
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ResolverError, ValueError) as e:
+                error = e
+            if attempt == cfg.retries:
+                raise ResolverError(f"giving up on {url}: {error}") from error
+            self.retries += 1
+            await asyncio.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+# ----------------------------
+# Response cache
+# ----------------------------
+
+class ResponseCache:
+    """url -> (status, body) in SQLite with per-entry expiry."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or data_path(RESOLVER_CACHE_FILE))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, status INTEGER, body BLOB, expires REAL)"
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[int, bytes]]:
+        with self._lock:
+            row = self._db.execute("SELECT status, body, expires FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or row[2] < time.time():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0], row[1]
+
+    def put(self, key: str, status: int, body: bytes, ttl_s: float) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, status, body, expires) VALUES (?, ?, ?, ?)",
+                (key, status, body, time.time() + ttl_s),
+            )
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._db.execute("DELETE FROM responses WHERE expires < ?", (time.time(),)).rowcount
+
+
+# ----------------------------
+# API adapters (work JSON -> ingest record)
+# ----------------------------
+
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def _first(values: Any) -> str:
+    if isinstance(values, list):
+        return str(values[0]) if values else ""
+    return str(values or "")
+
+
+def _snippet(abstract: str) -> str:
+    return abstract if len(abstract) <= 200 else abstract[:200].rsplit(" ", 1)[0] + "…"
+
+
+def _record(doi: str, title: str, authors: List[str], year: Any, venue: str,
+            keywords: List[str], abstract: str, references: List[str]) -> Dict[str, Any]:
+    abstract = " ".join(_TAG_RE.sub(" ", abstract).split())
+    return {
+        "paper_id": doi,
+        "title": " ".join(title.split()),
+        "authors": ", ".join(a for a in authors if a),
+        "year": int(year) if year else 0,
+        "venue": venue,
+        "relevance": 0.0,
+        "keywords": keywords,
+        "snippet": _snippet(abstract),
+        "abstract": abstract,
+        "doi": doi,
+        "references": [r for r in references if r],
+    }
+
+
+class CrossrefApi:
+    def __init__(self, base_url: str, mailto: str = ""):
+        self.base_url = base_url.rstrip("/")
+        self.extra = {"mailto": mailto} if mailto else {}
+
+    def doi_batch_url(self, dois: List[str]) -> str:
+        params = {"filter": ",".join(f"doi:{d}" for d in dois), "rows": len(dois), **self.extra}
+        return f"{self.base_url}/works?{urlencode(params)}"
+
+    def search_url(self, text: str) -> str:
+        return f"{self.base_url}/works?{urlencode({'query.bibliographic': text, 'rows': 1, **self.extra})}"
+
+    def items(self, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        message = payload.get("message", {})
+        return message.get("items", [message] if "DOI" in message else [])
+
+    def to_record(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        doi = normalize_doi(item.get("DOI", ""))
+        if not doi or not _first(item.get("title")):
+            return None
+        issued = (item.get("issued") or item.get("published") or {}).get("date-parts") or [[None]]
+        return _record(
+            doi=doi,
+            title=_first(item.get("title")),
+            authors=[" ".join(filter(None, (a.get("given"), a.get("family")))) or a.get("name", "")
+                     for a in item.get("author", [])],
+            year=issued[0][0] if issued and issued[0] else None,
+            venue=_first(item.get("container-title")),
+            keywords=list(item.get("subject", [])),
+            abstract=item.get("abstract", ""),
+            references=[r.get("DOI") or r.get("unstructured", "") for r in item.get("reference", [])],
+        )
+
+
+class OpenAlexApi:
+    def __init__(self, base_url: str, mailto: str = ""):
+        self.base_url = base_url.rstrip("/")
+        self.extra = {"mailto": mailto} if mailto else {}
+
+    def doi_batch_url(self, dois: List[str]) -> str:
+        params = {"filter": "doi:" + "|".join(dois), "per-page": len(dois), **self.extra}
+        return f"{self.base_url}/works?{urlencode(params, quote_via=quote, safe=':|/')}"
+
+    def search_url(self, text: str) -> str:
+        return f"{self.base_url}/works?{urlencode({'search': text, 'per-page': 1, **self.extra})}"
+
+    def items(self, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return payload.get("results", [payload] if "id" in payload else [])
+
+    def to_record(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        doi = normalize_doi(item.get("doi") or "")
+        title = item.get("title") or item.get("display_name") or ""
+        if not doi or not title:
+            return None
+        inverted = item.get("abstract_inverted_index") or {}
+        positions = sorted((p, word) for word, ps in inverted.items() for p in ps)
+        source = ((item.get("primary_location") or {}).get("source") or {})
+        return _record(
+            doi=doi,
+            title=title,
+            authors=[(a.get("author") or {}).get("display_name", "") for a in item.get("authorships", [])],
+            year=item.get("publication_year"),
+            venue=source.get("display_name") or "",
+            keywords=[k.get("display_name", "") for k in item.get("keywords", []) if k.get("display_name")],
+            abstract=" ".join(word for _, word in positions),
+            references=list(item.get("referenced_works", [])),
+        )
+
+
+_APIS = {"crossref": CrossrefApi, "openalex": OpenAlexApi}
+
+
+# ----------------------------
+# Resolver
+# ----------------------------
+
+class Resolver:
+    """Batched, cached lookups; one instance per event loop."""
+
+    def __init__(self, config: ResolverConfig, cache: Optional[ResponseCache] = None):
+        if config.api not in _APIS:
+            raise ValueError(f"unknown resolver api {config.api!r} (expected one of {sorted(_APIS)})")
+        self.config = config
+        self.api = _APIS[config.api](config.base_url, config.mailto)
+        self.http = HttpClient(config)
+        self.cache = cache if cache is not None else ResponseCache()
+        self._limit = asyncio.Semaphore(config.concurrency)
+
+    async def _fetch(self, url: str) -> Optional[Dict[str, Any]]:
+        cached = self.cache.get(url)
+        if cached is None:
+            async with self._limit:
+                status, body = await self.http.get(url)
+            ttl = self.config.cache_ttl_s if status == 200 else self.config.miss_ttl_s
+            self.cache.put(url, status, body, ttl)
+            cached = status, body
+        status, body = cached
+        if status != 200:
+            return None
+        return json.loads(body)
+
+    def _doi_key(self, doi: str) -> str:
+        return f"{self.config.api}:doi:{doi}"
+
+    async def _resolve_dois(self, dois: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        found: Dict[str, Optional[Dict[str, Any]]] = {}
+        pending: List[str] = []
+        for doi in dict.fromkeys(dois):
+            cached = self.cache.get(self._doi_key(doi))
+            if cached is not None:
+                found[doi] = json.loads(cached[1]) if cached[0] == 200 else None
+            else:
+                pending.append(doi)
+
+        async def batch(chunk: List[str]) -> None:
+            try:
+                payload = await self._fetch(self.api.doi_batch_url(chunk))
+            except ResolverError:
+                found.update(dict.fromkeys(chunk))  # not cached: retried next time
+                return
+            by_doi = {}
+            for item in self.api.items(payload or {}):
+                record = self.api.to_record(item)
+                if record is not None:
+                    by_doi[record["doi"]] = record
+            # Cache per DOI too, so a later single lookup needs no request.
+            for doi in chunk:
+                record = by_doi.get(doi)
+                body = json.dumps(record).encode() if record else b""
+                ttl = self.config.cache_ttl_s if record else self.config.miss_ttl_s
+                self.cache.put(self._doi_key(doi), 200 if record else 404, body, ttl)
+                found[doi] = record
+
+        size = self.config.batch_size
+        await asyncio.gather(*(batch(pending[i:i + size]) for i in range(0, len(pending), size)))
+        return found
+
+    async def _resolve_citation(self, text: str) -> Optional[Dict[str, Any]]:
+        payload = await self._fetch(self.api.search_url(text))
+        for item in self.api.items(payload or {}):
+            record = self.api.to_record(item)
+            if record is not None:
+                return record
+        return None
+
+    async def resolve_many(self, queries: Iterable[str]) -> List[Optional[Dict[str, Any]]]:
+        """One ingest record (or None) per query: DOIs are batched, citations searched."""
+        queries = [q.strip() for q in queries]
+        dois = [normalize_doi(q) for q in queries]
+        by_doi = await self._resolve_dois([d for d in dois if d])
+
+        async def one(query: str, doi: Optional[str]) -> Optional[Dict[str, Any]]:
+            if doi:
+                return by_doi.get(doi)
+            if len(tokenize(query)) < MIN_CITATION_WORDS:
+                return None
+            try:
+                return await self._resolve_citation(query)
+            except ResolverError:
+                return None
+
+        return list(await asyncio.gather(*(one(q, d) for q, d in zip(queries, dois))))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.http.requests,
+            "retries": self.http.retries,
+            "connections_opened": self.http.pool.opened,
+            "connections_reused": self.http.pool.reused,
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+        }
+
+    def close(self) -> None:
+        self.http.close()
+
+
+# ----------------------------
+# Inbox -> stores
+# ----------------------------
+
+class Inbox:
+    """Resolved records waiting to be merged into the corpus and citation stores."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.dir = Path(path or data_path(INBOX_DIR))
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def add(self, records: Iterable[Dict[str, Any]]) -> int:
+        lines = [json.dumps(r, ensure_ascii=False) + "\n" for r in records]
+        with self._lock, open(self.dir / "pending.jsonl", "a", encoding="utf-8") as f:
+            f.writelines(lines)
+        return len(lines)
+
+    def flush(self):
+        """
+        Ingest everything pending (appending to the current corpus) and rebuild
+        the derived stores, in a staging directory whose finished files are then
+        published to the data directory; None if there was nothing.
+        """
+        from build import STORE_FILES, build_all, publish
+        from citation_index import CITATIONS_FILE
+        from corpus_store import CORPUS_FILE
+        from ingest import ingest
+
+        with self._lock:
+            pending = self.dir / "pending.jsonl"
+            if pending.exists():
+                pending.rename(self.dir / f"batch-{time.time_ns()}.jsonl")
+            batches = sorted(self.dir.glob("batch-*.jsonl"))
+            if not batches:
+                return None
+            staging = self.dir / "staging"
+            shutil.rmtree(staging, ignore_errors=True)
+            staging.mkdir()
+            # Hard links: the builds replace staged files, never the live ones,
+            # and stores that rebuild from their previous copy still find it.
+            for name in STORE_FILES:
+                if data_path(name).exists():
+                    os.link(data_path(name), staging / name)
+            report = ingest(batches, append=True, corpus_path=staging / CORPUS_FILE, citations_path=staging / CITATIONS_FILE)
+            for _ in build_all(staging):
+                pass
+            publish(staging)
+            for name in ("rejected_path", "unresolved_path"):
+                path = data_path(getattr(report, name).name)
+                os.replace(getattr(report, name), path)
+                setattr(report, name, path)
+            shutil.rmtree(staging)
+            for path in batches:
+                path.unlink()
+            return report
+
+
+class BackgroundResolver:
+    """A Resolver on its own event-loop thread; results arrive as concurrent futures."""
+
+    def __init__(self, config: ResolverConfig, cache: Optional[ResponseCache] = None, inbox: Optional[Inbox] = None):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="resolver", daemon=True)
+        self._thread.start()
+        self.inbox = inbox
+        self._flush_scheduled = False
+        self.resolver: Resolver = asyncio.run_coroutine_threadsafe(self._make(config, cache), self._loop).result()
+
+    @staticmethod
+    async def _make(config: ResolverConfig, cache: Optional[ResponseCache]) -> Resolver:
+        return Resolver(config, cache)
+
+    def submit(self, queries: List[str]) -> "concurrent.futures.Future[List[Optional[Dict[str, Any]]]]":
+        return asyncio.run_coroutine_threadsafe(self._resolve_and_store(queries), self._loop)
+
+    async def _resolve_and_store(self, queries: List[str]) -> List[Optional[Dict[str, Any]]]:
+        records = await self.resolver.resolve_many(queries)
+        found = [r for r in records if r]
+        if found and self.inbox is not None:
+            self.inbox.add(found)
+            if not self._flush_scheduled:
+                self._flush_scheduled = True
+                self._loop.call_later(INBOX_FLUSH_DELAY_S, self._flush)
+        return records
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        # Ingest is CPU/disk work; keep it off the event loop.
+        self._loop.run_in_executor(None, self.inbox.flush).add_done_callback(self._flushed)
+
+    def _flushed(self, future: "asyncio.Future") -> None:
+        error = None if future.cancelled() else future.exception()
+        if error is not None:
+            log.error("ingesting resolved records failed; they stay in %s for the next flush",
+                      self.inbox.dir, exc_info=error)
+
+    def close(self) -> None:
+        self._loop.call_soon_threadsafe(self.resolver.close)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+def background_resolver_from_env() -> Optional[BackgroundResolver]:
+    config = ResolverConfig.from_env()
+    return BackgroundResolver(config, inbox=Inbox()) if config is not None else None
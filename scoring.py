@@ -0,0 +1,198 @@
+# scoring.py
+"""
+Graph-derived paper scores.
+
+Global (precomputed into data/scores.bin, one value per corpus row):
+  - pagerank    float64   PageRank over the CITES graph (power iteration on the CSR arrays)
+  - citations   int32     in-degree
+  - importance  float32   log-scaled PageRank in [0, 1]
+
+Per query (`QueryScorer`, vectorized over any set of rows): importance and
+the stored relevance, plus bibliographic coupling with the query's seed
+(share of references in common), decayed per hop away from the seed.
+"""
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from citation_index import CitationIndex
+from corpus_store import CorpusStore
+from storage import Sections, data_path, open_current, write_sections
+
+SCORES_FILE = "scores.bin"
+SCORES_FORMAT = 2
+
+DAMPING = 0.85
+PAGERANK_TOL = 1e-10
+PAGERANK_MAX_ITER = 100
+
+# Query-time blend; the weights sum to 1, so scores stay in [0, 1] at hop 1.
+W_IMPORTANCE = 0.4
+W_RELEVANCE = 0.3
+W_COUPLING = 0.3
+
+
+# ----------------------------
+# Building
+# ----------------------------
+
+def _segment_sums(offsets: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Sum of `values[offsets[i]:offsets[i + 1]]` for every i (0 for empty segments)."""
+    sums = np.zeros(len(offsets) - 1)
+    # reduceat over the non-empty segments only: each one then runs up to the
+    # next non-empty start (or the end), exactly its own range.
+    nonempty = np.flatnonzero(offsets[1:] > offsets[:-1])
+    if len(nonempty):
+        sums[nonempty] = np.add.reduceat(values, offsets[:-1][nonempty].astype(np.int64))
+    return sums
+
+
+def pagerank(
+    index: CitationIndex, damping: float = DAMPING, tol: float = PAGERANK_TOL, max_iter: int = PAGERANK_MAX_ITER
+) -> Tuple[np.ndarray, int]:
+    """PageRank of every row (sums to 1) and the iterations it took. Papers citing nothing spread their rank evenly."""
+    n = len(index)
+    if n == 0:
+        return np.zeros(0), 0
+    out_degree = index.out_degree()
+    dangling = out_degree == 0
+    inv_out = np.divide(1.0, out_degree, out=np.zeros(n), where=~dangling)
+    rev_offsets, rev_targets = index.csr(reverse=True)
+
+    rank = np.full(n, 1.0 / n)
+    for it in range(1, max_iter + 1):
+        share = rank * inv_out
+        # rank'[v] = sum of share[u] over the papers u citing v
+        new = _segment_sums(rev_offsets, share[rev_targets])
+        new = damping * (new + rank[dangling].sum() / n) + (1.0 - damping) / n
+        delta = np.abs(new - rank).sum()
+        rank = new
+        if delta < tol:
+            break
+    return rank, it
+
+
+def importance_from_pagerank(rank: np.ndarray) -> np.ndarray:
+    """Log-scaled PageRank in [0, 1]: the least cited papers get 0, the top one 1."""
+    if len(rank) == 0:
+        return np.zeros(0, dtype=np.float32)
+    logs = np.log(rank)
+    span = logs.max() - logs.min()
+    if span <= 0:
+        return np.zeros(len(rank), dtype=np.float32)
+    return ((logs - logs.min()) / span).astype(np.float32)
+
+
+def build_score_sections(index: CitationIndex) -> Tuple[Dict[str, np.ndarray], int]:
+    rank, iterations = pagerank(index)
+    sections = {
+        "pagerank": rank,
+        "citations": index.in_degree().astype(np.int32),
+        "importance": importance_from_pagerank(rank),
+    }
+    return sections, iterations
+
+
+def write_scores(store: CorpusStore, index: CitationIndex, path: Optional[Path] = None) -> str:
+    path = path or data_path(SCORES_FILE)
+    sections, iterations = build_score_sections(index)
+    meta = {
+        "kind": "scores",
+        "format": SCORES_FORMAT,
+        "corpus": store.version,
+        "citations": index.version,
+        "damping": DAMPING,
+        "iterations": iterations,
+    }
+    return write_sections(path, sections, meta)
+
+
+# ----------------------------
+# Reading
+# ----------------------------
+
+class ScoreTable:
+    def __init__(self, sections: Sections):
+        if sections.meta.get("kind") != "scores":
+            raise ValueError("section file is not a score table")
+        self.sections = sections
+        self.version: str = sections.build_id
+        self.corpus_version: str = sections.meta["corpus"]
+        self.citations_version: str = sections.meta["citations"]
+        self.pagerank: np.ndarray = sections["pagerank"]
+        self.citations: np.ndarray = sections["citations"]
+        self.importance: np.ndarray = sections["importance"]
+
+    def __len__(self) -> int:
+        return len(self.pagerank)
+
+
+def load_scores(store: CorpusStore, index: CitationIndex, path: Optional[Path] = None) -> ScoreTable:
+    """Open the score table for `store` / `index`, recomputing it if missing or stale."""
+    path = Path(path or data_path(SCORES_FILE))
+    return open_current(
+        path, ScoreTable,
+        lambda table: (
+            table.sections.meta.get("format") == SCORES_FORMAT
+            and table.corpus_version == store.version
+            and table.citations_version == index.version
+        ),
+        lambda _: write_scores(store, index, path),
+    )
+
+
+# ----------------------------
+# Query-time scoring
+# ----------------------------
+
+class QueryScorer:
+    """
+    Scores rows for one query. `seed_refs` are the rows the query's seed
+    cites (a corpus paper's references, or the demo seed's hardcoded results);
+    coupling is |refs(row) & seed_refs| / sqrt(|refs(row)| * |seed_refs|).
+    Callable as an expansion.ScoreFn.
+    """
+
+    def __init__(
+        self,
+        store: CorpusStore,
+        index: CitationIndex,
+        scores: ScoreTable,
+        seed_refs: np.ndarray,
+        hop_decay: float = 0.5,
+    ):
+        self.store = store
+        self.index = index
+        self.scores = scores
+        self.seed_refs = np.unique(np.asarray(seed_refs, dtype=np.int64))
+        self.hop_decay = hop_decay
+
+    def coupling(self, rows: np.ndarray) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.int64)
+        out = np.zeros(len(rows))
+        if len(rows) == 0 or len(self.seed_refs) == 0:
+            return out
+        pos, refs = self.index.gather(rows)
+        hit = np.searchsorted(self.seed_refs, refs)
+        shared = self.seed_refs[np.minimum(hit, len(self.seed_refs) - 1)] == refs
+        counts = np.bincount(pos[shared], minlength=len(rows))
+        offsets, _ = self.index.csr()
+        degree = (offsets[rows + 1] - offsets[rows]).astype(np.float64)
+        np.divide(counts, np.sqrt(degree * len(self.seed_refs)), out=out, where=degree > 0)
+        return out
+
+    def __call__(self, rows: np.ndarray, hop: int = 1) -> np.ndarray:
+        rows = np.asarray(rows, dtype=np.int64)
+        score = (
+            W_IMPORTANCE * self.scores.importance[rows]
+            + W_RELEVANCE * self.store.relevance[rows]
+            + W_COUPLING * self.coupling(rows)
+        )
+        return score * self.hop_decay ** (hop - 1)
+
+    def rank(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """`rows` best first (stable) and their scores, same order."""
+        scores = self(rows)
+        order = np.argsort(-scores, kind="stable")
+        return np.asarray(rows)[order], scores[order]
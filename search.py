@@ -0,0 +1,283 @@
+# search.py
+"""
+Search over the corpus store, built once into data/search.bin and mmap'd.
+
+  - exact lookup table: normalized paper ids and DOIs -> row
+  - exact normalized-title table: title -> row
+  - title trigram index: typo-tolerant title matching (Dice prefilter + difflib check)
+  - inverted index over title / abstract / snippet / keywords, ranked with BM25
+"""
+import difflib
+import re
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from corpus_store import CorpusStore
+from storage import (
+    Sections,
+    StringColumn,
+    csr_from_pairs,
+    data_path,
+    open_current,
+    sort_order,
+    sorted_lookup,
+    string_sections,
+    write_sections,
+)
+
+SEARCH_FILE = "search.bin"
+SEARCH_FORMAT = 1
+
+# Per-field term weights folded into the BM25 term frequencies.
+FIELD_WEIGHTS = {"title": 3.0, "keywords": 2.0, "abstract": 1.0, "snippet": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TITLE_MATCH_RATIO = 0.85
+_TRIGRAM_CANDIDATES = 32
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_DOI_RE = re.compile(r"^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)?(10\.\d{4,9}/\S+)$", re.IGNORECASE)
+
+
+# ----------------------------
+# Normalization
+# ----------------------------
+
+def fold(text: str) -> str:
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(fold(text))
+
+
+def normalize_title(text: str) -> str:
+    return " ".join(tokenize(text))
+
+
+def normalize_doi(text: str) -> Optional[str]:
+    m = _DOI_RE.match(text.strip())
+    return m.group(1).lower() if m else None
+
+
+def trigrams(norm_title: str) -> List[str]:
+    padded = f"  {norm_title} "
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+def closest_title(query: str, titles: Iterable[str], cutoff: float = TITLE_MATCH_RATIO) -> Optional[str]:
+    """Typo-tolerant match of `query` against a small set of titles (no index)."""
+    by_norm = {normalize_title(t): t for t in titles}
+    match = difflib.get_close_matches(normalize_title(query), list(by_norm), n=1, cutoff=cutoff)
+    return by_norm[match[0]] if match else None
+
+
+# ----------------------------
+# Building
+# ----------------------------
+
+def _sorted_table(name: str, pairs: Dict[str, int]) -> Dict[str, np.ndarray]:
+    keys = sorted(pairs, key=lambda k: k.encode("utf-8"))
+    sections = string_sections(f"{name}.keys", keys)
+    sections[f"{name}.rows"] = np.array([pairs[k] for k in keys], dtype=np.int32)
+    return sections
+
+
+def build_search_sections(store: CorpusStore) -> Dict[str, np.ndarray]:
+    n = len(store)
+    cols = store.columns
+
+    lookup: Dict[str, int] = {}
+    titles: Dict[str, int] = {}
+    doc_len = np.zeros(n, dtype=np.float32)
+    term_ids: Dict[str, int] = {}
+    # Typed arrays rather than lists: one entry per (term, paper) adds up to
+    # tens of millions on large corpora.
+    post_term = array("i")
+    post_row = array("i")
+    post_tf = array("f")
+    tri_ids: Dict[str, int] = {}
+    tri_key = array("i")
+    tri_row = array("i")
+
+    for row in range(n):
+        lookup.setdefault(cols["paper_id"][row].lower(), row)
+        doi = normalize_doi(cols["doi"][row]) if "doi" in cols else None
+        if doi:
+            lookup.setdefault(doi, row)
+
+        norm = normalize_title(cols["title"][row])
+        titles.setdefault(norm, row)
+        for tri in trigrams(norm):
+            tri_key.append(tri_ids.setdefault(tri, len(tri_ids)))
+            tri_row.append(row)
+
+        tf: Dict[str, float] = {}
+        fields = {
+            "title": cols["title"][row],
+            "abstract": cols["abstract"][row],
+            "snippet": cols["snippet"][row],
+            "keywords": " ".join(store.keywords[int(k)] for k in store.keyword_ids(row)),
+        }
+        for field, text in fields.items():
+            for tok in tokenize(text):
+                tf[tok] = tf.get(tok, 0.0) + FIELD_WEIGHTS[field]
+        doc_len[row] = sum(tf.values())
+        for tok, w in tf.items():
+            post_term.append(term_ids.setdefault(tok, len(term_ids)))
+            post_row.append(row)
+            post_tf.append(w)
+
+    # Re-number terms / trigrams in byte order so lookups can binary-search the vocab.
+    terms = list(term_ids)
+    term_order = sort_order(terms)
+    term_rank = np.empty(len(terms), dtype=np.int64)
+    term_rank[term_order] = np.arange(len(terms))
+    post_offsets, post_idx = csr_from_pairs(
+        term_rank[np.array(post_term, dtype=np.int64)], np.arange(len(post_row)), len(terms)
+    )
+
+    tris = list(tri_ids)
+    tri_order = sort_order(tris)
+    tri_rank = np.empty(len(tris), dtype=np.int64)
+    tri_rank[tri_order] = np.arange(len(tris))
+    tri_offsets, tri_rows = csr_from_pairs(
+        tri_rank[np.array(tri_key, dtype=np.int64)], np.array(tri_row, dtype=np.int32), len(tris)
+    )
+
+    sections: Dict[str, np.ndarray] = {}
+    sections.update(_sorted_table("lookup", lookup))
+    sections.update(_sorted_table("title", titles))
+    sections.update(string_sections("terms", [terms[i] for i in term_order]))
+    sections["postings.offsets"] = post_offsets
+    sections["postings.rows"] = np.array(post_row, dtype=np.int32)[post_idx]
+    sections["postings.tf"] = np.array(post_tf, dtype=np.float32)[post_idx]
+    sections["doc_len"] = doc_len
+    sections.update(string_sections("tri.keys", [tris[i] for i in tri_order]))
+    sections["tri.offsets"] = tri_offsets
+    sections["tri.rows"] = tri_rows
+    sections["tri.per_title"] = np.bincount(np.array(tri_row, dtype=np.int64), minlength=n).astype(np.int32)
+    return sections
+
+
+def write_search_index(store: CorpusStore, path: Optional[Path] = None) -> str:
+    path = path or data_path(SEARCH_FILE)
+    meta = {"kind": "search", "format": SEARCH_FORMAT, "corpus": store.version}
+    return write_sections(path, build_search_sections(store), meta)
+
+
+# ----------------------------
+# Querying
+# ----------------------------
+
+class SearchIndex:
+    def __init__(self, sections: Sections):
+        if sections.meta.get("kind") != "search":
+            raise ValueError("section file is not a search index")
+        self.sections = sections
+        self.version: str = sections.build_id
+        self.corpus_version: str = sections.meta["corpus"]
+
+        self._lookup = StringColumn.from_sections(sections, "lookup.keys")
+        self._lookup_rows = sections["lookup.rows"]
+        self._titles = StringColumn.from_sections(sections, "title.keys")
+        self._title_rows = sections["title.rows"]
+
+        self._terms = StringColumn.from_sections(sections, "terms")
+        self._post_offsets = sections["postings.offsets"]
+        self._post_rows = sections["postings.rows"]
+        self._post_tf = sections["postings.tf"]
+        self._doc_len = sections["doc_len"]
+        self._avgdl = float(self._doc_len.mean()) if len(self._doc_len) else 1.0
+
+        self._trigrams = StringColumn.from_sections(sections, "tri.keys")
+        self._tri_offsets = sections["tri.offsets"]
+        self._tri_rows = sections["tri.rows"]
+        self._title_trigrams = sections["tri.per_title"]
+
+    def lookup_id(self, query: str) -> int:
+        """Exact paper id or DOI match; -1 if none."""
+        key = normalize_doi(query) or query.strip().lower()
+        i = sorted_lookup(self._lookup, key)
+        return int(self._lookup_rows[i]) if i >= 0 else -1
+
+    def match_title(self, query: str, store: CorpusStore, min_ratio: float = TITLE_MATCH_RATIO) -> int:
+        """Exact normalized title, else the closest title by trigram prefilter + edit ratio."""
+        norm = normalize_title(query)
+        if not norm:
+            return -1
+        i = sorted_lookup(self._titles, norm)
+        if i >= 0:
+            return int(self._title_rows[i])
+
+        q_tris = trigrams(norm)
+        hits = [self._tri_rows[self._tri_offsets[j]:self._tri_offsets[j + 1]]
+                for j in (sorted_lookup(self._trigrams, t) for t in q_tris) if j >= 0]
+        if not hits:
+            return -1
+        rows, overlap = np.unique(np.concatenate(hits), return_counts=True)
+        dice = 2.0 * overlap / (len(q_tris) + self._title_trigrams[rows])
+        top = rows[np.argsort(-dice, kind="stable")[:_TRIGRAM_CANDIDATES]]
+
+        best_row, best_ratio = -1, min_ratio
+        titles = store.columns["title"]
+        for row in top:
+            ratio = difflib.SequenceMatcher(None, norm, normalize_title(titles[int(row)])).ratio()
+            if ratio >= best_ratio:
+                best_row, best_ratio = int(row), ratio
+        return best_row
+
+    def bm25(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        n = len(self._doc_len)
+        rows_parts: List[np.ndarray] = []
+        score_parts: List[np.ndarray] = []
+        for tok in set(tokenize(query)):
+            j = sorted_lookup(self._terms, tok)
+            if j < 0:
+                continue
+            lo, hi = self._post_offsets[j], self._post_offsets[j + 1]
+            rows = self._post_rows[lo:hi]
+            tf = self._post_tf[lo:hi]
+            idf = np.log1p((n - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self._doc_len[rows] / self._avgdl)
+            rows_parts.append(rows)
+            score_parts.append(idf * tf * (BM25_K1 + 1.0) / (tf + norm))
+        if not rows_parts:
+            return []
+
+        rows, inverse = np.unique(np.concatenate(rows_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        top = np.argsort(-scores, kind="stable")[:k]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def resolve(self, query: str, store: CorpusStore, min_score: float = 1.0) -> int:
+        """Best single paper for a free-text query (id/DOI, then title, then BM25); -1 if none."""
+        q = (query or "").strip()
+        if not q:
+            return -1
+        row = self.lookup_id(q)
+        if row < 0:
+            row = self.match_title(q, store)
+        if row < 0:
+            ranked = self.bm25(q, k=1)
+            if ranked and ranked[0][1] >= min_score:
+                row = ranked[0][0]
+        return row
+
+
+def load_search(store: CorpusStore, path: Optional[Path] = None) -> SearchIndex:
+    """Open the persisted search index for `store`, building it only if missing or stale."""
+    path = Path(path or data_path(SEARCH_FILE))
+    return open_current(
+        path, SearchIndex,
+        lambda index: index.corpus_version == store.version,
+        lambda _: write_search_index(store, path),
+    )
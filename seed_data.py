@@ -0,0 +1,412 @@
+# seed_data.py
+"""Demo corpus used to build the on-disk stores (see `python manage.py build-corpus`)."""
+from typing import Dict, List
+
+from models import Paper
+
+SEED_TITLE = "Beyond Accuracy: The Role of Mental Models in Human-AI Team Performance"
+
+# ----------------------------
+# Papers (core + expanded dummy corpus for deeper chaining)
+# ----------------------------
+
+SEED_PAPERS: Dict[str, Paper] = {
+    # ---- core 8 (same as your set) ----
+    "norman_1983": Paper(
+        paper_id="norman_1983",
+        title="Mental Models of Intelligent Systems",
+        authors="D. Norman",
+        year=1983,
+        venue="Human–Computer Interaction",
+        relevance=0.95,
+        keywords=["mental models", "human understanding", "cognition"],
+        snippet="Introduces mental models as internal representations humans use to understand and predict system behavior.",
+        abstract="Classic work describing how people build internal representations of systems to predict outcomes and explain behavior.",
+    ),
+    "ribeiro_2016_lime": Paper(
+        paper_id="ribeiro_2016_lime",
+        title="Why Should I Trust You? Explaining the Predictions of Any Classifier",
+        authors="M. Ribeiro, S. Singh, C. Guestrin",
+        year=2016,
+        venue="KDD",
+        relevance=0.92,
+        keywords=["explainable AI", "interpretability", "trust"],
+        snippet="Presents LIME, a method for explaining individual predictions to improve human trust and understanding.",
+        abstract="Introduces LIME, a local surrogate explanation method that helps users interpret model predictions and debug behavior.",
+    ),
+    "kaur_2020_trust": Paper(
+        paper_id="kaur_2020_trust",
+        title="On the Relationship Between Explanation and Trust in AI Systems",
+        authors="S. Kaur et al.",
+        year=2020,
+        venue="CHI",
+        relevance=0.90,
+        keywords=["trust", "explainability", "human-AI interaction"],
+        snippet="Shows explanations influence trust calibration rather than blind reliance.",
+        abstract="Examines how explanation interfaces affect user trust, calibration, and reliance behaviors in AI-assisted tasks.",
+    ),
+    "amershi_2019_collab": Paper(
+        paper_id="amershi_2019_collab",
+        title="Human-AI Collaboration: Models, Design Patterns, and Future Directions",
+        authors="S. Amershi et al.",
+        year=2019,
+        venue="CHI",
+        relevance=0.93,
+        keywords=["human-AI teaming", "collaboration", "design patterns"],
+        snippet="Framework for designing effective human-AI collaborative systems beyond raw accuracy.",
+        abstract="Synthesizes models and design patterns for human–AI collaboration, emphasizing workflows and feedback loops.",
+    ),
+    "lipton_2018_mythos": Paper(
+        paper_id="lipton_2018_mythos",
+        title="The Mythos of Model Interpretability",
+        authors="Z. Lipton",
+        year=2018,
+        venue="Queue",
+        relevance=0.85,
+        keywords=["interpretability", "mental models", "machine learning"],
+        snippet="Critically examines what interpretability means and how it affects user understanding.",
+        abstract="Critiques ambiguous definitions of interpretability and argues for clearer goals and evaluation in context.",
+    ),
+    "bansal_2021_error": Paper(
+        paper_id="bansal_2021_error",
+        title="Predictability and Transparency in AI Error Behavior",
+        authors="H. Bansal, E. Weld",
+        year=2021,
+        venue="AAAI",
+        relevance=0.88,
+        keywords=["error boundaries", "predictability", "human-AI teaming"],
+        snippet="Predictable error patterns can improve human-AI team performance more than higher accuracy.",
+        abstract="Explores how predictable vs. unpredictable errors shape user mental models, reliance, and collaboration outcomes.",
+    ),
+    "lee_see_2004_trust": Paper(
+        paper_id="lee_see_2004_trust",
+        title="Appropriate Trust and Reliance in Human-AI Teams",
+        authors="J. Lee, K. See",
+        year=2004,
+        venue="Human Factors",
+        relevance=0.87,
+        keywords=["trust", "calibration", "automation"],
+        snippet="Classic paper on trust calibration and appropriate reliance on automated systems.",
+        abstract="Foundational work on trust in automation and how design supports appropriate reliance, avoiding misuse/disuse.",
+    ),
+    "shneiderman_2020_control": Paper(
+        paper_id="shneiderman_2020_control",
+        title="Designing AI Systems for Effective Human Control",
+        authors="B. Shneiderman",
+        year=2020,
+        venue="Communications of the ACM",
+        relevance=0.84,
+        keywords=["human-centered AI", "control", "explainability"],
+        snippet="Human-centered design principles to maintain user control and understanding.",
+        abstract="Argues for human-centered AI emphasizing oversight, responsibility, and transparency in socio-technical systems.",
+    ),
+
+    # ---- existing extra dummy ----
+    "doshi_velez_2017": Paper(
+        paper_id="doshi_velez_2017",
+        title="Towards a Rigorous Science of Interpretable Machine Learning",
+        authors="F. Doshi-Velez, B. Kim",
+        year=2017,
+        venue="(Demo) arXiv",
+        relevance=0.82,
+        keywords=["interpretability", "evaluation", "machine learning"],
+        snippet="Argues for clearer goals and evaluation methods for interpretability.",
+        abstract="Proposes a framework for evaluating interpretability depending on task, user population, and stakes.",
+    ),
+    "miller_2019_explanations": Paper(
+        paper_id="miller_2019_explanations",
+        title="Explanation in Artificial Intelligence: Insights from the Social Sciences",
+        authors="T. Miller",
+        year=2019,
+        venue="AI Journal",
+        relevance=0.83,
+        keywords=["explainability", "human understanding", "trust"],
+        snippet="Connects explanation needs to how humans understand and accept reasoning.",
+        abstract="Synthesizes social science research on explanation and maps implications to AI system design.",
+    ),
+    "zhang_2020_calibration": Paper(
+        paper_id="zhang_2020_calibration",
+        title="Calibrating Trust in AI-Assisted Decision Making",
+        authors="Y. Zhang et al.",
+        year=2020,
+        venue="(Demo) CSCW",
+        relevance=0.78,
+        keywords=["trust", "calibration", "human-AI interaction"],
+        snippet="Examines interventions to reduce over/under-reliance on AI.",
+        abstract="Studies calibration strategies such as confidence cues, history, and explanations and their effects on reliance.",
+    ),
+    "wu_2021_error_boundary": Paper(
+        paper_id="wu_2021_error_boundary",
+        title="Characterizing Error Boundaries for Human-AI Collaboration",
+        authors="J. Wu et al.",
+        year=2021,
+        venue="(Demo) AAAI",
+        relevance=0.81,
+        keywords=["error boundaries", "human-AI teaming", "predictability"],
+        snippet="Ways to summarize failure regions so users can learn when to rely on AI.",
+        abstract="Explores representations of error boundaries and how they influence user mental models and reliance behavior.",
+    ),
+    "khanna_2022_feedback": Paper(
+        paper_id="khanna_2022_feedback",
+        title="Designing Feedback Loops for Human-AI Teaming",
+        authors="S. Khanna et al.",
+        year=2022,
+        venue="(Demo) CHI",
+        relevance=0.77,
+        keywords=["human-AI teaming", "collaboration", "design patterns"],
+        snippet="Design patterns for feedback loops in human-AI systems.",
+        abstract="Discusses feedback loop designs that help humans and AI coordinate, correct errors, and refine strategies.",
+    ),
+    "yang_2023_transparency": Paper(
+        paper_id="yang_2023_transparency",
+        title="Transparency Interfaces for Predictable Reliance",
+        authors="K. Yang et al.",
+        year=2023,
+        venue="(Demo) UIST",
+        relevance=0.75,
+        keywords=["transparency", "trust", "predictability"],
+        snippet="UI patterns for communicating limitations and supporting calibrated reliance.",
+        abstract="Explores interface patterns that communicate uncertainty and limitations so users can form reliable mental models.",
+    ),
+
+    # ---- NEW: mental models / cognition cluster ----
+    "johnson_laird_1983": Paper(
+        paper_id="johnson_laird_1983",
+        title="Mental Models: Towards a Cognitive Science of Language, Inference, and Consciousness",
+        authors="P. Johnson-Laird",
+        year=1983,
+        venue="Book (Demo)",
+        relevance=0.80,
+        keywords=["mental models", "cognition", "reasoning"],
+        snippet="Foundational theory describing mental models as the basis for human reasoning and inference.",
+        abstract="Proposes that people reason by constructing and manipulating mental models of situations rather than relying on formal logic alone.",
+    ),
+    "gentner_structure_mapping_1983": Paper(
+        paper_id="gentner_structure_mapping_1983",
+        title="Structure-Mapping: A Theoretical Framework for Analogy",
+        authors="D. Gentner",
+        year=1983,
+        venue="Cognitive Science (Demo)",
+        relevance=0.74,
+        keywords=["cognition", "human understanding", "analogy"],
+        snippet="Explains how people transfer knowledge via analogical mapping, supporting mental model formation.",
+        abstract="Introduces structure-mapping theory of analogy, explaining how relational structure guides human understanding and learning.",
+    ),
+    "hutchins_cognition_1995": Paper(
+        paper_id="hutchins_cognition_1995",
+        title="Cognition in the Wild: Distributed Cognition and Real-World Work",
+        authors="E. Hutchins",
+        year=1995,
+        venue="Book (Demo)",
+        relevance=0.72,
+        keywords=["human understanding", "cognition", "distributed cognition"],
+        snippet="Shows cognition is distributed across people and artifacts, relevant to team mental models.",
+        abstract="Argues that cognition is not confined to individuals but distributed across social and material systems, shaping performance in complex tasks.",
+    ),
+    "klein_sensemaking_1998": Paper(
+        paper_id="klein_sensemaking_1998",
+        title="A Data-Frame Theory of Sensemaking",
+        authors="G. Klein et al.",
+        year=1998,
+        venue="IEEE Intelligent Systems (Demo)",
+        relevance=0.70,
+        keywords=["sensemaking", "human understanding", "cognition"],
+        snippet="Sensemaking theory relevant to how people build and revise mental models.",
+        abstract="Describes how people adopt frames to interpret data and revise frames when anomalies arise, explaining how mental models evolve over time.",
+    ),
+    "endsley_sa_1995": Paper(
+        paper_id="endsley_sa_1995",
+        title="Toward a Theory of Situation Awareness in Dynamic Systems",
+        authors="M. Endsley",
+        year=1995,
+        venue="Human Factors (Demo)",
+        relevance=0.76,
+        keywords=["human understanding", "situation awareness", "cognition"],
+        snippet="Defines situation awareness and its relationship to decision making in dynamic environments.",
+        abstract="Proposes a theory of situation awareness as perception, comprehension, and projection, and connects it to performance and decision quality.",
+    ),
+
+    # ---- NEW: trust / reliance / automation cluster ----
+    "parasuraman_2000": Paper(
+        paper_id="parasuraman_2000",
+        title="A Model for Types and Levels of Human Interaction with Automation",
+        authors="R. Parasuraman, T. Sheridan, C. Wickens",
+        year=2000,
+        venue="IEEE Transactions (Demo)",
+        relevance=0.79,
+        keywords=["automation", "trust", "human-AI interaction"],
+        snippet="Framework for levels of automation and how they affect monitoring and reliance.",
+        abstract="Presents a taxonomy of automation levels and discusses how design choices shape human monitoring, workload, and appropriate reliance.",
+    ),
+    "hoff_rashid_trust_2016": Paper(
+        paper_id="hoff_rashid_trust_2016",
+        title="Trust in Automation: Integrating Empirical Evidence Across Domains",
+        authors="K. Hoff, A. Bashir",
+        year=2016,
+        venue="Human Factors (Demo)",
+        relevance=0.73,
+        keywords=["trust", "calibration", "automation"],
+        snippet="Synthesizes factors influencing trust calibration including transparency and experience.",
+        abstract="Reviews empirical findings on trust in automation, identifying drivers of trust, misuse/disuse, and strategies to improve calibration.",
+    ),
+    "calibrated_confidence_2019": Paper(
+        paper_id="calibrated_confidence_2019",
+        title="Communicating Model Confidence for Calibrated Reliance",
+        authors="A. Park et al.",
+        year=2019,
+        venue="(Demo) CHI",
+        relevance=0.69,
+        keywords=["trust", "calibration", "transparency"],
+        snippet="Studies UI confidence cues and their effect on over/under-reliance.",
+        abstract="Examines how confidence displays and performance histories influence reliance, including cases where confidence can mislead when poorly calibrated.",
+    ),
+
+    # ---- NEW: interpretability / XAI evaluation cluster ----
+    "xai_user_eval_2018": Paper(
+        paper_id="xai_user_eval_2018",
+        title="Human-Centered Evaluation of Explanations: Tasks, Measures, and Pitfalls",
+        authors="V. Lai et al.",
+        year=2018,
+        venue="(Demo) CHI",
+        relevance=0.71,
+        keywords=["explainable AI", "evaluation", "human-AI interaction"],
+        snippet="Compares explanation styles and measures effects on understanding and decision quality.",
+        abstract="Presents a set of evaluation approaches for explanation interfaces and discusses pitfalls where explanations increase confidence without improving correctness.",
+    ),
+    "model_cards_2019": Paper(
+        paper_id="model_cards_2019",
+        title="Model Cards for Model Reporting",
+        authors="M. Mitchell et al.",
+        year=2019,
+        venue="FAT* (Demo)",
+        relevance=0.67,
+        keywords=["transparency", "documentation", "human-centered AI"],
+        snippet="Documentation approach to communicate intended use, limitations, and evaluation.",
+        abstract="Proposes standardized documentation for models to support informed use, communicating evaluation context, performance, and limitations.",
+    ),
+
+    # ---- NEW: error boundary / predictability cluster ----
+    "failure_modes_2020": Paper(
+        paper_id="failure_modes_2020",
+        title="Summarizing Model Failure Modes for Non-Expert Users",
+        authors="J. Rivera et al.",
+        year=2020,
+        venue="(Demo) UIST",
+        relevance=0.72,
+        keywords=["error boundaries", "predictability", "human understanding"],
+        snippet="Techniques to show users where a model tends to fail, supporting better mental models.",
+        abstract="Explores ways to summarize failure regions and communicate them to users so they can anticipate errors and allocate attention effectively.",
+    ),
+    "selective_prediction_2017": Paper(
+        paper_id="selective_prediction_2017",
+        title="Selective Prediction: Abstention Mechanisms for Safer Human-AI Collaboration",
+        authors="S. Gupta et al.",
+        year=2017,
+        venue="(Demo) ICML",
+        relevance=0.68,
+        keywords=["predictability", "human-AI teaming", "trust"],
+        snippet="Abstention to avoid low-confidence errors, intended to improve collaboration safety.",
+        abstract="Introduces abstention/deferral strategies that can reduce catastrophic errors, and discusses implications for user reliance and workflow design.",
+    ),
+}
+
+# ----------------------------
+# Hardcoded demo results (query -> paper ids, original order)
+# ----------------------------
+
+SEED_RESULTS: Dict[str, List[str]] = {
+    SEED_TITLE: [
+        "norman_1983",
+        "ribeiro_2016_lime",
+        "kaur_2020_trust",
+        "amershi_2019_collab",
+        "lipton_2018_mythos",
+        "bansal_2021_error",
+        "lee_see_2004_trust",
+        "shneiderman_2020_control",
+    ]
+}
+
+# ----------------------------
+# Citation edges
+# ----------------------------
+
+SEED_CITES: Dict[str, List[str]] = {
+    "seed": list(SEED_RESULTS[SEED_TITLE]),
+
+    "norman_1983": [
+        "johnson_laird_1983",
+        "gentner_structure_mapping_1983",
+        "endsley_sa_1995",
+        "klein_sensemaking_1998",
+        "hutchins_cognition_1995",
+    ],
+
+    "ribeiro_2016_lime": ["doshi_velez_2017", "miller_2019_explanations", "xai_user_eval_2018"],
+    "lipton_2018_mythos": ["doshi_velez_2017", "miller_2019_explanations"],
+    "doshi_velez_2017": ["xai_user_eval_2018", "model_cards_2019"],
+    "xai_user_eval_2018": ["model_cards_2019"],
+    "model_cards_2019": [],
+
+    "kaur_2020_trust": ["zhang_2020_calibration", "miller_2019_explanations", "calibrated_confidence_2019"],
+    "lee_see_2004_trust": ["parasuraman_2000", "hoff_rashid_trust_2016"],
+    "zhang_2020_calibration": ["hoff_rashid_trust_2016", "calibrated_confidence_2019"],
+    "parasuraman_2000": ["hoff_rashid_trust_2016"],
+    "hoff_rashid_trust_2016": ["calibrated_confidence_2019"],
+    "calibrated_confidence_2019": [],
+
+    "amershi_2019_collab": ["khanna_2022_feedback", "shneiderman_2020_control", "parasuraman_2000"],
+    "khanna_2022_feedback": ["amershi_2019_collab"],
+
+    "bansal_2021_error": ["wu_2021_error_boundary", "failure_modes_2020", "selective_prediction_2017", "yang_2023_transparency"],
+    "wu_2021_error_boundary": ["failure_modes_2020", "selective_prediction_2017"],
+    "failure_modes_2020": ["selective_prediction_2017"],
+    "selective_prediction_2017": [],
+
+    "shneiderman_2020_control": ["model_cards_2019", "yang_2023_transparency"],
+    "yang_2023_transparency": ["calibrated_confidence_2019", "model_cards_2019"],
+
+    "johnson_laird_1983": [],
+    "gentner_structure_mapping_1983": [],
+    "hutchins_cognition_1995": [],
+    "klein_sensemaking_1998": [],
+    "endsley_sa_1995": [],
+
+    "miller_2019_explanations": ["johnson_laird_1983", "lee_see_2004_trust"],
+}
+
+# ----------------------------
+# Curated keyword concepts (anchor and label the AI-mode clustering, see concepts.py)
+# ----------------------------
+
+AI_CANONICAL: Dict[str, str] = {
+    "mental models": "Mental Models & Interpretability",
+    "human understanding": "Mental Models & Interpretability",
+    "cognition": "Mental Models & Interpretability",
+    "sensemaking": "Mental Models & Interpretability",
+    "situation awareness": "Mental Models & Interpretability",
+    "distributed cognition": "Mental Models & Interpretability",
+    "reasoning": "Mental Models & Interpretability",
+    "analogy": "Mental Models & Interpretability",
+
+    "explainable AI": "Explainability & Transparency",
+    "explainability": "Explainability & Transparency",
+    "transparency": "Explainability & Transparency",
+    "documentation": "Explainability & Transparency",
+    "evaluation": "Explainability & Transparency",
+    "interpretability": "Explainability & Transparency",
+
+    "human-AI teaming": "Human–AI Collaboration",
+    "human-AI interaction": "Human–AI Collaboration",
+    "collaboration": "Human–AI Collaboration",
+    "design patterns": "Human–AI Collaboration",
+    "human-centered AI": "Human–AI Collaboration",
+    "control": "Human–AI Collaboration",
+
+    "trust": "Trust, Calibration & Reliance",
+    "calibration": "Trust, Calibration & Reliance",
+    "automation": "Trust, Calibration & Reliance",
+
+    "error boundaries": "Error Predictability",
+    "predictability": "Error Predictability",
+}
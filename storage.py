@@ -0,0 +1,363 @@
+# storage.py
+"""
+Section files: one small JSON header followed by named, 8-byte aligned numpy
+arrays. Files are written once and read back through a read-only mmap, so
+arrays are zero-copy views and pages are shared between processes by the OS.
+
+Several server processes can attach to one data directory: a missing or stale
+store is built by one process under a file lock while the others wait and
+then map the result (`open_current`). With CCP_READ_ONLY=1 a process never
+builds and instead fails fast, so a separate loader (`manage.py build-all`)
+owns the files. Pointing CCP_DATA_DIR at a tmpfs such as /dev/shm keeps the
+stores in shared memory outright.
+
+A snapshot (data/snapshot.bin, `write_snapshot`) bundles several store files'
+sections into one section file. Loaders prefer a store's copy in the snapshot
+unless the store's own file is newer, so a deployment can ship the snapshot
+alone and later rebuilds of single stores still take effect.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None
+
+DATA_DIR = Path(os.environ.get("CCP_DATA_DIR", Path(__file__).resolve().parent / "data"))
+READ_ONLY = os.environ.get("CCP_READ_ONLY", "") not in ("", "0")
+
+SNAPSHOT_FILE = "snapshot.bin"
+
+MAGIC = b"CCPSECT1"
+_ALIGN = 8
+_LEN = struct.Struct("<Q")
+
+
+class StoreFormatError(ValueError):
+    pass
+
+
+def data_path(name: str) -> Path:
+    return DATA_DIR / name
+
+
+def _pad(n: int) -> int:
+    return (-n) % _ALIGN
+
+
+# ----------------------------
+# Writing
+# ----------------------------
+
+def write_sections(path: Path, sections: Dict[str, np.ndarray], meta: Optional[dict] = None) -> str:
+    """Write `sections` to `path` atomically and return the file's build id."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    arrays = {name: np.ascontiguousarray(arr) for name, arr in sections.items()}
+    # Flat byte views: memoryview cannot cast an empty multi-dimensional array.
+    raw = {name: memoryview(arr.reshape(-1)).cast("B") for name, arr in arrays.items()}
+
+    digest = hashlib.sha1()
+    digest.update(json.dumps(meta or {}, sort_keys=True).encode())
+    for name, arr in arrays.items():
+        digest.update(name.encode())
+        digest.update(arr.dtype.str.encode())
+        digest.update(raw[name])
+    build_id = digest.hexdigest()[:16]
+
+    table: List[dict] = []
+    offset = 0
+    for name, arr in arrays.items():
+        table.append({"name": name, "dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset})
+        offset += arr.nbytes + _pad(arr.nbytes)
+
+    header = json.dumps({
+        "meta": {**(meta or {}), "build_id": build_id},
+        "byteorder": sys.byteorder,
+        "sections": table,
+    }).encode()
+    data_start = len(MAGIC) + _LEN.size + len(header)
+    data_start += _pad(data_start)
+
+    # Per-process temp name: concurrent writers must not share one file.
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(_LEN.pack(len(header)))
+        f.write(header)
+        f.write(b"\0" * (data_start - f.tell()))
+        for name, arr in arrays.items():
+            f.write(raw[name])
+            f.write(b"\0" * _pad(arr.nbytes))
+    # os.replace keeps readers that still map the old inode valid.
+    os.replace(tmp, path)
+    return build_id
+
+
+# ----------------------------
+# Reading
+# ----------------------------
+
+class Sections(Mapping[str, np.ndarray]):
+    """Read-only, name-addressed view over a section file's buffer."""
+
+    def __init__(self, buf, header: dict, data_start: int):
+        if header.get("byteorder") != sys.byteorder:
+            raise StoreFormatError("section file was written on a machine with a different byte order")
+        self._buf = buf
+        self._data_start = data_start
+        self._table = {s["name"]: s for s in header["sections"]}
+        self.meta: dict = header["meta"]
+
+    @property
+    def build_id(self) -> str:
+        return self.meta["build_id"]
+
+    @classmethod
+    def from_buffer(cls, buf) -> "Sections":
+        view = memoryview(buf)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise StoreFormatError("not a section file")
+        (header_len,) = _LEN.unpack_from(view, len(MAGIC))
+        start = len(MAGIC) + _LEN.size
+        header = json.loads(bytes(view[start:start + header_len]))
+        data_start = start + header_len
+        return cls(buf, header, data_start + _pad(data_start))
+
+    @classmethod
+    def open(cls, path: Path) -> "Sections":
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_buffer(mm)
+
+    def store(self, name: str) -> Optional["Sections"]:
+        """The sections of store file `name` bundled in this snapshot (None if absent)."""
+        meta = self.meta.get("stores", {}).get(name)
+        if meta is None:
+            return None
+        prefix = name + "/"
+        table = [{**s, "name": s["name"][len(prefix):]} for s in self._table.values() if s["name"].startswith(prefix)]
+        return Sections(self._buf, {"meta": meta, "byteorder": sys.byteorder, "sections": table}, self._data_start)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        s = self._table[name]
+        dtype = np.dtype(s["dtype"])
+        count = int(np.prod(s["shape"], dtype=np.int64))
+        arr = np.frombuffer(self._buf, dtype=dtype, count=count, offset=self._data_start + s["offset"])
+        return arr.reshape(s["shape"])
+
+    def __contains__(self, name) -> bool:
+        return name in self._table
+
+    def __iter__(self):
+        return iter(self._table)
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+
+T = TypeVar("T")
+_OPENED: Dict[tuple, Tuple[int, object]] = {}
+
+def open_cached(path: Path, factory: Callable[[Sections], T]) -> T:
+    """Open `path` as `factory(sections)`, reusing the instance until the file is replaced."""
+    path = Path(path)
+    mtime = path.stat().st_mtime_ns
+    cached = _OPENED.get((path, factory))
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, factory(Sections.open(path)))
+        _OPENED[(path, factory)] = cached
+    return cached[1]
+
+
+def write_snapshot(path: Path, stores: Iterable[Path]) -> str:
+    """Bundle the store files `stores` into one snapshot file at `path`; returns its build id."""
+    sections: Dict[str, np.ndarray] = {}
+    metas: Dict[str, dict] = {}
+    for store in map(Path, stores):
+        opened = Sections.open(store)
+        metas[store.name] = opened.meta
+        for name in opened:
+            sections[f"{store.name}/{name}"] = opened[name]
+    return write_sections(path, sections, {"kind": "snapshot", "stores": metas})
+
+
+def _bundle(sections: Sections) -> Sections:
+    if sections.meta.get("kind") != "snapshot":
+        raise StoreFormatError("section file is not a snapshot")
+    return sections
+
+
+def open_snapshotted(path: Path, factory: Callable[[Sections], T]) -> Optional[T]:
+    """`factory` over `path`'s copy in the snapshot next to it, unless `path` itself is newer (None then)."""
+    path = Path(path)
+    snapshot = path.with_name(SNAPSHOT_FILE)
+    try:
+        mtime = snapshot.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if path.exists() and path.stat().st_mtime_ns > mtime:
+        return None
+    key = (snapshot, path.name, factory)
+    cached = _OPENED.get(key)
+    if cached is None or cached[0] != mtime:
+        sections = open_cached(snapshot, _bundle).store(path.name)
+        if sections is None:
+            return None
+        cached = (mtime, factory(sections))
+        _OPENED[key] = cached
+    return cached[1]
+
+
+@contextmanager
+def store_lock(path: Path) -> Iterator[None]:
+    """Exclusive inter-process lock for (re)building `path` (a no-op without fcntl)."""
+    path = Path(path)
+    if fcntl is None:
+        yield
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(path.name + ".lock"), "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def open_current(
+    path: Path,
+    factory: Callable[[Sections], T],
+    is_current: Callable[[T], bool],
+    build: Callable[[Optional[T]], object],
+) -> T:
+    """
+    Open `path` as `factory(sections)` (from the snapshot, if it holds the
+    newest copy) if it exists and `is_current`; otherwise `build(previous or
+    None)` it under `store_lock`, unless another process finished doing so
+    while we waited. Raises StoreFormatError instead of building when
+    CCP_READ_ONLY is set.
+    """
+    path = Path(path)
+    opened = open_snapshotted(path, factory)
+    if opened is not None and is_current(opened):
+        return opened
+    if path.exists():
+        opened = open_cached(path, factory)
+        if is_current(opened):
+            return opened
+    if READ_ONLY:
+        raise StoreFormatError(f"{path} is missing or stale and CCP_READ_ONLY is set; run `manage.py build-all`")
+    with store_lock(path):
+        previous = opened
+        if path.exists():
+            previous = open_cached(path, factory)
+            if is_current(previous):
+                return previous
+        build(previous)
+    return open_cached(path, factory)
+
+
+def csr_from_pairs(keys: np.ndarray, values: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Group `values` by `keys` (0 <= key < n) into int32 offsets/values; order within a key is kept."""
+    order = np.argsort(keys, kind="stable")
+    offsets = np.zeros(n + 1, dtype=np.int32)
+    np.cumsum(np.bincount(keys, minlength=n), out=offsets[1:])
+    return offsets, values[order]
+
+
+def csr_gather(offsets: np.ndarray, values: np.ndarray, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    All values of `keys` in one vectorized gather. Returns (position in `keys`,
+    value) pairs, in key order and CSR order within a key.
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    starts = offsets[keys].astype(np.int64)
+    lens = offsets[keys + 1].astype(np.int64) - starts
+    pos = np.repeat(np.arange(len(keys)), lens)
+    flat = np.arange(int(lens.sum())) + np.repeat(starts - (np.cumsum(lens) - lens), lens)
+    return pos, values[flat]
+
+
+# ----------------------------
+# Variable-length string columns (offsets + utf-8 blob)
+# ----------------------------
+
+def encode_strings(values: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    if encoded:
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return offsets, blob
+
+
+class StringColumn:
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self.offsets = offsets
+        self.blob = blob
+
+    @classmethod
+    def from_sections(cls, sections: Mapping[str, np.ndarray], name: str) -> "StringColumn":
+        return cls(sections[f"{name}.offsets"], sections[f"{name}.blob"])
+
+    def raw(self, i: int) -> bytes:
+        return self.blob[int(self.offsets[i]):int(self.offsets[i + 1])].tobytes()
+
+    def __getitem__(self, i: int) -> str:
+        return self.raw(i).decode("utf-8")
+
+    def take(self, rows: Sequence[int]) -> List[str]:
+        """The strings at `rows` (one pass over a memoryview instead of a numpy slice per row)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        blob = memoryview(self.blob)
+        starts, ends = self.offsets[rows].tolist(), self.offsets[rows + 1].tolist()
+        return [str(blob[a:b], "utf-8") for a, b in zip(starts, ends)]
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+
+def string_sections(name: str, values: Iterable[str]) -> Dict[str, np.ndarray]:
+    offsets, blob = encode_strings(values)
+    return {f"{name}.offsets": offsets, f"{name}.blob": blob}
+
+
+def lower_bound(col: StringColumn, key: bytes, order: Optional[np.ndarray] = None) -> int:
+    """First position in `col` (visited in `order`, sorted by utf-8 bytes) whose value is >= `key`."""
+    lo, hi = 0, len(col) if order is None else len(order)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        i = mid if order is None else int(order[mid])
+        if col.raw(i) < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def sorted_lookup(col: StringColumn, key: str, order: Optional[np.ndarray] = None) -> int:
+    """Index of `key` in a byte-sorted `col` (or sorted view `order`); -1 if absent."""
+    target = key.encode("utf-8")
+    pos = lower_bound(col, target, order)
+    n = len(col) if order is None else len(order)
+    if pos < n:
+        i = pos if order is None else int(order[pos])
+        if col.raw(i) == target:
+            return i
+    return -1
+
+
+def sort_order(values: List[str]) -> np.ndarray:
+    return np.array(sorted(range(len(values)), key=lambda i: values[i].encode("utf-8")), dtype=np.int32)
@@ -0,0 +1,22 @@
+import pytest
+
+from corpus_store import CorpusStore, write_corpus
+from models import Paper
+from storage import Sections
+
+
+def paper(pid, year=2000, venue="CHI", keywords=("hci",), **fields):
+    return Paper(
+        paper_id=pid, title=fields.pop("title", f"Paper {pid}"), authors=fields.pop("authors", "A. Author"),
+        year=year, venue=venue, relevance=fields.pop("relevance", 0.5), keywords=list(keywords),
+        snippet="", abstract="", **fields,
+    )
+
+
+@pytest.fixture
+def make_corpus(tmp_path):
+    def make(papers, name="corpus.bin", meta=None):
+        path = tmp_path / name
+        write_corpus(papers, path, meta)
+        return CorpusStore(Sections.open(path))
+    return make
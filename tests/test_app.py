@@ -0,0 +1,42 @@
+from pathlib import Path
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import storage
+
+APP = str(Path(__file__).resolve().parent.parent / "app.py")
+
+
+@pytest.fixture
+def run_app(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", tmp_path)
+
+    def run(**params):
+        at = AppTest.from_file(APP, default_timeout=60)
+        for name, value in params.items():
+            at.query_params[name] = value
+        at.run()
+        assert not at.exception
+        return at
+    return run
+
+
+def shown(at):
+    return next(m.value for m in at.markdown if m.value.startswith("Showing"))
+
+
+def test_a_year_range_without_papers_shows_none(run_app):
+    at = run_app(page="results", year="1800-1801")
+    assert shown(at).startswith("Showing **0** of 8 ")
+
+
+def test_venue_filter_round_trips_through_the_url(run_app):
+    at = run_app(page="results", venue="CHI|A\\|B")
+    venues = at.multiselect(key="filter_venue")
+    assert venues.value == ["CHI", "A|B"]
+    assert shown(at).startswith("Showing **2** of 8 ")
+
+    venues.unselect("CHI").run()
+    assert at.query_params["venue"] == "A\\|B"
+    assert shown(at).startswith("Showing **0** of 8 ")
@@ -0,0 +1,38 @@
+from chain_codec import ChainCodec, ChainStore
+from conftest import paper
+
+SEED = "seed_paper"
+
+
+def codecs(tmp_path, make_corpus):
+    chains = ChainStore(tmp_path / "chains.sqlite")
+    old = make_corpus([paper(pid) for pid in "abc"], "old.bin")
+    # An append ingest: same papers plus one, so a new corpus version.
+    new = make_corpus([paper(pid) for pid in "abcd"], "new.bin")
+    assert old.version[:4] != new.version[:4]
+    return ChainCodec(old, chains, SEED, inline_max=2), ChainCodec(new, chains, SEED, inline_max=2)
+
+
+def test_round_trip(tmp_path, make_corpus):
+    _, codec = codecs(tmp_path, make_corpus)
+    for chain in ([SEED, "a"], [SEED, "a", "b", "d"]):
+        links = codec.links(chain)
+        assert codec.decode(links.ref) == chain
+        assert codec.decode(links.prefix(1)) == [SEED]
+        assert codec.decode(links.extend("c")) == chain + ["c"]
+
+
+def test_tokens_survive_a_corpus_version_change(tmp_path, make_corpus):
+    old, new = codecs(tmp_path, make_corpus)
+    links = old.links([SEED, "a", "b", "c"])
+    assert links.ref.startswith("t")
+    assert new.decode(links.ref) == [SEED, "a", "b", "c"]
+    assert new.decode(links.prefix(2)) == [SEED, "a"]
+    assert new.decode(links.prefix(2) + ".p1") == [SEED]
+
+
+def test_rows_from_another_corpus_version_are_stale(tmp_path, make_corpus):
+    old, new = codecs(tmp_path, make_corpus)
+    assert old.links([SEED, "a"]).ref.startswith("r")
+    assert new.decode(old.links([SEED, "a"]).ref) == []
+    assert new.decode(old.links([SEED, "a", "b", "c"]).extend("a")) == []
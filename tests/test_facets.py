@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from citation_index import CitationIndex, build_citation_sections
+from conftest import paper
+from facets import FacetIndex, build_facet_sections, join_labels, split_labels
+from grouping import identity_concepts
+from storage import Sections, write_sections
+
+VENUES = ("CHI", "UIST", "A|B venue")
+
+
+@pytest.fixture
+def facets(tmp_path, make_corpus):
+    # 20 rows, so bitmaps span several bytes; rows 0..9 cite row 10.
+    store = make_corpus([
+        paper(f"p{i:02d}", year=2000 + i % 3, venue=VENUES[i % 3], keywords=["hci", "ai"] if i % 2 else ["hci"])
+        for i in range(20)
+    ])
+    citations = tmp_path / "citations.bin"
+    write_sections(citations, build_citation_sections(np.arange(10), np.full(10, 10), 20), {"kind": "citations", "corpus": "t"})
+    sections = build_facet_sections(store, CitationIndex(Sections.open(citations)), identity_concepts(store))
+    path = tmp_path / "facets.bin"
+    write_sections(path, sections, {"kind": "facets", "corpus": "t", "citations": "t", "concepts": "t"})
+    return FacetIndex(Sections.open(path))
+
+
+def brute_force(rows, keep):
+    return np.array([r for r in rows if keep(r)], dtype=np.int64)
+
+
+def test_filter_ors_within_and_ands_across_facets(facets):
+    rows = np.array([19, 3, 4, 0, 11, 12, 7], dtype=np.int32)
+    assert facets.filter(rows, {}).tolist() == rows.tolist()
+    chosen = facets.filter(rows, {"year": ("2000", "2001"), "venue": ("CHI", "A|B venue")})
+    expected = brute_force(rows, lambda r: r % 3 in (0, 1) and r % 3 in (0, 2))
+    assert chosen.tolist() == expected.tolist()
+    assert facets.filter(rows, {"keyword": ("ai",), "refs": ("with references",)}).tolist() == [3, 7]
+
+
+def test_a_facet_with_no_known_label_matches_nothing(facets):
+    rows = np.arange(20, dtype=np.int32)
+    assert len(facets.filter(rows, {"year": ()})) == 0
+    assert len(facets.filter(rows, {"venue": ("Nowhere",)})) == 0
+    # Facets the index does not have are ignored.
+    assert len(facets.filter(rows, {"colour": ("red",)})) == 20
+
+
+def test_counts_follow_the_other_facets_selection(facets):
+    rows = np.array([0, 1, 2, 3, 4, 5, 6, 6, 15], dtype=np.int32)  # row 6 twice: counted once
+    counts = facets.counts(rows, {"venue": ("CHI",)})
+    # Venue counts ignore the venue choice itself; the rest only count CHI rows (0, 3, 6, 15).
+    assert counts["venue"] == [("CHI", 4), ("UIST", 2), ("A|B venue", 2)]
+    assert counts["year"] == [("2000", 4)]
+    assert dict(counts["keyword"]) == {"hci": 4, "ai": 2}
+    assert dict(counts["refs"]) == {"with references": 3, "without references": 1}
+
+
+def test_counts_agree_with_filter(facets):
+    rows = np.arange(0, 20, 2, dtype=np.int32)
+    selection = {"keyword": ("ai",), "year": ("2001", "2002")}
+    counts = facets.counts(rows, selection)
+    for label, n in counts["venue"]:
+        assert n == len(facets.filter(rows, {**selection, "venue": (label,)}))
+
+
+@pytest.mark.parametrize("labels", [
+    ["CHI"], ["A|B", "C"], ["|", "\\", "x\\|y", "trailing\\"], [],
+])
+def test_labels_round_trip_through_a_url_param(labels):
+    assert split_labels(join_labels(labels)) == tuple(labels)
+
+
+def test_plain_labels_split_as_before():
+    assert split_labels("CHI|UIST") == ("CHI", "UIST")
+    assert join_labels(["CHI", "UIST"]) == "CHI|UIST"
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from citation_index import load_citations
+from corpus_store import CorpusStore
+from ingest import existing_records, ingest
+from storage import Sections, StoreFormatError
+
+
+def write_dump(path, records):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+    return path
+
+
+def ingest_into(tmp_path, records, append=False):
+    dump = write_dump(tmp_path / f"dump{len(list(tmp_path.glob('dump*')))}.jsonl", records)
+    report = ingest([dump], append=append, corpus_path=tmp_path / "corpus.bin", citations_path=tmp_path / "citations.bin")
+    return report, CorpusStore(Sections.open(tmp_path / "corpus.bin"))
+
+
+RECORDS = [
+    {"paper_id": "a", "title": "Alpha paper", "references": ["b"]},
+    {"paper_id": "b", "title": "Beta paper", "doi": "10.1234/b"},
+]
+
+
+def test_append_keeps_existing_papers_and_edges(tmp_path):
+    ingest_into(tmp_path, RECORDS)
+    report, store = ingest_into(tmp_path, [{"paper_id": "c", "title": "Gamma paper", "references": ["10.1234/b"]}], append=True)
+    assert (report.papers, report.edges) == (3, 2)
+    index = load_citations(store, tmp_path / "citations.bin")
+    assert [store.ids[int(r)] for r in index.cites(store.row_of("a"))] == ["b"]
+    assert [store.ids[int(r)] for r in index.cites(store.row_of("c"))] == ["b"]
+
+
+def test_existing_records_leave_the_paper_cache_alone(tmp_path):
+    _, store = ingest_into(tmp_path, RECORDS)
+    assert [r["paper_id"] for _, r in existing_records(store, None)] == ["a", "b"]
+    assert not store._materialized
+
+
+def test_stale_citations_of_an_ingested_corpus_are_not_replaced_by_seed_edges(tmp_path):
+    _, store = ingest_into(tmp_path, RECORDS)
+    (tmp_path / "citations.bin").unlink()
+    with pytest.raises(StoreFormatError):
+        load_citations(store, tmp_path / "citations.bin")
@@ -0,0 +1,90 @@
+import threading
+import time
+
+from prefetch import Prefetcher
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def blocking_job(key, started, release, log):
+    def step():
+        started.set()
+        release.wait(2.0)
+    return key, [step, lambda: log.append(key)]
+
+
+def test_cancel_while_running_then_another_owner_reschedules():
+    prefetcher = Prefetcher(workers=2, delay=0.0)
+    started, release, log = threading.Event(), threading.Event(), []
+    assert prefetcher.schedule("a", [blocking_job("k", started, release, log)]) == 1
+    assert started.wait(2.0)
+
+    prefetcher.cancel("a")
+    # Still running: the key stays pending and is not scheduled twice.
+    assert prefetcher.schedule("b", [("k", [lambda: log.append("b")])]) == 0
+    assert prefetcher.stats()["pending"] == 1
+
+    release.set()  # a's job stops before its next step and releases the key
+    wait_until(lambda: prefetcher.stats()["pending"] == 0)
+    assert log == []
+    assert prefetcher.schedule("b", [("k", [lambda: log.append("b")])]) == 1
+    wait_until(lambda: log == ["b"])
+    prefetcher.close()
+
+
+def test_a_stale_job_does_not_release_the_key_it_lost():
+    prefetcher = Prefetcher(workers=2, delay=0.2)
+    started, release, log = threading.Event(), threading.Event(), []
+    prefetcher.schedule("a", [("k", [lambda: log.append("a")])])
+    prefetcher.cancel("a")  # a's job is still waiting out the start delay, then finds itself cancelled
+    assert prefetcher.schedule("b", [blocking_job("k", started, release, log)]) == 1
+    assert prefetcher.schedule("a", [("k", [lambda: log.append("a again")])]) == 0
+
+    assert started.wait(2.0)
+    assert prefetcher.stats()["cancelled"] >= 1
+    # The key stays pending until b's own job releases it.
+    assert prefetcher.stats()["pending"] == 1
+    assert prefetcher.schedule("c", [("k", [lambda: log.append("c")])]) == 0
+
+    release.set()
+    wait_until(lambda: prefetcher.stats()["pending"] == 0)
+    assert log == ["k"]
+    prefetcher.close()
+
+
+def test_same_owner_reschedule_after_cancel_keeps_the_new_entry():
+    prefetcher = Prefetcher(workers=2, delay=0.2)
+    started, release, log = threading.Event(), threading.Event(), []
+    prefetcher.schedule("a", [("k", [lambda: log.append("old")])])
+    prefetcher.cancel("a")
+    assert prefetcher.schedule("a", [blocking_job("k", started, release, log)]) == 1
+    assert started.wait(2.0)
+    assert prefetcher.stats()["pending"] == 1
+    assert prefetcher.schedule("b", [("k", [lambda: log.append("b")])]) == 0
+    release.set()
+    wait_until(lambda: prefetcher.stats()["completed"] == 1)
+    assert log == ["k"]
+    prefetcher.close()
+
+
+def test_visits_count_hits_late_and_misses():
+    prefetcher = Prefetcher(workers=1, delay=0.0)
+    started, release, log = threading.Event(), threading.Event(), []
+    prefetcher.schedule("a", [("done", [lambda: None])])
+    wait_until(lambda: prefetcher.stats()["completed"] == 1)
+    prefetcher.schedule("a", [blocking_job("running", started, release, log)])
+    assert started.wait(2.0)
+    prefetcher.schedule("a", [("queued", [lambda: None])])
+
+    for key in ("done", "running", "queued", "never", "done"):
+        prefetcher.visited(key)
+    stats = prefetcher.stats()
+    assert (stats["hits"], stats["late"], stats["misses"]) == (2, 2, 1)
+    assert stats["hit_rate"] == 0.4
+    release.set()
+    prefetcher.close()
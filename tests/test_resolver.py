@@ -0,0 +1,36 @@
+import storage
+from build import STORE_FILES
+from citation_index import load_citations
+from corpus_store import load_corpus
+from resolver import Inbox
+from scoring import load_scores
+from storage import Sections
+from typeahead import load_typeahead
+
+RECORD = {
+    "paper_id": "resolved_2024", "title": "A freshly resolved paper on mental models",
+    "authors": "R. Esolver", "year": 2024, "doi": "10.5555/resolved", "references": ["norman_1983"],
+}
+
+
+def test_flush_ingests_and_publishes_current_stores(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", tmp_path)
+    before = len(load_corpus())
+    inbox = Inbox()
+    assert inbox.flush() is None
+
+    inbox.add([RECORD])
+    report = inbox.flush()
+    assert report.papers == before + 1
+    assert not list(inbox.dir.iterdir())
+
+    store = load_corpus()
+    row = store.row_of("resolved_2024")
+    assert row >= 0 and store.paper(row).doi == "10.5555/resolved"
+    index = load_citations(store)
+    assert [store.ids[int(r)] for r in index.cites(row)] == ["norman_1983"]
+    # Every derived store was built for the new corpus before the app sees it.
+    for name in STORE_FILES[1:]:
+        meta = Sections.open(tmp_path / name).meta
+        assert meta.get("corpus") == store.version, name
+    assert (row, "title") in load_typeahead(store, load_scores(store, index)).suggest("a freshly resolved")
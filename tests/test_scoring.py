@@ -0,0 +1,28 @@
+import numpy as np
+
+from citation_index import CitationIndex, build_citation_sections
+from scoring import _segment_sums, pagerank
+from storage import Sections, write_sections
+
+
+def citation_index(tmp_path, src, dst, n):
+    path = tmp_path / "citations.bin"
+    sections = build_citation_sections(np.array(src), np.array(dst), n)
+    write_sections(path, sections, {"kind": "citations", "format": 1, "corpus": "test"})
+    return CitationIndex(Sections.open(path))
+
+
+def test_segment_sums_with_empty_segments():
+    values = np.array([1.0, 2.0, 4.0, 8.0])
+    assert _segment_sums(np.array([0, 3, 3]), values[:3]).tolist() == [7.0, 0.0]
+    assert _segment_sums(np.array([0, 0, 1, 1, 4, 4]), values).tolist() == [0.0, 1.0, 0.0, 14.0, 0.0]
+    assert _segment_sums(np.array([0, 0, 0]), values[:0]).tolist() == [0.0, 0.0]
+
+
+def test_pagerank_sums_to_one_with_uncited_rows(tmp_path):
+    # Rows 1 (middle) and 3, 4 (trailing) are cited by nobody.
+    index = citation_index(tmp_path, [0, 1, 2, 3, 4], [2, 2, 0, 0, 2], 5)
+    rank, _ = pagerank(index)
+    assert np.isclose(rank.sum(), 1.0)
+    assert rank[2] > rank[0] > rank[1]
+    assert np.allclose(rank[[1, 3, 4]], rank[1])
@@ -0,0 +1,65 @@
+import pytest
+
+import tracing
+from tracing import rerun_root, traced
+
+
+class Context:
+    def __init__(self):
+        self.sent = []
+
+    def _enqueue(self, msg):
+        self.sent.append(msg)
+
+
+class SealedContext:
+    __slots__ = ()
+
+    def _enqueue(self, msg):
+        pass
+
+
+class Message:
+    def WhichOneof(self, _):
+        raise TypeError("unknown message shape")
+
+
+@pytest.fixture
+def finished(monkeypatch):
+    records = []
+    monkeypatch.setattr(tracing, "_debug_requested", lambda: True)
+    monkeypatch.setattr(tracing, "_finish", lambda trace: records.append(trace.record()))
+    return records
+
+
+def rerun(ctx, monkeypatch, send=()):
+    monkeypatch.setattr(tracing, "_script_context", lambda: ctx)
+
+    @traced
+    def page():
+        for msg in send:
+            ctx._enqueue(msg)
+        return "done"
+
+    @rerun_root
+    def main():
+        return page()
+    return main()
+
+
+@pytest.mark.parametrize("ctx", [None, object(), SealedContext()])
+def test_reruns_without_a_usable_enqueue_hook_keep_span_timings(ctx, monkeypatch, finished):
+    assert rerun(ctx, monkeypatch) == "done"
+    (record,) = finished
+    assert record["counted"] is False
+    assert [s["span"] for s in record["spans"]] == ["main", "main/page"]
+
+
+def test_unreadable_messages_stop_counting_but_are_still_sent(monkeypatch, finished):
+    ctx = Context()
+    original = ctx._enqueue
+    msg = Message()
+    assert rerun(ctx, monkeypatch, send=[msg]) == "done"
+    assert ctx.sent == [msg]
+    assert finished[0]["counted"] is False
+    assert ctx._enqueue == original
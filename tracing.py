@@ -0,0 +1,314 @@
+# tracing.py
+"""
+Per-rerun span timings.
+
+A rerun is traced from its entry point (`main()` on full runs, the fragment
+function on fragment reruns, both marked `@rerun_root`) down through the
+functions marked `@traced`. For each span path it records calls, wall time,
+Streamlit elements emitted and the bytes of HTML / messages sent, counted at
+the script context's enqueue hook. That hook is private Streamlit API: if it
+is missing or does not behave as expected, traces keep the span timings and
+report `counted: false`.
+
+Tracing is on for a rerun when CCP_TRACE is set (1, or a log file path:
+JSON lines, rotated) or the URL has ?debug=1 (the last reruns are kept in the
+session for the debug panel). Otherwise `@traced` costs one ContextVar lookup
+per call and `@rerun_root` one environment/query param check per rerun.
+"""
+import contextvars
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+import streamlit as st
+
+from storage import data_path
+
+T = TypeVar("T")
+
+TRACE_ENV = "CCP_TRACE"
+TRACE_LOG_FILE = "trace.log"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+# Reruns kept per session for the debug panel.
+SESSION_TRACES = 20
+_SESSION_KEY = "_traces"
+
+
+# ----------------------------
+# Log
+# ----------------------------
+
+def _open_log() -> Optional[logging.Logger]:
+    setting = os.environ.get(TRACE_ENV, "")
+    if setting in ("", "0"):
+        return None
+    path = data_path(TRACE_LOG_FILE) if setting == "1" else os.path.expanduser(setting)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    logger = logging.getLogger("ccp.trace")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    if not logger.handlers:
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    return logger
+
+_LOG = _open_log()
+
+
+# ----------------------------
+# Spans
+# ----------------------------
+
+class _Span:
+    __slots__ = ("calls", "seconds", "elements", "html_bytes", "msg_bytes")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.elements = 0
+        self.html_bytes = 0
+        self.msg_bytes = 0
+
+
+class Trace:
+    """Spans of one rerun, aggregated by path ("main/page_results/group_ai")."""
+
+    def __init__(self, root: str, panel: bool):
+        self.root = root
+        self.panel = panel
+        self.started = time.time()
+        self.spans: Dict[str, _Span] = {}
+        self._stack: List[Tuple[str, _Span]] = []
+        self.outcome = "ok"
+        self.counted = False  # whether elements / bytes were counted (see _counting)
+
+    def enter(self, name: str) -> Tuple[_Span, float]:
+        path = f"{self._stack[-1][0]}/{name}" if self._stack else name
+        span = self.spans.get(path)
+        if span is None:
+            span = self.spans[path] = _Span()
+        span.calls += 1
+        self._stack.append((path, span))
+        return span, time.perf_counter()
+
+    def exit(self, span: _Span, t0: float) -> None:
+        span.seconds += time.perf_counter() - t0
+        self._stack.pop()
+
+    def count(self, msg) -> None:
+        """Attribute one outgoing ForwardMsg to every open span."""
+        if msg.WhichOneof("type") != "delta":
+            return
+        delta = msg.delta
+        kind = delta.WhichOneof("type")
+        elements = 1 if kind in ("new_element", "add_block") else 0
+        html = 0
+        if kind == "new_element" and delta.new_element.WhichOneof("type") == "markdown":
+            md = delta.new_element.markdown
+            if md.allow_html:
+                html = len(md.body.encode("utf-8"))
+        size = msg.ByteSize()
+        for _, span in self._stack:
+            span.elements += elements
+            span.html_bytes += html
+            span.msg_bytes += size
+
+    def record(self) -> Dict[str, Any]:
+        root = self.spans.get(self.root, _Span())
+        return {
+            "ts": round(self.started, 3),
+            "root": self.root,
+            "outcome": self.outcome,
+            "counted": self.counted,
+            "ms": round(root.seconds * 1e3, 3),
+            "elements": root.elements,
+            "html_bytes": root.html_bytes,
+            "msg_bytes": root.msg_bytes,
+            "spans": [
+                {
+                    "span": path,
+                    "calls": s.calls,
+                    "ms": round(s.seconds * 1e3, 3),
+                    "elements": s.elements,
+                    "html_bytes": s.html_bytes,
+                    "msg_bytes": s.msg_bytes,
+                }
+                for path, s in self.spans.items()
+            ],
+        }
+
+
+_ACTIVE: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("ccp_trace", default=None)
+
+
+def traced(fn: Callable[..., T]) -> Callable[..., T]:
+    """Time `fn` as a span of the current rerun's trace (a plain call when not tracing)."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        trace = _ACTIVE.get()
+        if trace is None:
+            return fn(*args, **kwargs)
+        span, t0 = trace.enter(name)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            trace.exit(span, t0)
+    return wrapper
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a block as a span (for code that is not its own function)."""
+    trace = _ACTIVE.get()
+    if trace is None:
+        yield
+        return
+    s, t0 = trace.enter(name)
+    try:
+        yield
+    finally:
+        trace.exit(s, t0)
+
+
+def _debug_requested() -> bool:
+    try:
+        return st.query_params.get("debug") == "1"
+    except Exception:
+        return False
+
+
+def _script_context():
+    try:
+        from streamlit.runtime.scriptrunner_utils.script_run_context import get_script_run_ctx
+        return get_script_run_ctx(suppress_warning=True)
+    except Exception:
+        return None
+
+
+@contextmanager
+def _counting(trace: Trace) -> Iterator[None]:
+    """
+    Count the messages enqueued in the block by wrapping the script context's
+    private `_enqueue`. Without a usable hook (or on a message `count` cannot
+    read) the trace keeps its span timings only.
+    """
+    ctx = _script_context()
+    enqueue = getattr(ctx, "_enqueue", None)
+
+    def counting_enqueue(msg):
+        if trace.counted:
+            try:
+                trace.count(msg)
+            except Exception:
+                trace.counted = False
+        enqueue(msg)
+
+    hooked = False
+    if callable(enqueue):
+        try:
+            ctx._enqueue = counting_enqueue
+            hooked = trace.counted = True
+        except (AttributeError, TypeError):
+            pass
+    try:
+        yield
+    finally:
+        if hooked and getattr(ctx, "_enqueue", None) is counting_enqueue:
+            ctx._enqueue = enqueue
+
+
+def rerun_root(fn: Callable[..., T]) -> Callable[..., T]:
+    """
+    Mark a rerun entry point (main() or a fragment function). Called with no
+    trace active and tracing enabled, it starts one, counts the messages the
+    rerun enqueues, and logs / keeps the result when it returns.
+    Called inside a traced rerun it is an ordinary span.
+    """
+    name = fn.__name__
+    inner = traced(fn)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _ACTIVE.get() is not None:
+            return inner(*args, **kwargs)
+        panel = _debug_requested()
+        if _LOG is None and not panel:
+            return fn(*args, **kwargs)
+
+        trace = Trace(name, panel)
+        token = _ACTIVE.set(trace)
+        try:
+            with _counting(trace):
+                return inner(*args, **kwargs)
+        except BaseException as e:
+            # st.rerun() / st.stop() unwind through here as exceptions.
+            trace.outcome = type(e).__name__
+            raise
+        finally:
+            _ACTIVE.reset(token)
+            _finish(trace)
+    return wrapper
+
+
+def _finish(trace: Trace) -> None:
+    record = trace.record()
+    if _LOG is not None:
+        _LOG.info(json.dumps(record, separators=(",", ":")))
+    if trace.panel:
+        try:
+            st.session_state.setdefault(_SESSION_KEY, deque(maxlen=SESSION_TRACES)).append(record)
+        except Exception:
+            pass
+
+
+# ----------------------------
+# Debug panel data
+# ----------------------------
+
+def recent_traces() -> List[Dict[str, Any]]:
+    """This session's last traced reruns, newest first."""
+    try:
+        return list(reversed(st.session_state.get(_SESSION_KEY, ())))
+    except Exception:
+        return []
+
+
+def summary_rows(traces: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "at": time.strftime("%H:%M:%S", time.localtime(t["ts"])),
+            "rerun": t["root"],
+            "outcome": t["outcome"],
+            "ms": t["ms"],
+            # Blank when the enqueue hook was unavailable.
+            "elements": t["elements"] if t.get("counted", True) else None,
+            "html_kb": round(t["html_bytes"] / 1024, 1) if t.get("counted", True) else None,
+            "sent_kb": round(t["msg_bytes"] / 1024, 1) if t.get("counted", True) else None,
+        }
+        for t in traces
+    ]
+
+
+def span_rows(trace: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """One row per span path, indented by depth, in first-entered order."""
+    rows = []
+    for s in trace["spans"]:
+        depth = s["span"].count("/")
+        rows.append({
+            "span": "  " * depth + s["span"].rsplit("/", 1)[-1],
+            "calls": s["calls"],
+            "ms": s["ms"],
+            "elements": s["elements"],
+            "html_kb": round(s["html_bytes"] / 1024, 1),
+        })
+    return rows
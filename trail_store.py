@@ -0,0 +1,230 @@
+# trail_store.py
+"""
+Persistent research trails: every chain step, per browser session, in SQLite.
+
+  steps   (session, ts, chain, pos, src, dst)   append-only log of traversals (unindexed)
+  chains  (session, token) -> parent token, last paper, length, times
+          one row per chain prefix a session reached; `extended` once a longer
+          chain continued it, so the open ends are the session's trails
+  edges   (src, dst) -> n                        traversal counts
+
+Chains are stored as parent links (the token of the chain minus its last
+step, see chain_codec.chain_token), so a step costs a few fixed-size rows
+however long the chain is; `resume` walks the links back in one recursive
+query. Every query is an index range: recent chains by (session, extended,
+updated), edges by their (src, dst) primary key.
+
+`record` only enqueues; a writer thread applies the queue in one transaction
+per batch (up to BATCH_SIZE steps or FLUSH_INTERVAL_S, whichever comes
+first), so the script thread never waits on disk. WAL mode lets the reads
+run while a batch commits.
+"""
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from chain_codec import chain_token
+from storage import data_path
+
+TRAILS_FILE = "trails.sqlite"
+
+BATCH_SIZE = 512
+FLUSH_INTERVAL_S = 1.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS steps (
+    session TEXT NOT NULL, ts REAL NOT NULL, chain TEXT NOT NULL, pos INTEGER NOT NULL,
+    src TEXT NOT NULL, dst TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chains (
+    session TEXT NOT NULL, token TEXT NOT NULL, parent TEXT, paper TEXT NOT NULL, length INTEGER NOT NULL,
+    started REAL NOT NULL, updated REAL NOT NULL, extended INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (session, token)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS chains_recent ON chains (session, extended, updated);
+CREATE TABLE IF NOT EXISTS edges (
+    src TEXT NOT NULL, dst TEXT NOT NULL, n INTEGER NOT NULL,
+    PRIMARY KEY (src, dst)
+) WITHOUT ROWID;
+"""
+
+_Step = Tuple[str, List[str], float]
+
+
+class TrailStore:
+    def __init__(self, path: Optional[Path] = None, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL_S):
+        self.path = Path(path or data_path(TRAILS_FILE))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._writer = self._connect()
+        self._writer.executescript(_SCHEMA)
+        # Readers get their own connection; WAL keeps them off the writer's lock.
+        self._reader = self._connect()
+        self._read_lock = threading.Lock()
+
+        # Steps lost to failed batches (e.g. disk full); the writer keeps going.
+        self.dropped = 0
+        self.last_error: Optional[sqlite3.Error] = None
+        self._queue: "queue.SimpleQueue[_Step | threading.Event | None]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="trail-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("PRAGMA cache_size=-65536")
+        # Checkpoint every ~40MB of WAL instead of 4MB: fewer, larger syncs.
+        db.execute("PRAGMA wal_autocheckpoint=10000")
+        return db
+
+    # ----------------------------
+    # Writing (writer thread)
+    # ----------------------------
+
+    def record(self, session: str, chain: Sequence[str]) -> None:
+        """Queue the step that reached `chain` (its last two entries). Returns immediately."""
+        if len(chain) >= 2:
+            self._queue.put((session, list(chain), time.time()))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything recorded so far is written."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch: List[_Step] = []
+            waiters: List[threading.Event] = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    self._write(batch)
+                    for w in waiters:
+                        w.set()
+                    return
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for w in waiters:
+                w.set()
+
+    def _write(self, batch: List[_Step]) -> None:
+        if not batch:
+            return
+        db = self._writer
+        db.execute("BEGIN")
+        try:
+            for session, chain, ts in batch:
+                self._write_step(db, session, chain, ts)
+            db.execute("COMMIT")
+        except sqlite3.Error as e:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            self.dropped += len(batch)
+            self.last_error = e
+
+    def _write_step(self, db: sqlite3.Connection, session: str, chain: List[str], ts: float) -> None:
+        token, parent = chain_token(chain), chain_token(chain[:-1])
+        inserted = db.execute(
+            "INSERT OR IGNORE INTO chains (session, token, parent, paper, length, started, updated)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (session, token, parent, chain[-1], len(chain), ts, ts),
+        ).rowcount
+        if not inserted:
+            # Revisited (reload, back button): fresher, but not a new traversal.
+            db.execute("UPDATE chains SET updated = ? WHERE session = ? AND token = ?", (ts, session, token))
+            return
+
+        # The parent is no longer an open end. Chains that arrived by shared
+        # link may lack it and further ancestors: add those as extended.
+        n, prefix = len(chain) - 1, parent
+        while prefix is not None and not db.execute(
+            "UPDATE chains SET extended = 1, updated = ? WHERE session = ? AND token = ?", (ts, session, prefix)
+        ).rowcount:
+            grandparent = chain_token(chain[:n - 1]) if n > 1 else None
+            db.execute(
+                "INSERT INTO chains (session, token, parent, paper, length, started, updated, extended)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, 1)",
+                (session, prefix, grandparent, chain[n - 1], n, ts, ts),
+            )
+            n, prefix = n - 1, grandparent
+
+        db.execute(
+            "INSERT INTO steps (session, ts, chain, pos, src, dst) VALUES (?, ?, ?, ?, ?, ?)",
+            (session, ts, token, len(chain) - 1, chain[-2], chain[-1]),
+        )
+        db.execute(
+            "INSERT INTO edges (src, dst, n) VALUES (?, ?, 1) ON CONFLICT (src, dst) DO UPDATE SET n = n + 1",
+            (chain[-2], chain[-1]),
+        )
+
+    # ----------------------------
+    # Queries
+    # ----------------------------
+
+    def recent_chains(self, session: str, limit: int = 10) -> List[Dict[str, object]]:
+        """The session's open trails (chains nothing continued), most recently used first."""
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT token, paper, length, started, updated FROM chains"
+                " WHERE session = ? AND extended = 0 ORDER BY updated DESC LIMIT ?",
+                (session, limit),
+            ).fetchall()
+        return [
+            {"token": token, "paper": paper, "length": length, "started": started, "updated": updated}
+            for token, paper, length, started, updated in rows
+        ]
+
+    def resume(self, session: str, token: str) -> List[str]:
+        """The chain `token` recorded for `session`, oldest step first ([] if unknown)."""
+        with self._read_lock:
+            rows = self._reader.execute(
+                """
+                WITH RECURSIVE walk (parent, paper, length) AS (
+                    SELECT parent, paper, length FROM chains WHERE session = ?1 AND token = ?2
+                    UNION ALL
+                    SELECT c.parent, c.paper, c.length FROM chains c JOIN walk w ON c.session = ?1 AND c.token = w.parent
+                )
+                SELECT paper, length FROM walk ORDER BY length
+                """,
+                (session, token),
+            ).fetchall()
+        chain = [paper for paper, _ in rows]
+        # A gap (e.g. rows written by an older build) makes the chain unusable.
+        return chain if rows and rows[0][1] == 1 and len(rows) == rows[-1][1] else []
+
+    def top_next(self, paper_id: str, k: int = 5) -> List[Tuple[str, int]]:
+        """The papers most often visited right after `paper_id`, across all sessions."""
+        with self._read_lock:
+            return self._reader.execute(
+                "SELECT dst, n FROM edges WHERE src = ? ORDER BY n DESC, dst LIMIT ?", (paper_id, k)
+            ).fetchall()
+
+    def __len__(self) -> int:
+        """Recorded steps (written ones; call flush() first for an exact count)."""
+        with self._read_lock:
+            return self._reader.execute("SELECT COUNT(*) FROM steps").fetchone()[0]
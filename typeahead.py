@@ -0,0 +1,251 @@
+# typeahead.py
+"""
+As-you-type suggestions over paper titles, authors and DOIs, built once into
+data/typeahead.bin and mmap'd.
+
+Keys are normalized like search.py's titles (folded, lowercase, word tokens
+joined by single spaces); DOIs are kept as typed, lowercased:
+
+  title   the whole title
+  author  every author's name, and their surname alone ("et al." dropped)
+  doi     the DOI
+
+The distinct keys are sorted by utf-8 bytes, each followed by its papers in
+importance order (scores.bin), so the keys starting with a prefix form one
+contiguous range (two binary searches) and so do their entries:
+
+  keys.offsets / .blob   sorted distinct keys
+  entries.offsets        int64[keys + 1]
+  entries.rows           int32     entries.score  float32     entries.kind  uint8 (index into KINDS)
+  heavy.range            int64[h]  lo * (keys + 1) + hi, sorted
+  heavy.top              int64[h, TOP_ENTRIES]  best entries of that key range (-1 padded)
+
+A range of at most SCAN_LIMIT entries is ranked on the spot. Longer ranges
+belong to short prefixes ("a", "the ", "10.1"), and every prefix of up to
+MAX_PREFIX bytes with such a range has its best entries precomputed
+(`heavy`, found by splitting ranges byte by byte), looked up by the range
+itself. Either way a keystroke costs two binary searches plus a small
+argpartition at most.
+"""
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from corpus_store import CorpusStore
+from scoring import ScoreTable
+from search import normalize_title
+from storage import Sections, StringColumn, data_path, lower_bound, open_current, sort_order, string_sections, write_sections
+
+TYPEAHEAD_FILE = "typeahead.bin"
+TYPEAHEAD_FORMAT = 1
+
+KINDS = ("title", "author", "doi")
+SUGGESTIONS = 8
+# Entries kept per precomputed prefix: room for SUGGESTIONS after a paper
+# matching by title and by author is shown once.
+TOP_ENTRIES = 16
+SCAN_LIMIT = 2048
+MAX_PREFIX = 64
+
+# Rows normalized per batch while building.
+_BUILD_BLOCK = 65_536
+
+_ET_AL = re.compile(r"\bet\s+al\b\.?", re.IGNORECASE)
+_DOI_PREFIX = re.compile(r"^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)?(10\.\S*)$", re.IGNORECASE)
+
+
+# ----------------------------
+# Normalization
+# ----------------------------
+
+def author_keys(authors: str) -> List[str]:
+    """Normalized names in an authors field, each followed by its surname when that differs."""
+    keys: List[str] = []
+    for name in authors.split(","):
+        norm = normalize_title(_ET_AL.sub(" ", name))
+        if norm:
+            keys.append(norm)
+            surname = norm.rsplit(" ", 1)[-1]
+            if surname != norm:
+                keys.append(surname)
+    return keys
+
+
+def doi_prefix(text: str) -> Optional[str]:
+    """The lowercased DOI (or start of one) in `text`, without a doi.org / doi: prefix."""
+    m = _DOI_PREFIX.match(text.strip())
+    return m.group(1).lower() if m else None
+
+
+# ----------------------------
+# Building
+# ----------------------------
+
+def _heavy_ranges(keys: List[bytes], entry_offsets: np.ndarray, limit: int, max_prefix: int) -> List[Tuple[int, int]]:
+    """Key ranges [lo, hi) of every byte prefix (1..max_prefix long) whose keys have more than `limit` entries."""
+    heavy: Set[Tuple[int, int]] = set()
+    level = [(0, len(keys))]
+    for depth in range(max_prefix):
+        deeper = []
+        for lo, hi in level:
+            # Keys sharing a `depth`-byte prefix; the one equal to it (if any) sorts first.
+            start = lo + (len(keys[lo]) == depth)
+            if start >= hi:
+                continue
+            byte = np.frombuffer(bytes(keys[i][depth] for i in range(start, hi)), dtype=np.uint8)
+            bounds = [start, *(start + np.flatnonzero(np.diff(byte)) + 1).tolist(), hi]
+            for a, b in zip(bounds[:-1], bounds[1:]):
+                if entry_offsets[b] - entry_offsets[a] > limit:
+                    heavy.add((a, b))
+                    deeper.append((a, b))
+        level = deeper
+    return sorted(heavy)
+
+
+def _best(score: np.ndarray, k: int) -> np.ndarray:
+    """Indexes of the `k` highest scores, best first (first index on ties)."""
+    if len(score) > k:
+        part = np.argpartition(-score, k - 1)[:k]
+        return part[np.lexsort((part, -score[part]))]
+    return np.argsort(-score, kind="stable")
+
+
+def build_typeahead_sections(store: CorpusStore, scores: ScoreTable, limit: int = SCAN_LIMIT) -> Dict[str, np.ndarray]:
+    n = len(store)
+    cols = store.columns
+    key_ids: Dict[str, int] = {}
+    entry_key: List[int] = []
+    entry_row: List[int] = []
+    entry_kind: List[int] = []
+
+    def add(key: str, row: int, kind: int) -> None:
+        entry_key.append(key_ids.setdefault(key, len(key_ids)))
+        entry_row.append(row)
+        entry_kind.append(kind)
+
+    for start in range(0, n, _BUILD_BLOCK):
+        rows = np.arange(start, min(start + _BUILD_BLOCK, n))
+        titles = cols["title"].take(rows)
+        authors = cols["authors"].take(rows)
+        dois = cols["doi"].take(rows) if "doi" in cols else [""] * len(rows)
+        for row, title, names, doi in zip(rows.tolist(), titles, authors, dois):
+            norm = normalize_title(title)
+            if norm:
+                add(norm, row, 0)
+            for name in dict.fromkeys(author_keys(names)):
+                add(name, row, 1)
+            doi = doi_prefix(doi)
+            if doi:
+                add(doi, row, 2)
+
+    # Keys in byte order; entries by key, then by importance.
+    keys = list(key_ids)
+    order = sort_order(keys)
+    rank = np.empty(len(keys), dtype=np.int64)
+    rank[order] = np.arange(len(keys))
+    entry_rank = rank[np.array(entry_key, dtype=np.int64)]
+    rows = np.array(entry_row, dtype=np.int32)
+    score = scores.importance[rows].astype(np.float32)
+    by_key = np.lexsort((-score, entry_rank))
+    entry_offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(entry_rank, minlength=len(keys)), out=entry_offsets[1:])
+
+    sorted_keys = [keys[i].encode("utf-8") for i in order]
+    heavy = _heavy_ranges(sorted_keys, entry_offsets, limit, MAX_PREFIX)
+    score = score[by_key]
+    top = np.full((len(heavy), TOP_ENTRIES), -1, dtype=np.int64)
+    for i, (lo, hi) in enumerate(heavy):
+        a, b = entry_offsets[lo], entry_offsets[hi]
+        best = a + _best(score[a:b], TOP_ENTRIES)
+        top[i, :len(best)] = best
+
+    sections: Dict[str, np.ndarray] = {}
+    sections.update(string_sections("keys", (keys[i] for i in order)))
+    sections["entries.offsets"] = entry_offsets
+    sections["entries.rows"] = rows[by_key]
+    sections["entries.score"] = score
+    sections["entries.kind"] = np.array(entry_kind, dtype=np.uint8)[by_key]
+    sections["heavy.range"] = np.array([lo * (len(keys) + 1) + hi for lo, hi in heavy], dtype=np.int64)
+    sections["heavy.top"] = top
+    return sections
+
+
+def write_typeahead(store: CorpusStore, scores: ScoreTable, path: Optional[Path] = None) -> str:
+    path = path or data_path(TYPEAHEAD_FILE)
+    meta = {
+        "kind": "typeahead",
+        "format": TYPEAHEAD_FORMAT,
+        "corpus": store.version,
+        "scores": scores.version,
+        "scan_limit": SCAN_LIMIT,
+    }
+    return write_sections(path, build_typeahead_sections(store, scores), meta)
+
+
+# ----------------------------
+# Querying
+# ----------------------------
+
+class TypeaheadIndex:
+    def __init__(self, sections: Sections):
+        if sections.meta.get("kind") != "typeahead":
+            raise ValueError("section file is not a typeahead index")
+        self.sections = sections
+        self.version: str = sections.build_id
+        self.corpus_version: str = sections.meta["corpus"]
+        self.scores_version: str = sections.meta["scores"]
+        self.scan_limit: int = sections.meta["scan_limit"]
+
+        self._keys = StringColumn.from_sections(sections, "keys")
+        self._offsets = sections["entries.offsets"]
+        self._rows = sections["entries.rows"]
+        self._score = sections["entries.score"]
+        self._kind = sections["entries.kind"]
+        self._heavy_range = sections["heavy.range"]
+        self._heavy_top = sections["heavy.top"]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _top(self, prefix: str) -> np.ndarray:
+        """Best TOP_ENTRIES entries under keys starting with `prefix`."""
+        key = prefix.encode("utf-8")
+        lo = lower_bound(self._keys, key)
+        hi = lower_bound(self._keys, key + b"\xff")  # no utf-8 byte is 0xff
+        a, b = int(self._offsets[lo]), int(self._offsets[hi])
+        if b - a > self.scan_limit:
+            i = int(np.searchsorted(self._heavy_range, lo * (len(self._keys) + 1) + hi))
+            if i < len(self._heavy_range) and self._heavy_range[i] == lo * (len(self._keys) + 1) + hi:
+                top = self._heavy_top[i]
+                return top[top >= 0]
+            # Only prefixes longer than MAX_PREFIX get here: rank the whole range.
+        return a + _best(self._score[a:b], TOP_ENTRIES)
+
+    def suggest(self, text: str, k: int = SUGGESTIONS) -> List[Tuple[int, str]]:
+        """Up to `k` (row, kind) pairs whose title, author or DOI starts with `text`; most important first, one per paper."""
+        prefixes = {normalize_title(text), doi_prefix(text) or ""} - {""}
+        if not prefixes:
+            return []
+        entries = np.concatenate([self._top(p) for p in prefixes])
+        entries = entries[np.argsort(-self._score[entries], kind="stable")]
+        seen: Set[int] = set()
+        out: List[Tuple[int, str]] = []
+        for row, kind in zip(self._rows[entries].tolist(), self._kind[entries].tolist()):
+            if row not in seen:
+                seen.add(row)
+                out.append((row, KINDS[kind]))
+                if len(out) == k:
+                    break
+        return out
+
+
+def load_typeahead(store: CorpusStore, scores: ScoreTable, path: Optional[Path] = None) -> TypeaheadIndex:
+    """Open the typeahead index for `store` / `scores`, rebuilding it if missing or stale."""
+    path = Path(path or data_path(TYPEAHEAD_FILE))
+    return open_current(
+        path, TypeaheadIndex,
+        lambda index: index.corpus_version == store.version and index.scores_version == scores.version,
+        lambda _: write_typeahead(store, scores, path),
+    )